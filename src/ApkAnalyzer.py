@@ -1,8 +1,13 @@
 """Class used to decompile and search for secrets in Android Mobile Applications"""
-import shlex
-import subprocess
+import itertools
 import logging
-from Appalyzer import Appalyzer
+import re
+import time
+from typing import Iterator
+from zipfile import ZipFile
+from Appalyzer import Appalyzer, _closing_archive, _get_archive
+from AppalyzerObjects import RegExMatch
+from DexStrings import DexStrings
 
 class ApkAnalyzer(Appalyzer):
     """
@@ -11,41 +16,136 @@ class ApkAnalyzer(Appalyzer):
 
     logger = logging.getLogger(__name__)
 
+    DEX_REGEX = re.compile(r"classes\d*\.dex")
+
+    def __init__(self, app:str, regexfile:str=None) -> None:
+        """
+        Parameters
+        ----------
+        app : str
+            The path to the application to analyze (can be a file or directory)
+        """
+
+        super().__init__(app, regexfile)
+
+        self._apk_mode = self._config.get_apk_scan_mode()
+
+
     def _decompile_app(self) -> None:
-        """ 
+        """
         Decompile the app and store in directory
         Process will take some time to decompile application
         """
 
-        # Create the temp directory
-        self._outdir = self._outdir.joinpath(f"{self.app.stem}",
-                                             f"{self.app.stem}_{self._time_now}")
-
-        self._outdir.mkdir(parents=True, exist_ok=True)
-
         # Get jadx binary path
         jadx_path = self._config.get_jadx_path()
 
         # Create the decompile command
-        decompile_cmd = [str(jadx_path), "--output-dir", str(self._outdir), str(self.app)]
+        def decompile_cmd(outdir):
+            return [str(jadx_path), "--output-dir", str(outdir), str(self.app)]
+
+        # Decompile the apk file, or reuse a previous decompilation
+        self._run_decompiler(jadx_path, decompile_cmd)
+
+
+    def _finder_dex(self, name:str, archive:str) -> dict[str, RegExMatch]:
+        """
+        Search the string pool of a dex file of the apk
+
+        Each match is reported at the string it was found in, i.e.
+        classes2.dex#string_ids[1234], its position being the offsets of the
+        string in the dex file
+
+        Parameters
+        ----------
+        name : str
+            Name of the dex file in the apk
+
+        archive : str
+            Path of the apk
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the string pool
+        """
+
+        matches = {}
+        filename = f"{archive}!/{name}"
+        start_time = time.perf_counter()
+        size = 0
 
-        ApkAnalyzer.logger.info("Decompiling app %s... This may take awhile...", self.app.name)
-        ApkAnalyzer.logger.debug("Decompile command: \"%s\"", shlex.join(decompile_cmd))
+        try:
+            with self._stage("extract"):
+                data = _get_archive(archive).read(name)
+                size = len(data)
+                content, string_map = DexStrings(data).extract()
+                del data
 
-        # Decompile the apk file
-        proc = subprocess.Popen(decompile_cmd)
-        proc.wait()
+        except Exception as err:
+            Appalyzer.logger.error("\n[!]Error: %s: %s\n", filename, err)
+
+        else:
+            matches = self._scan_strings(content, string_map, filename, name)
+
+        finally:
+            if self._profiler:
+                self._profiler.add_file("application/x-dex", time.perf_counter() - start_time, size)
+
+        return matches
+
+
+    def _search_dex(self) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the string pools of the dex files of the apk, without decompiling it
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each dex file, as the dex files are searched
+        """
+
+        with self._stage("walk"):
+            with ZipFile(self.app, mode='r') as zfile:
+                members = [info for info in zfile.infolist() if ApkAnalyzer.DEX_REGEX.fullmatch(info.filename)]
+
+        # Largest first, the main dex is usually the largest
+        members = [info.filename for info in sorted(members, key=lambda i: -i.file_size)]
+
+        Appalyzer.logger.info("Searching the string pools of %s dex files of %s", len(members), self.app.name)
+
+        if self._scan_backend == "process":
+            results = self._search_processes("_finder_dex", members, str(self.app))
+
+        else:
+            results = self._search_threads("_finder_dex", members, str(self.app))
+
+        return _closing_archive(str(self.app), results)
 
 
     def secret_search(self) -> None:
-        """ 
+        """
         Perform secret search
+
+        With APK_SCAN_MODE=dex only the string pools of the dex files are
+        searched, in seconds, with both jadx decompiles the app as a deep pass
         """
         # Write header
         self._write_header()
 
+        if self._apk_mode == "dex":
+            with self._scan_limit:
+                self._report(self._search_dex())
+            return
+
         # Decompile the App
         self._decompile_app()
 
-        # Start searching for secrets
-        self._search(self._outdir)
+        # Start searching for secrets, the string pools first when pipelined while jadx runs
+        results = self._search_dir(self._outdir)
+
+        if self._apk_mode == "both":
+            results = itertools.chain(self._search_dex(), results)
+
+        with self._scan_limit:
+            self._report(results)
@@ -3,6 +3,7 @@ import configparser
 from pathlib import Path
 import os
 import errno
+import signal
 
 class AppAnalyzerConfig(object):
     """
@@ -10,7 +11,7 @@ class AppAnalyzerConfig(object):
     """
 
     _CONFIG_FILE = None
-    _CONFIG: None
+    _CONFIG = None
     _INSTANCE = None
 
     def __new__(cls, *args, **kwargs):
@@ -33,6 +34,11 @@ class AppAnalyzerConfig(object):
         """
 
         if config_file is None:
+
+            # Already loaded, keep any values overridden since
+            if AppAnalyzerConfig._CONFIG is not None:
+                return
+
             config_file = Path('config.ini')
 
         if not Path(config_file).is_file():
@@ -66,6 +72,13 @@ class AppAnalyzerConfig(object):
 
         return cls._CONFIG['default'][key]
 
+    @classmethod
+    def set_config_value(cls, key: str, value: any) -> None:
+        '''
+        Override the value of the key specified, i.e. from a commandline argument
+        '''
+        cls._CONFIG['default'][key] = str(value)
+
 
     @classmethod
     def get_jadx_path(cls) -> str:
@@ -158,3 +171,595 @@ class AppAnalyzerConfig(object):
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), p)
 
         return p
+
+    @classmethod
+    def get_scan_backend(cls) -> str:
+        """
+        Return the backend used to scan files
+
+        With "auto", processes are used when the regexes have a time budget,
+        as only a scanner process can interrupt a runaway regex, and threads
+        otherwise or where SIGALRM is not available
+
+        Returns
+        ----------
+        str
+            "thread" to scan with a pool of threads or
+            "process" to scan with a pool of processes
+
+        Raises
+        ----------
+        ValueError
+            If the backend is not supported
+
+        """
+        p = cls._CONFIG['default'].get('SCAN_BACKEND', 'auto').lower() or 'auto'
+
+        if p not in ('auto', 'thread', 'process'):
+            raise ValueError(f"SCAN_BACKEND must be one of ['auto', 'thread', 'process'], not {p}")
+
+        if p == 'auto':
+            budgets = cls.get_pattern_time_budget() or cls.get_file_time_budget()
+            p = 'process' if budgets and hasattr(signal, "setitimer") else 'thread'
+
+        return p
+
+    @classmethod
+    def get_scan_workers(cls) -> int | None:
+        """
+        Return the number of workers used to scan files
+
+        Returns
+        ----------
+        int | None
+            Number of workers, None to let the executor decide
+
+        """
+        p = cls._CONFIG['default'].getint('SCAN_WORKERS', fallback=0)
+
+        return p if p > 0 else None
+
+    @classmethod
+    def get_strings_min_length(cls) -> int:
+        """
+        Return the minimum length of the strings extracted from binary files
+
+        Returns
+        ----------
+        int
+            Minimum number of printable characters
+
+        """
+        return cls._CONFIG['default'].getint('STRINGS_MIN_LENGTH', fallback=4)
+
+    @classmethod
+    def get_large_file_size(cls) -> int:
+        """
+        Return the size above which files are scanned in windows
+
+        Returns
+        ----------
+        int
+            Size in bytes
+
+        """
+        return int(cls._CONFIG['default'].getfloat('LARGE_FILE_MB', fallback=32) * 1024 ** 2)
+
+    @classmethod
+    def get_scan_window_size(cls) -> int:
+        """
+        Return the size of the windows large files are scanned in
+
+        Returns
+        ----------
+        int
+            Size in bytes
+
+        """
+        return int(cls._CONFIG['default'].getfloat('SCAN_WINDOW_MB', fallback=8) * 1024 ** 2)
+
+    @classmethod
+    def get_scan_overlap_size(cls) -> int:
+        """
+        Return the size of the overlap between windows of large files,
+        matches longer than this can be missed
+
+        Returns
+        ----------
+        int
+            Size in bytes
+
+        """
+        return int(cls._CONFIG['default'].getfloat('SCAN_OVERLAP_KB', fallback=64) * 1024)
+
+    @classmethod
+    def get_decompile_cache_enabled(cls) -> bool:
+        """
+        Return whether decompiled apps are cached between runs
+
+        Returns
+        ----------
+        bool
+            True if the decompile cache is enabled
+
+        """
+        return cls._CONFIG['default'].getboolean('DECOMPILE_CACHE', fallback=False)
+
+    @classmethod
+    def get_decompile_cache_size(cls) -> int:
+        """
+        Return the maximum size of the decompile cache
+
+        Returns
+        ----------
+        int
+            Size in bytes
+
+        """
+        return int(cls._CONFIG['default'].getfloat('DECOMPILE_CACHE_MAX_GB', fallback=20) * 1024 ** 3)
+
+    @classmethod
+    def get_incremental(cls) -> bool:
+        """
+        Return whether directory scans only search files changed since the last scan
+
+        Returns
+        ----------
+        bool
+            True if incremental directory scans are enabled
+
+        """
+        return cls._CONFIG['default'].getboolean('INCREMENTAL', fallback=False)
+
+    @classmethod
+    def _get_list(cls, key:str, fallback:str) -> list[str]:
+        """
+        Return the comma separated values of the key specified
+        """
+        p = cls._CONFIG['default'].get(key, fallback)
+
+        return [value.strip() for value in p.split(',') if value.strip()]
+
+    @classmethod
+    def get_triage_include(cls) -> list[str]:
+        """
+        Return the globs of the files searched, the others are skipped
+
+        Returns
+        ----------
+        list[str]
+            Globs, empty to search every file
+
+        """
+        return cls._get_list('TRIAGE_INCLUDE', '')
+
+    @classmethod
+    def get_triage_exclude(cls) -> list[str]:
+        """
+        Return the globs of the files that are not searched, i.e. media files
+
+        Returns
+        ----------
+        list[str]
+            Globs, i.e. "*.png" or "assets/fonts/*"
+
+        """
+        # Configuration files from before the triage policy list extensions
+        if 'TRIAGE_EXCLUDE' not in cls._CONFIG['default'] and 'ARCHIVE_SKIP_EXTENSIONS' in cls._CONFIG['default']:
+            return [f"*{ext.lower()}" for ext in cls._get_list('ARCHIVE_SKIP_EXTENSIONS', '')]
+
+        return cls._get_list('TRIAGE_EXCLUDE', '')
+
+    @classmethod
+    def get_triage_deprioritize(cls) -> list[str]:
+        """
+        Return the globs of the files searched after the others
+
+        Returns
+        ----------
+        list[str]
+            Globs, i.e. "*.so"
+
+        """
+        return cls._get_list('TRIAGE_DEPRIORITIZE', '*.so,*.dylib,*.a')
+
+    @classmethod
+    def get_triage_mimetype_denylist(cls) -> list[str]:
+        """
+        Return the globs of the mimetypes that are not searched
+
+        Returns
+        ----------
+        list[str]
+            Globs, i.e. "audio/*"
+
+        """
+        return cls._get_list('TRIAGE_MIMETYPE_DENYLIST', '')
+
+    @classmethod
+    def get_triage_max_file_size(cls) -> int | None:
+        """
+        Return the size above which files are not searched
+
+        Returns
+        ----------
+        int | None
+            Size in bytes, None for no limit
+
+        """
+        fallback = cls._CONFIG['default'].getfloat('ARCHIVE_MAX_MEMBER_MB', fallback=0)
+
+        return int(cls._CONFIG['default'].getfloat('TRIAGE_MAX_FILE_MB', fallback=fallback) * 1024 ** 2) or None
+
+    @classmethod
+    def get_all_matches(cls) -> bool:
+        """
+        Return whether every match of a regex in a file is reported, instead of only the first one
+
+        Returns
+        ----------
+        bool
+            True if every distinct match is reported
+
+        """
+        return cls._CONFIG['default'].getboolean('ALL_MATCHES', fallback=False)
+
+    @classmethod
+    def get_max_matches_per_file(cls) -> int | None:
+        """
+        Return the maximum number of matches reported for a file
+
+        Returns
+        ----------
+        int | None
+            Number of matches, None for no limit
+
+        """
+        return cls._CONFIG['default'].getint('MAX_MATCHES_PER_FILE', fallback=500) or None
+
+    @classmethod
+    def get_max_matches_per_pattern(cls) -> int | None:
+        """
+        Return the maximum number of matches of a single regex reported for a file
+
+        Returns
+        ----------
+        int | None
+            Number of matches, None for no limit
+
+        """
+        return cls._CONFIG['default'].getint('MAX_MATCHES_PER_PATTERN', fallback=50) or None
+
+    @classmethod
+    def get_output_formats(cls) -> list[str]:
+        """
+        Return the machine readable formats the findings are written in, next to the results file
+
+        Returns
+        ----------
+        list[str]
+            Formats, "jsonl" and/or "sarif"
+
+        Raises
+        ----------
+        ValueError
+            If a format is not supported
+
+        """
+        p = cls._CONFIG['default'].get('OUTPUT_FORMATS', '')
+        formats = [fmt.strip().lower() for fmt in p.split(',') if fmt.strip()]
+
+        for fmt in formats:
+            if fmt not in ('jsonl', 'sarif'):
+                raise ValueError(f"OUTPUT_FORMATS must be jsonl and/or sarif, not {fmt}")
+
+        return formats
+
+    @classmethod
+    def get_batch_decompile_jobs(cls) -> int:
+        """
+        Return the maximum number of decompilers running at once in batch mode
+
+        Returns
+        ----------
+        int
+            Number of decompilers, i.e. jadx processes
+
+        """
+        return max(cls._CONFIG['default'].getint('BATCH_DECOMPILE_JOBS', fallback=2), 1)
+
+    @classmethod
+    def get_batch_scan_jobs(cls) -> int:
+        """
+        Return the maximum number of apps searched at once in batch mode
+
+        Returns
+        ----------
+        int
+            Number of apps, each searched by its own pool of scanner workers
+
+        """
+        return max(cls._CONFIG['default'].getint('BATCH_SCAN_JOBS', fallback=2), 1)
+
+    @classmethod
+    def get_profile(cls) -> bool:
+        """
+        Return whether the time spent in each stage, file type and regex is recorded
+
+        Returns
+        ----------
+        bool
+            True if profiling is enabled
+
+        """
+        return cls._CONFIG['default'].getboolean('PROFILE', fallback=False)
+
+    @classmethod
+    def get_profile_top(cls) -> int:
+        """
+        Return the number of regexes and file types shown in the profile tables
+
+        Returns
+        ----------
+        int
+            Number of rows
+
+        """
+        return cls._CONFIG['default'].getint('PROFILE_TOP', fallback=20)
+
+    @classmethod
+    def get_regex_lint(cls) -> str:
+        """
+        Return what is done with the constructs of the regexes known to backtrack for a long time
+
+        Returns
+        ----------
+        str
+            "rewrite" to rewrite them when possible, "warn" to only log them,
+            "off" to do neither
+
+        Raises
+        ----------
+        ValueError
+            If the value is not supported
+
+        """
+        p = cls._CONFIG['default'].get('REGEX_LINT', 'rewrite').lower()
+
+        if p not in ('rewrite', 'warn', 'off'):
+            raise ValueError(f"REGEX_LINT must be one of ['rewrite', 'warn', 'off'], not {p}")
+
+        return p
+
+    @classmethod
+    def get_pattern_time_budget(cls) -> float | None:
+        """
+        Return the time a regex can spend searching a file before it is abandoned
+
+        Returns
+        ----------
+        float | None
+            Time in seconds, None for no limit
+
+        """
+        return cls._CONFIG['default'].getfloat('PATTERN_TIMEOUT_S', fallback=10) or None
+
+    @classmethod
+    def get_file_time_budget(cls) -> float | None:
+        """
+        Return the time the regexes can spend searching a file before the rest of it is skipped
+
+        Returns
+        ----------
+        float | None
+            Time in seconds, None for no limit
+
+        """
+        return cls._CONFIG['default'].getfloat('FILE_TIMEOUT_S', fallback=60) or None
+
+    @classmethod
+    def get_dedup_content(cls) -> bool:
+        """
+        Return whether files with identical contents are only searched once,
+        their findings being reported at every copy
+
+        Returns
+        ----------
+        bool
+            True if identical contents are searched once
+
+        """
+        return cls._CONFIG['default'].getboolean('DEDUP_CONTENT', fallback=False)
+
+
+    @classmethod
+    def get_findings_cache_enabled(cls) -> bool:
+        """
+        Return whether the findings of file contents are cached between scans
+
+        Returns
+        ----------
+        bool
+            True if findings are cached
+
+        """
+        return cls._CONFIG['default'].getboolean('FINDINGS_CACHE', fallback=False)
+
+
+    @classmethod
+    def get_findings_cache_size(cls) -> int:
+        """
+        Return the maximum size of the findings cache
+
+        Returns
+        ----------
+        int
+            Maximum size of the findings cache in bytes
+
+        """
+        return cls._CONFIG['default'].getint('FINDINGS_CACHE_MAX_MB', fallback=256) * 1024 * 1024
+
+
+    @classmethod
+    def get_daemon_socket(cls) -> str:
+        """
+        Return the path of the Unix domain socket the daemon listens on
+
+        Returns
+        ----------
+        str
+            Path of the socket, OUTDIR_PATH/appalyzer.sock by default
+
+        """
+        p = cls._CONFIG['default'].get('DAEMON_SOCKET', '').strip()
+
+        return p if p else str(Path(cls.get_outdir_path()).joinpath("appalyzer.sock"))
+
+
+    @classmethod
+    def get_daemon_port(cls) -> int | None:
+        """
+        Return the localhost port the daemon listens on instead of the Unix domain socket
+
+        Returns
+        ----------
+        int | None
+            TCP port on 127.0.0.1, None to listen on the Unix domain socket
+
+        """
+        p = cls._CONFIG['default'].getint('DAEMON_PORT', fallback=0)
+
+        return p if p > 0 else None
+
+
+    @classmethod
+    def get_daemon_jobs(cls) -> int:
+        """
+        Return the maximum number of jobs the daemon runs at once
+
+        Returns
+        ----------
+        int
+            Number of jobs, sharing the daemon's pool of scanner workers
+
+        """
+        return max(cls._CONFIG['default'].getint('DAEMON_JOBS', fallback=2), 1)
+
+
+    @classmethod
+    def get_pipeline_decompile(cls) -> bool:
+        """
+        Return whether decompiled files are searched while the decompiler is still running
+
+        Returns
+        ----------
+        bool
+            True to search the files as they are written
+
+        """
+        return cls._CONFIG['default'].getboolean('PIPELINE_DECOMPILE', fallback=False)
+
+
+    @classmethod
+    def get_pipeline_poll_interval(cls) -> float:
+        """
+        Return how often the output of a running decompiler is checked for complete files
+
+        Returns
+        ----------
+        float
+            Seconds between two checks, a file is complete once it did not change between two checks
+
+        """
+        return max(cls._CONFIG['default'].getfloat('PIPELINE_POLL_S', fallback=1.0), 0.1)
+
+
+    @classmethod
+    def get_apk_scan_mode(cls) -> str:
+        """
+        Return how apk files are searched
+
+        Returns
+        ----------
+        str
+            "decompile" to search the app decompiled by jadx,
+            "dex" to only search the string pools of its dex files or
+            "both" to search the string pools while jadx decompiles the app
+
+        Raises
+        ----------
+        ValueError
+            If the mode is not supported
+
+        """
+        p = cls._CONFIG['default'].get('APK_SCAN_MODE', 'decompile').lower()
+
+        if p not in ('decompile', 'dex', 'both'):
+            raise ValueError(f"APK_SCAN_MODE must be one of ['decompile', 'dex', 'both'], not {p}")
+
+        return p
+
+
+    @classmethod
+    def get_dll_scan_mode(cls) -> str:
+        """
+        Return how .Net DLLs are searched
+
+        Returns
+        ----------
+        str
+            "decompile" to search the DLL decompiled by ilspycmd,
+            "metadata" to only search the strings of its metadata and resources or
+            "both" to search the strings while ilspycmd decompiles the DLL
+
+        Raises
+        ----------
+        ValueError
+            If the mode is not supported
+
+        """
+        p = cls._CONFIG['default'].get('DLL_SCAN_MODE', 'decompile').lower()
+
+        if p not in ('decompile', 'metadata', 'both'):
+            raise ValueError(f"DLL_SCAN_MODE must be one of ['decompile', 'metadata', 'both'], not {p}")
+
+        return p
+
+
+    @classmethod
+    def get_archive_max_depth(cls) -> int:
+        """
+        Return how deep archives nested in the scanned files are expanded
+
+        Returns
+        ----------
+        int
+            Number of levels of nested archives, 0 to search nested archives
+            by their strings only
+
+        """
+        return max(cls._CONFIG['default'].getint('ARCHIVE_MAX_DEPTH', fallback=3), 0)
+
+    @classmethod
+    def get_archive_max_expanded_size(cls) -> int:
+        """
+        Return the maximum size expanded from the archives nested in a file
+
+        Returns
+        ----------
+        int
+            Size in bytes
+        """
+        return int(cls._CONFIG['default'].getfloat('ARCHIVE_MAX_EXPANDED_MB', fallback=512) * 1024 ** 2)
+
+    @classmethod
+    def get_archive_max_members(cls) -> int:
+        """
+        Return the maximum number of members expanded from the archives nested in a file
+
+        Returns
+        ----------
+        int
+            Number of members
+        """
+        return cls._CONFIG['default'].getint('ARCHIVE_MAX_MEMBERS', fallback=10000)
@@ -1,16 +1,210 @@
 """Base class used to decompile and search for secrets in applications"""
+import codecs
+import collections
+import contextlib
+import dataclasses
 import datetime
+import functools
 import json
 import shutil
-import re
 import logging
-import subprocess
 import hashlib
+import itertools
+import mmap
+import os
+import re
 import concurrent.futures
+import shlex
+import signal
+import subprocess
+import tempfile
+import threading
+import time
 from pathlib import Path
-import magic
+from typing import BinaryIO, Callable, Iterable, Iterator
+from zipfile import BadZipFile, ZipFile, ZipInfo
 from AppAnalyzerConfig import AppAnalyzerConfig
-from AppalyzerObjects import RegExMatchPosition, RegExMatch
+from AppalyzerObjects import ArchiveBudget, RegExMatchPosition, RegExMatch
+from DecompileCache import DecompileCache
+from FileClassifier import FileClassifier
+from FindingsCache import FindingsCache
+from FindingsEmitter import EMITTERS
+from FindingsSpool import FindingsSpool
+from MatcherEngine import MatcherEngine
+from ScanProfiler import ScanProfiler
+from StringsExtractor import StringsExtractor, StringsMap, OffsetMap
+from TriagePolicy import TriagePolicy
+
+# Per thread handles of the archives being searched, (thread id, path) -> (stat, handle),
+# closed once no search of the archive is running
+_ARCHIVES = {}
+_ARCHIVE_SEARCHES = collections.Counter()
+_ARCHIVES_LOCK = threading.Lock()
+
+# Analyzer used by each scanner worker process
+_WORKER_ANALYZER = None
+
+# Stage used when profiling is disabled
+_NO_PROFILE = contextlib.nullcontext()
+
+# Regexes file -> (modification stamp, lint mode, regexes, engine), so
+# analyzers created by the same process, i.e. the daemon, share the compiled regexes
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+# Whether SIGALRM interrupts the regexes running out of time, only
+# possible in the main thread of a scanner worker process
+_ALARM_ENABLED = False
+
+
+class MatchTimeout(Exception):
+    """
+    Raised when a regular expression runs out of its time budget
+    """
+
+
+def _on_alarm(signum:int, frame:any) -> None:
+    """
+    Interrupt the regular expression running in the scanner worker process
+    """
+    raise MatchTimeout()
+
+
+def _time_limit(seconds:float | None) -> contextlib.AbstractContextManager:
+    """
+    Return a context manager interrupting a regular expression still running
+    after some time, which does nothing in threads or without a time limit
+    """
+    if not _ALARM_ENABLED or seconds is None:
+        return contextlib.nullcontext()
+
+    return _alarm(seconds)
+
+
+@contextlib.contextmanager
+def _alarm(seconds:float) -> Iterator[None]:
+    """
+    Raise MatchTimeout in the main thread after some time
+    """
+    signal.setitimer(signal.ITIMER_REAL, max(seconds, 0.001))
+
+    try:
+        yield
+
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _get_archive(archive:str) -> ZipFile:
+    """
+    Return the handle of the current thread to an archive
+
+    The handle is opened again once the archive changed, i.e. replaced at
+    the same path between two jobs of the daemon
+    """
+    stat = os.stat(archive)
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    key = (threading.get_ident(), str(archive))
+
+    with _ARCHIVES_LOCK:
+        cached = _ARCHIVES.get(key)
+
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    if cached:
+        cached[1].close()
+
+    zfile = ZipFile(archive, mode='r')
+
+    with _ARCHIVES_LOCK:
+        _ARCHIVES[key] = (stamp, zfile)
+
+    return zfile
+
+
+def _closing_archive(archive:str, results:Iterator[dict[str, RegExMatch]]) -> Iterator[dict[str, RegExMatch]]:
+    """
+    Yield the results of a search of an archive, then close the handles of
+    the scanner threads to it unless another search of it is running
+    """
+    with _ARCHIVES_LOCK:
+        _ARCHIVE_SEARCHES[str(archive)] += 1
+
+    try:
+        yield from results
+
+    finally:
+        with _ARCHIVES_LOCK:
+            _ARCHIVE_SEARCHES[str(archive)] -= 1
+
+            if _ARCHIVE_SEARCHES[str(archive)] > 0:
+                handles = []
+
+            else:
+                del _ARCHIVE_SEARCHES[str(archive)]
+                handles = [_ARCHIVES.pop(key)[1] for key in list(_ARCHIVES) if key[1] == str(archive)]
+
+        for zfile in handles:
+            zfile.close()
+
+
+def _init_worker(analyzer:"Appalyzer") -> None:
+    """
+    Initialize a scanner worker process with its own copy of the analyzer
+    """
+    global _WORKER_ANALYZER, _ALARM_ENABLED
+    _WORKER_ANALYZER = analyzer
+
+    # Files are searched in the main thread of the worker, where the
+    # regexes running out of time can be interrupted
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _on_alarm)
+        _ALARM_ENABLED = True
+
+    # Only send back what this worker records
+    analyzer._collect_records()
+
+
+def _scan_batch(finder:str, args:tuple, batch:list) -> tuple[list[dict[str, RegExMatch]], dict[str, any]]:
+    """
+    Search a batch of files, or archive members, in a scanner worker process
+
+    Returns the matches and what the worker recorded while searching the batch
+    """
+    results = (getattr(_WORKER_ANALYZER, finder)(item, *args) for item in batch)
+    results = [matches for matches in results if matches]
+
+    return results, _WORKER_ANALYZER._collect_records()
+
+
+def _as_completed(executor:concurrent.futures.Executor, fn:Callable, items:list,
+                  max_pending:int) -> Iterator[any]:
+    """
+    Submit the items to the executor and yield the results as they complete,
+    keeping at most max_pending items in flight so results are not held in
+    memory.  Items not yet started are cancelled if the caller stops early
+    """
+    pending = set()
+
+    try:
+        for item in items:
+            pending.add(executor.submit(fn, item))
+
+            if len(pending) >= max_pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+    finally:
+        for future in pending:
+            future.cancel()
+
 
 class Appalyzer():
     """
@@ -23,6 +217,9 @@ class Appalyzer():
     TRUNCATE_LINE = 100
     TRUNCATE_SECRET = 80
     TRUNCATE_OFFSET = 80
+    PROCESS_BATCH_SIZE = 64
+    ZIP_MAGIC = (b"PK\x03\x04", b"PK\x05\x06")
+    MAX_PENDING_PER_WORKER = 4
 
     def __init__(self, app:str, regexfile:str=None):
         """        
@@ -36,16 +233,122 @@ class Appalyzer():
         self._time_now = datetime.datetime.now().strftime("%d-%m-%y_%H%M")
         self._outdir = Path(self._config.get_outdir_path())
         self._regexes = None
+        self._engine = None
         self._curdir = Path().absolute()
         self._apptype = None
         self.app = Path(app)
         self._is_dir = bool(self.app.is_dir())
         self.outfile =  self.app.parent.joinpath(f"{self.app.name}_{self._time_now}_results.out")
+        self._scan_backend = self._config.get_scan_backend()
+        self._scan_workers = self._config.get_scan_workers()
+        self._strings = StringsExtractor(self._config.get_strings_min_length())
+        self._classifier = FileClassifier()
+        self._large_file_size = self._config.get_large_file_size()
+        self._scan_window = self._config.get_scan_window_size()
+        self._scan_overlap = self._config.get_scan_overlap_size()
+        self._triage = TriagePolicy.from_config(self._config)
+        self._dedup_content = self._config.get_dedup_content()
+        self._all_matches = self._config.get_all_matches()
+        self._max_file_matches = self._config.get_max_matches_per_file()
+        self._max_pattern_matches = self._config.get_max_matches_per_pattern()
+        self._output_formats = self._config.get_output_formats()
+        self._decompile_limit = contextlib.nullcontext()
+        self._scan_limit = contextlib.nullcontext()
+        self._executor = None
+        self.finding_counts = {}
+        self._profiler = ScanProfiler() if self._config.get_profile() else None
+        self._profile_top = self._config.get_profile_top()
+        self._pattern_budget = self._config.get_pattern_time_budget()
+        self._file_budget = self._config.get_file_time_budget()
+
+        if self._scan_backend == "thread" and (self._pattern_budget or self._file_budget):
+            Appalyzer.logger.info("[*]SCAN_BACKEND=thread can't interrupt a runaway regex, "
+                                  "it is only given up on once it returns")
+
+        self.timeouts = []
+        self._truncated = []
+        self._file_hashes = None
+        self._content_hashes = {}
+        self._decompile_cache = None
+        self._findings_cache = None
+        self._pipeline = self._config.get_pipeline_decompile()
+        self._pipeline_poll = self._config.get_pipeline_poll_interval()
+        self._archive_depth = self._config.get_archive_max_depth()
+        self._archive_expanded = self._config.get_archive_max_expanded_size()
+        self._archive_members = self._config.get_archive_max_members()
+        self._decompiler = None
+        self._workdir = None
+
+        if self._config.get_decompile_cache_enabled():
+            self._decompile_cache = DecompileCache(self._outdir.joinpath("decompile_cache"),
+                                                   self._config.get_decompile_cache_size())
+
+        # Compile the regexes once for the whole run
+        self._regexes, self._engine = self.__load_engine(regexfile or self._config.get_regex_path(),
+                                                         self._config.get_regex_lint())
+
+        if self._config.get_findings_cache_enabled():
+            self._findings_cache = FindingsCache(self._outdir.joinpath(FindingsCache.FILENAME),
+                                                 self._config.get_findings_cache_size())
+            self._scan_fingerprint = self._get_scan_fingerprint()
+
+
+    def _stage(self, name:str) -> contextlib.AbstractContextManager:
+        """
+        Return a context manager recording the time spent in a stage of the
+        scan, which does nothing unless profiling is enabled
 
-        if regexfile:
-            self._regexes = self.__process_regex_file(regexfile)
-        else:
-            self._regexes = self.__process_regex_file(self._config.get_regex_path())
+        Parameters
+        ----------
+        name : str
+            Name of the stage, i.e. "match"
+        """
+        return self._profiler.stage(name) if self._profiler else _NO_PROFILE
+
+
+    def __getstate__(self) -> dict[str, any]:
+        """
+        Stage limits, the shared executor and the running decompiler are only
+        used by the parent process, don't send them to the scanner processes
+        """
+        state = self.__dict__.copy()
+        state["_decompile_limit"] = state["_scan_limit"] = state["_executor"] = None
+        state["_decompiler"] = None
+
+        return state
+
+
+    def set_stage_limits(self, decompile_limit:threading.Semaphore, scan_limit:threading.Semaphore) -> None:
+        """
+        Share limits on the number of decompilers and scans running at once
+        with other analyzers, i.e. when scanning a batch of apps
+
+        Parameters
+        ----------
+        decompile_limit : threading.Semaphore
+            Held while the decompiler runs, cached decompilations don't need it
+
+        scan_limit : threading.Semaphore
+            Held while the files are searched
+        """
+
+        self._decompile_limit = decompile_limit
+        self._scan_limit = scan_limit
+
+
+    def set_executor(self, executor:concurrent.futures.ThreadPoolExecutor) -> None:
+        """
+        Search files with a pool of scanner threads shared with other
+        analyzers, i.e. kept warm by the daemon, instead of starting a pool
+        for each search.  Only used with SCAN_BACKEND=thread
+
+        Parameters
+        ----------
+        executor : concurrent.futures.ThreadPoolExecutor
+            Shared pool of scanner threads
+        """
+
+        self._executor = executor
 
 
     def __str__(self) -> str:
@@ -64,7 +367,7 @@ class Appalyzer():
 
         else:
             filesize = self.get_filesize(self.app, unit="mb")
-            md5sum = self.__get_md5(self.app)
+            md5sum = self._get_file_hashes()["md5"]
             output = f"App: {self.app}\nFile Size: {filesize} mb \
                 \nLocation: {self.app.parent} \
                 \nMD5 Sum: {md5sum}"
@@ -72,22 +375,47 @@ class Appalyzer():
         return output
 
 
-    def __get_md5(self, file: str) -> str:
+    def _get_file_hashes(self) -> dict[str, str]:
+        """
+        Return the md5 and sha256 of the application, reading it only once
+
+        Returns
+        ----------
+        dict[str, str]
+            string representation of hex bytes for the md5 and sha256 values
+        """
+
+        if self._file_hashes is None:
+            md5_hash = hashlib.md5()
+            sha256_hash = hashlib.sha256()
+
+            with open(self.app, "rb") as fd:
+                while chunk := fd.read(1024 * 1024):
+                    md5_hash.update(chunk)
+                    sha256_hash.update(chunk)
+
+            self._file_hashes = {"md5": md5_hash.hexdigest(), "sha256": sha256_hash.hexdigest()}
+
+        return self._file_hashes
+
+
+    def _get_scan_fingerprint(self) -> str:
         """
-        Return the md5 of the given file
+        Return a fingerprint of the regexes and the settings that change what
+        is reported for a file, so stored findings are only reused when they
+        would be found again
 
         Returns
         ----------
         str
-            string representation of hex bytes for md5 value
+            string representation of hex bytes of the sha256 value
         """
-        file_hash = hashlib.md5()
 
-        with open(file, "rb") as fd:
-            while chunk := fd.read(8192):
-                file_hash.update(chunk)
+        settings = [self._engine.fingerprint, self._strings.min_length, self._all_matches,
+                    self._max_file_matches, self._max_pattern_matches, self._triage.fingerprint,
+                    self._archive_depth, self._archive_expanded, self._archive_members]
 
-        return file_hash.hexdigest()
+        return hashlib.sha256(json.dumps(settings).encode("utf-8")).hexdigest()
 
 
     def __process_regex_file(self, regexfile:Path) -> dict[str, any]:
@@ -115,6 +443,43 @@ class Appalyzer():
         return regexes
 
 
+    def __load_engine(self, regexfile:Path, lint:str) -> tuple[dict[str, any], MatcherEngine]:
+        """
+        Return the regular expressions of a file and their compiled engine,
+        reused while the file is not modified
+
+        Parameters
+        ----------
+        regexfile : Path
+            Absolute Path of regular expressions
+
+        lint : str
+            "rewrite", "warn" or "off", see MatcherEngine
+
+        Returns
+        ----------
+        tuple[dict[str, any], MatcherEngine]
+            A json object of regular expressions and their compiled engine
+        """
+
+        stat = Path(regexfile).stat()
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        key = str(Path(regexfile).absolute())
+
+        with _ENGINES_LOCK:
+            cached = _ENGINES.get(key)
+
+            if cached and cached[:2] == (stamp, lint):
+                Appalyzer.logger.info("Reusing %s regular expressions compiled from %s", len(cached[2]), regexfile)
+                return cached[2], cached[3]
+
+            regexes = self.__process_regex_file(regexfile)
+            engine = MatcherEngine(regexes, lint)
+            _ENGINES[key] = (stamp, lint, regexes, engine)
+
+        return regexes, engine
+
+
     def _decompile_app(self) -> None:
         """ 
         Decompile the app and store in directory
@@ -122,6 +487,110 @@ class Appalyzer():
         """
 
 
+    def _run_decompiler(self, tool_path:str, decompile_cmd:Callable[[Path], list[str]]) -> None:
+        """
+        Decompile the app to self._outdir
+
+        When the decompile cache is enabled, an output tree from a previous run
+        with the same app contents, decompiler version and flags is reused
+
+        Parameters
+        ----------
+        tool_path : str
+            Path of the decompiler binary
+
+        decompile_cmd : Callable[[Path], list[str]]
+            Function returning the decompile command for a given output directory
+        """
+
+        workdir = None
+        key = None
+
+        if self._decompile_cache:
+
+            # The cache key is made of the command without the input and output paths
+            placeholder = Path("{outdir}")
+            flags = [arg for arg in decompile_cmd(placeholder)
+                     if arg not in (str(placeholder), str(self.app))]
+
+            tool_version = DecompileCache.get_tool_version(tool_path)
+            key = self._decompile_cache.key(self._get_file_hashes()["sha256"], tool_version, flags)
+
+            cached = self._decompile_cache.get(key)
+
+            if cached:
+                Appalyzer.logger.info("Reusing decompiled app %s from %s", self.app.name, cached)
+                self._outdir = cached
+                return
+
+            workdir = self._decompile_cache.reserve(key)
+
+        else:
+            # Create the temp directory
+            workdir = self._outdir.joinpath(f"{self.app.stem}",
+                                            f"{self.app.stem}_{self._time_now}")
+            workdir.mkdir(parents=True, exist_ok=True)
+
+        cmd = decompile_cmd(workdir)
+
+        Appalyzer.logger.info("Decompiling %s... This may take awhile...", self.app.name)
+        Appalyzer.logger.debug("Decompile command: \"%s\"", shlex.join(cmd))
+
+        # Held until the decompiler exits, which is after the search started when pipelined
+        decompiling = contextlib.ExitStack()
+        decompiling.enter_context(self._decompile_limit)
+        decompiling.enter_context(self._stage("decompile"))
+
+        try:
+            proc = subprocess.Popen(cmd)
+
+        except OSError:
+            decompiling.close()
+            if self._decompile_cache:
+                shutil.rmtree(workdir, ignore_errors=True)
+            raise
+
+        def finish(complete:bool) -> None:
+            decompiling.close()
+
+            if proc.returncode:
+                Appalyzer.logger.warning("[!]Decompiling %s failed with exit code %s, searching its partial output",
+                                         self.app.name, proc.returncode)
+
+            # The output tree is only stored once every file was searched, and
+            # when the decompiler succeeded, a failed or killed run is not reused
+            if self._decompile_cache and complete and proc.returncode == 0:
+                info = {"app": str(self.app), "tool": str(tool_path), "command": cmd,
+                        "returncode": proc.returncode}
+                self._outdir = self._decompile_cache.commit(key, workdir, info)
+                self._workdir = None
+
+            elif self._decompile_cache and not complete:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        # Only the temporary directory of this run is removed by cleanup, not the cache
+        self._workdir = workdir
+        self._outdir = workdir
+
+        # The files are searched as the decompiler writes them, see _search_pipelined
+        if self._pipeline:
+            outdir = self._decompile_cache.entry_path(key) if self._decompile_cache else workdir
+            self._decompiler = (proc, workdir, outdir, decompiling.close, finish)
+            return
+
+        try:
+            proc.wait()
+
+        except BaseException:
+            # Interrupted, i.e. Ctrl-C, don't leave the decompiler running
+            proc.kill()
+            proc.wait()
+            finish(False)
+            raise
+
+        finish(True)
+
+
     def _write_header(self) -> None:
         """
         Write a header to the outputfile
@@ -137,21 +606,22 @@ class Appalyzer():
 
     def _run_strings(self, afile:str) -> str:
         """
-        Run strings on a file
-        """
-
-        outfile = f"{afile}.strings"
+        Extract the printable strings of a file, like running strings on it
 
-        Appalyzer.logger.debug("Running strings on %s", afile)
+        Parameters
+        ----------
+        afile : str
+            Path of the file
 
-        with open(outfile, "w", encoding="utf-8") as fd:
-            strcmd = ["strings", "-a", str(afile)]
-            proc = subprocess.Popen(strcmd, stdout=fd)
-            proc.wait()
+        Returns
+        ----------
+        str
+            Printable ASCII and UTF-16LE strings, one per line
+        """
 
-        Appalyzer.logger.debug("Strings written to %s", outfile)
+        Appalyzer.logger.debug("Running strings on %s", afile)
 
-        return outfile
+        return self._strings.extract_file(afile)
 
 
     def _get_dir_listing(self, target_dir:str) -> list[str]:
@@ -180,226 +650,2029 @@ class Appalyzer():
         return file_list
 
 
-    def _finder(self, filename:str, parent_dir:str, regex_dict:dict[str:str]) -> dict[str, RegExMatch]:
+    def _add_match(self, matches:dict[str, RegExMatch], filename:str, rel_path:str,
+                   name:str, mo:re.Match, content:str, offset_map:OffsetMap = None,
+                   latin1:bool = False) -> bool:
         """
-        Search through directory using regular expressions
+        Save a regex match found in a file, unless it was already found
+
+        The context of the match is only computed once the match is known to be new
 
         Parameters
         ----------
-        pattern : str
-            Regular expression to match on
+        matches : dict[str, RegExMatch]
+            Matches found in the file so far
 
-        path : str
-            Directory of files to search through            
+        filename : str
+            File the match was found in
 
-        Returns
-        ----------
-        dict[str, tuple[str, str]
-            List of matches
-        """
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
 
-        matches = {}
+        name : str
+            Name of the regular expression
 
-        # Dont Scan the logger or output file
-        if (Appalyzer.LOGGER_FILENAME in filename.name) or (self.outfile.name in filename.name):
-            Appalyzer.logger.debug("[*]Skipping scanning for %s", filename)
-            return None
+        mo : re.Match
+            The match
 
-        # Get the file type, run strings on non-text files
-        m = magic.Magic(mime=True)
+        content : str
+            Content that was searched
 
-        mimetype = m.from_file(filename)
+        offset_map : OffsetMap
+            Map from positions in the content to offsets in the file, None
+            if the positions are already offsets in the content
 
-        try:
+        latin1 : bool
+            The content was decoded as latin-1 to keep positions equal to file offsets
 
-            Appalyzer.logger.debug("[*]%s mimetype is %s", filename, mimetype)
+        Returns
+        ----------
+        bool
+            True if the match was saved, False if it was already found
+        """
 
-            if 'text' in mimetype:
-                with open(filename, "r", encoding="utf-8", errors='ignore') as fd:
-                    content = fd.read()
+        s = f"{str(filename)}{mo.group()}"
+        h = hashlib.md5(s.encode('utf-8')).hexdigest()
 
-            else:
-                strings_filename = self._run_strings(filename)
-                with open(strings_filename, "r", encoding="utf-8", errors='ignore') as fd:
-                    content = fd.read()
+        if h in matches:
+            return False
 
-        except Exception as err:
-            Appalyzer.logger.error("\n[!]Error: %s\n", err)
+        left_pos = mo.start()
+        right_pos = mo.end()
 
-        else:
-            for name, pattern in regex_dict.items():
+        # Calculate some context to save
+        content_lenth = len(content)
 
-                try:
-                    matcher = re.compile(pattern)
+        if content_lenth > Appalyzer.TRUNCATE_LINE:
 
-                except Exception as err:
-                    Appalyzer.logger.error("\n[!]Error: %s\n", err)
+            left_pos = left_pos - Appalyzer.TRUNCATE_OFFSET
+            right_pos = right_pos + Appalyzer.TRUNCATE_OFFSET
 
-                else:
+            # Do some checking to make sure we don't go out of bounds
+            left_pos = max(left_pos, 0)
+            right_pos = min(right_pos, content_lenth)
 
-                    mo = matcher.search(content)
+        m = content[left_pos:right_pos]
+        secret = mo.group()
 
-                    if mo:
-                        s = f"{str(filename)}{mo.group()}"
-                        h = hashlib.md5(s.encode('utf-8')).hexdigest()
+        if latin1:
+            m = m.encode("latin-1").decode("utf-8", errors="ignore")
+            secret = secret.encode("latin-1").decode("utf-8", errors="ignore")
 
-                        rel_path = Path(filename).relative_to(parent_dir)
+        secret_pos = RegExMatchPosition(mo.start(), mo.end())
 
-                        if h not in matches:
+        if offset_map:
+            left_pos = offset_map.to_origin(left_pos)
+            right_pos = offset_map.to_origin(right_pos)
+            secret_pos = RegExMatchPosition(offset_map.to_origin(mo.start()), offset_map.to_origin(mo.end()))
 
-                            left_pos = mo.start()
-                            right_pos = mo.end()
+        Appalyzer.logger.debug("\n\nMatch Found:\n\t%s\n\t%s\n\t%s\n\n",
+                               name, rel_path, secret)
 
-                            # Calculate some context to save
-                            content_lenth = len(content)
+        a_match = RegExMatch(rel_path=rel_path,
+                            absolute_path=filename,
+                            line_match=m.strip(),
+                            regex_match=secret,
+                            regex_name=name.strip(),
+                            match_pos=RegExMatchPosition(left_pos, right_pos),
+                            secret_pos=secret_pos,
+                            secret_unit="byte" if offset_map else "char")
 
-                            if content_lenth > Appalyzer.TRUNCATE_LINE:
+        matches[h] = a_match
 
-                                left_pos = left_pos - Appalyzer.TRUNCATE_OFFSET
-                                right_pos = right_pos + Appalyzer.TRUNCATE_OFFSET
+        return True
 
-                                # Do some checking to make sure we don't go out of bounds
-                                left_pos = max(left_pos, 0)
-                                right_pos = min(right_pos, content_lenth)
 
-                            m = content[left_pos:right_pos]
+    def _mmap_windows(self, mm:mmap.mmap) -> Iterator[tuple[int, int, bytes]]:
+        """
+        Split memory mapped data into overlapping windows
 
-                            Appalyzer.logger.debug("\n\nMatch Found:\n\t%s\n\t%s\n\t%s\n\n",
-                                                   name, rel_path, mo.group())
+        Parameters
+        ----------
+        mm : mmap.mmap
+            Memory mapped file
 
-                            a_match = RegExMatch(rel_path=rel_path,
-                                                absolute_path=filename,
-                                                line_match=m.strip(),
-                                                regex_match=mo.group(),
-                                                regex_name=name.strip(),
-                                                match_pos=RegExMatchPosition(left_pos, right_pos))
+        Returns
+        ----------
+        Iterator[tuple[int, int, bytes]]
+            Offset of the window, offset of the data and the data, which
+            includes overlap bytes before and after the window
+        """
 
-                            matches[h] = a_match
+        window = self._scan_window
+        overlap = self._scan_overlap
 
-        return matches
+        for start in range(0, len(mm), window):
+            data_start = max(start - overlap, 0)
+            yield start, data_start, mm[data_start:start + window + overlap]
 
 
-    def _extract(self, matches:list[RegExMatch]) -> None:
+    def _stream_windows(self, fd:BinaryIO) -> Iterator[tuple[int, int, bytes]]:
         """
-        Process any matches that have been found
+        Split a stream, i.e. an archive member, into overlapping windows
 
         Parameters
         ----------
-        matches : list[RegExMatch]
-            list of all the matches
+        fd : BinaryIO
+            Stream to read
+
+        Returns
+        ----------
+        Iterator[tuple[int, int, bytes]]
+            Offset of the window, offset of the data and the data, which
+            includes overlap bytes before and after the window
         """
 
-        if len(matches):
+        window = self._scan_window
+        overlap = self._scan_overlap
 
-            # Sort the matches by regex hit
-            sorted_matches: dict[str, list] = {}
-            for match in matches:
+        start = 0
+        lead = b""
+        buffer = fd.read(window + overlap)
 
-                for _, matchobj in match.items():
+        while buffer:
+            yield start, start - len(lead), lead + buffer
 
-                    regex_name = matchobj.regex_name
+            if len(buffer) <= window:
+                break
 
-                    if regex_name in sorted_matches:
+            lead = buffer[max(window - overlap, 0):window]
+            buffer = buffer[window:] + fd.read(window)
+            start += window
 
-                        l = sorted_matches[regex_name]
-                        l.append(matchobj)
-                        sorted_matches[regex_name] = l
 
-                    else:
-                        sorted_matches[regex_name] = [matchobj]
+    def _scan_windows(self, windows:Iterator[tuple[int, int, bytes]], filename:str,
+                      rel_path:str, is_text:bool) -> dict[str, RegExMatch]:
+        """
+        Search through a large file in windows, so memory used does not
+        depend on the size of the file
 
-            # Write results to file
-            with open(self.outfile, "a", encoding="utf-8") as fd:
+        Consecutive windows overlap so a match crossing the boundary between
+        two windows is still found, and only reported by the window it starts in.
+        Reported positions are offsets in the file.
 
-                # iterate through sorted matches
-                for key, matchlist in sorted_matches.items():
+        Parameters
+        ----------
+        windows : Iterator[tuple[int, int, bytes]]
+            Windows of the file, from _mmap_windows or _stream_windows
 
-                    fd.write(f"[+]{key}\n")
-                    fd.write(f"{Appalyzer.SECTION_BREAK}\n")
+        filename : str
+            File to search through
 
-                    for matchobj in matchlist:
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
 
-                        regex_name = matchobj.regex_name
-                        secret = matchobj.regex_match
-                        line = matchobj.line_match
-                        rel_path = matchobj.rel_path
+        is_text : bool
+            Search the text of the file, otherwise search its printable strings
 
-                        fd.write(f"- PATH: {rel_path}\
-                                    \n  RegEx: {regex_name}\
-                                    \n  SECRET: {secret.strip()}\
-                                    \n  LINE: {line}\n\n")
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the file
+        """
 
-                    fd.write(f"{Appalyzer.SECTION_BREAK}\n")
+        matches = {}
+        counts = collections.Counter()
+        deadline = self._file_deadline()
 
-    def _search(self, scan_dir:str) -> None:
+        Appalyzer.logger.debug("[*]Scanning large file %s in windows of %s bytes",
+                               filename, self._scan_window)
 
-        # Walk directory and save all the file paths
-        file_list = self._get_dir_listing(scan_dir)
+        for start, data_start, data in windows:
 
-        Appalyzer.logger.info("Scanning Directory: %s", Path(scan_dir).absolute())
-        Appalyzer.logger.info(" ** Be patient...  This could take a while...")
+            # The data before the window is kept for lookbehinds and
+            # the data after the window for matches crossing the boundary
+            with self._stage("extract"):
+                if is_text:
+                    content = data.decode("latin-1")
+                    offset_map = OffsetMap()
+                    offset_map.add(0, data_start)
 
-        with concurrent.futures.ThreadPoolExecutor(thread_name_prefix='LocalSecretScanner_') as executor:
-            results = list(executor.map(self._finder, file_list,
-                                        [scan_dir]*len(file_list),
-                                        [self._regexes]*len(file_list)))
+                else:
+                    content, offset_map = self._strings.extract_mapped(data, data_start)
 
-        # Filter all the empty results
-        results = list(filter(None, results))
+            del data
 
-        # Extract all the matches and write to the output file
-        self._extract(results)
+            # Matches starting in the overlap belong to the next window
+            if not self._match_content(matches, counts, content, filename, rel_path,
+                                       pos=offset_map.to_position(start),
+                                       window_end=start + self._scan_window,
+                                       offset_map=offset_map, latin1=is_text, deadline=deadline):
+                break
 
+        return matches if is_text else Appalyzer._without_secret_pos(matches)
 
-    def get_filesize(self, file_path:str, unit:str = 'bytes') -> int:
+
+    def _match_content(self, matches:dict[str, RegExMatch], counts:collections.Counter,
+                       content:str, filename:str, rel_path:str, pos:int = 0,
+                       window_end:int = None, offset_map:OffsetMap = None,
+                       latin1:bool = False, deadline:float = None) -> bool:
         """
-        Get the size of a file
+        Search content with the regular expressions and save the new matches
+
+        Every distinct match is saved when ALL_MATCHES is enabled, otherwise only
+        the first match of each regex.  The number of matches saved for a file,
+        and for each regex in a file, is capped to protect against pathological files
+
+        Each regex has a time budget, and all of them together a time budget per
+        file.  A regex running out of time is abandoned, it is interrupted in
+        scanner worker processes and given up on once it returns in threads.
+        The matches found before are kept and the timeout is recorded
 
         Parameters
         ----------
-        file_path : str
-            Absolute Path of the file
+        matches : dict[str, RegExMatch]
+            Matches found in the file so far
 
-        unit : str
-            Size to return.  Valid selections are
-                ['bytes', 'kb', 'mb', 'gb']
-                Default is bytes
+        counts : collections.Counter
+            Number of matches saved for each regex in the file so far
+
+        content : str
+            Content to search
+
+        filename : str
+            File the content was read from
+
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        pos : int
+            Position in the content to start searching from
+
+        window_end : int
+            Offset in the file of the end of the window being searched, matches
+            starting after it are ignored.  None if the whole file is searched
+
+        offset_map : OffsetMap
+            Map from positions in the content to offsets in the file
+
+        latin1 : bool
+            The content was decoded as latin-1 to keep positions equal to file offsets
+
+        deadline : float
+            Time, from time.perf_counter, the file must be searched by.  None for no limit
 
         Returns
         ----------
-        int
-            size of the file
-
-        Raises
-        ------
-        ValueError
-            If unit is not defined
+        bool
+            False once the maximum number of matches, or the time budget, for the file is reached
         """
 
-        exponents_map = {'bytes': 0, 'kb': 1, 'mb': 2, 'gb': 3}
+        with self._stage("match"):
 
-        if unit not in exponents_map:
-            raise ValueError("Must select from ['bytes', 'kb', 'mb', 'gb']")
+            for name, mos in self._engine.finditer(content, pos):
 
-        file_size = Path(file_path).stat().st_size
-        size = file_size / 1024 ** exponents_map[unit]
+                start_time = time.perf_counter()
+                hits = counts[name]
+                budget = self._pattern_budget
 
-        return round(size, 3)
+                if deadline is not None:
+                    budget = min(budget or deadline - start_time, deadline - start_time)
 
+                if not self._all_matches:
+                    mos = itertools.islice(mos, 1)
 
-    def secret_search(self):
-        """ 
-        Perform secret search
-        """
+                try:
+                    if budget is not None and budget <= 0:
+                        raise MatchTimeout()
 
+                    with _time_limit(budget):
+                        if not self._find_matches(matches, counts, mos, content, filename, rel_path,
+                                                  name, window_end, offset_map, latin1,
+                                                  None if budget is None else start_time + budget):
+                            return False
 
-    def cleanup(self) -> None:
-        """
+                except MatchTimeout:
+                    out_of_file_budget = deadline is not None and time.perf_counter() >= deadline
+                    self._record_timeout(rel_path, name, "file" if out_of_file_budget else "regex",
+                                         time.perf_counter() - start_time)
+
+                    if out_of_file_budget:
+                        return False
+
+                finally:
+                    if self._profiler:
+                        self._profiler.add_pattern(name, time.perf_counter() - start_time,
+                                                   len(content) - pos, counts[name] - hits)
+
+        return True
+
+
+    def _find_matches(self, matches:dict[str, RegExMatch], counts:collections.Counter,
+                      mos:Iterator[re.Match], content:str, filename:str, rel_path:str, name:str,
+                      window_end:int, offset_map:OffsetMap, latin1:bool, deadline:float | None) -> bool:
+        """
+        Save the new matches of a regex, see _match_content
+
+        Raises
+        ----------
+        MatchTimeout
+            If the regex is still running after the deadline
+
+        Returns
+        ----------
+        bool
+            False once the maximum number of matches for the file is reached
+        """
+
+        for mo in mos:
+
+            if deadline is not None and time.perf_counter() > deadline:
+                raise MatchTimeout()
+
+            if window_end is not None and offset_map.to_origin(mo.start()) >= window_end:
+                break
+
+            if self._max_file_matches and len(matches) >= self._max_file_matches:
+                Appalyzer.logger.warning("[!]Reached the limit of %s matches in %s, skipping the rest of the file",
+                                         self._max_file_matches, rel_path)
+                return False
+
+            if self._max_pattern_matches and counts[name] >= self._max_pattern_matches:
+                Appalyzer.logger.info("[!]Reached the limit of %s matches of %s in %s",
+                                      self._max_pattern_matches, name, rel_path)
+                break
+
+            if self._add_match(matches, filename, rel_path, name, mo, content,
+                               offset_map=offset_map, latin1=latin1):
+                counts[name] += 1
+
+        # Threads can't interrupt a regex, at least give up on it once it returns
+        if deadline is not None and time.perf_counter() > deadline:
+            raise MatchTimeout()
+
+        return True
+
+
+    def _file_deadline(self) -> float | None:
+        """
+        Return the time, from time.perf_counter, a file starting to be searched now must be searched by
+        """
+
+        return time.perf_counter() + self._file_budget if self._file_budget else None
+
+
+    def _record_timeout(self, rel_path:str, name:str, budget:str, seconds:float) -> None:
+        """
+        Record a regex that ran out of time in a file
+
+        Parameters
+        ----------
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        name : str
+            Name of the regex
+
+        budget : str
+            "regex" if the regex ran out of its own time budget, "file" if the
+            file ran out of its time budget and the rest of it is skipped
+
+        seconds : float
+            Time the regex ran for
+        """
+
+        if budget == "file":
+            Appalyzer.logger.warning("[!]Ran out of the %ss time budget of %s while running %s, skipping the rest of the file",
+                                     self._file_budget, rel_path, name)
+        else:
+            Appalyzer.logger.warning("[!]Regex %s ran out of its %ss time budget in %s, skipping it",
+                                     name, self._pattern_budget, rel_path)
+
+        self.timeouts.append({"path": str(rel_path), "regex": name, "budget": budget, "seconds": round(seconds, 3)})
+
+
+
+    @staticmethod
+    def _text_encoding(header:bytes) -> str:
+        """
+        Return the encoding of a text file from its byte order mark,
+        i.e. UTF-16 Localizable.strings files in iOS apps
+
+        Parameters
+        ----------
+        header : bytes
+            First bytes of the file
+
+        Returns
+        ----------
+        str
+            Name of the encoding
+        """
+
+        if header.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "utf-16"
+
+        return "utf-8-sig"
+
+
+    def _scan_content(self, content:str, filename:str, rel_path:str,
+                      is_text:bool = False) -> dict[str, RegExMatch]:
+        """
+        Search content using regular expressions
+
+        Parameters
+        ----------
+        content : str
+            Content to search
+
+        filename : str
+            File the content was read from
+
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        is_text : bool
+            The content is the text of the file, so the positions of the
+            secrets are positions in the file
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the content
+        """
+
+        matches = {}
+
+        self._match_content(matches, collections.Counter(), content, filename, rel_path,
+                            deadline=self._file_deadline())
+
+        return matches if is_text else Appalyzer._without_secret_pos(matches)
+
+
+    @staticmethod
+    def _without_secret_pos(matches:dict[str, RegExMatch]) -> dict[str, RegExMatch]:
+        """
+        Drop the positions of the secrets of matches found in content which is
+        not the text of the file, i.e. its printable strings or a conversion
+        """
+        return {key: dataclasses.replace(a_match, secret_pos=None, secret_unit=None)
+                for key, a_match in matches.items()}
+
+
+    def _scan_strings(self, content:str, string_map:StringsMap, filename:str,
+                      rel_path:str) -> dict[str, RegExMatch]:
+        """
+        Search strings extracted from a file, one string per line, reporting
+        each match at the string it was found in
+
+        Parameters
+        ----------
+        content : str
+            Strings to search, separated by new lines
+
+        string_map : StringsMap
+            Map from positions in the content back to the strings
+
+        filename : str
+            File the strings were read from
+
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the strings, at rel_path#<label of the string>
+            with the offsets of the string in the file
+        """
+
+        matches = self._scan_content(content, filename, rel_path)
+
+        for key, a_match in matches.items():
+            # The match starts at or after the start of its context
+            position = content.find(a_match.regex_match, a_match.match_pos.start)
+            index = string_map.index_at(position)
+            start = string_map.position(index)
+            text = content[start:start + string_map.length(index)]
+
+            # Context of the match within the string only
+            if len(text) > Appalyzer.TRUNCATE_LINE:
+                left = max(position - start - Appalyzer.TRUNCATE_OFFSET, 0)
+                text = text[left:position - start + len(a_match.regex_match) + Appalyzer.TRUNCATE_OFFSET]
+
+            matches[key] = dataclasses.replace(a_match, rel_path=f"{rel_path}#{string_map.label(index)}",
+                                               line_match=text.strip(), secret_pos=None, secret_unit=None,
+                                               match_pos=RegExMatchPosition(*string_map.span(index)))
+
+        return matches
+
+
+    def _finder(self, filename:str, parent_dir:str) -> dict[str, RegExMatch]:
+        """
+        Search through directory using regular expressions
+
+        Parameters
+        ----------
+        filename : str
+            File to search through
+
+        parent_dir : str
+            Directory being searched, used to get the relative path of the file
+
+        Returns
+        ----------
+        dict[str, tuple[str, str]
+            List of matches
+        """
+
+        matches = {}
+
+        # Dont Scan the logger or output files
+        if (Appalyzer.LOGGER_FILENAME in filename.name) or filename.name.startswith(self.outfile.stem) \
+                or (filename.name == DecompileCache.MARKER_FILENAME):
+            Appalyzer.logger.debug("[*]Skipping scanning for %s", filename)
+            return None
+
+        start_time = time.perf_counter()
+        filesize = 0
+        mimetype = None
+        content_hash = None
+
+        try:
+
+            rel_path = Path(filename).relative_to(parent_dir)
+            filesize = Path(filename).stat().st_size
+
+            # A file searched by an earlier scan costs a hash and a lookup
+            if self._findings_cache:
+                with self._stage("cache"):
+                    content_hash = self._content_hashes.get(filename) or Appalyzer.hash_file(filename)
+                    cached = self._cache_lookup(content_hash, filename.name, filename, rel_path)
+
+                if cached is not None:
+                    return cached
+
+            # Get the file type, run strings on non-text files
+            with self._stage("type_detect"):
+                with open(filename, "rb") as fd:
+                    header = fd.read(FileClassifier.HEADER_SIZE)
+
+                mimetype = self._classifier.classify(filename.name, header)
+
+            Appalyzer.logger.debug("[*]%s mimetype is %s", filename, mimetype)
+
+            if self._triage.denies_mimetype(mimetype):
+                self._triage.skip("mimetype", rel_path, filesize)
+                return matches
+
+            # Archives in the directory, i.e. jar files or zipped assets, are expanded without extracting them
+            if header.startswith(Appalyzer.ZIP_MAGIC) and self._archive_depth:
+                with self._stage("extract"):
+                    nested = Appalyzer._open_nested(filename)
+
+                if nested is not None:
+                    with nested:
+                        matches = self._search_nested(nested, str(filename), str(rel_path), 1)
+
+                    self._cache_store(content_hash, filename.name, rel_path, matches)
+                    return matches
+
+            if filesize > self._large_file_size:
+                with open(filename, "rb") as fd:
+                    with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        matches = self._scan_windows(self._mmap_windows(mm), filename,
+                                                     rel_path, 'text' in mimetype)
+
+                self._cache_store(content_hash, filename.name, rel_path, matches)
+                return matches
+
+            with self._stage("extract"):
+                is_text = 'text' in mimetype
+
+                if is_text:
+                    encoding = Appalyzer._text_encoding(header)
+
+                    with open(filename, "r", encoding=encoding, errors='ignore') as fd:
+                        content = fd.read()
+
+                else:
+                    content = self._run_strings(filename)
+
+        except Exception as err:
+            Appalyzer.logger.error("\n[!]Error: %s\n", err)
+
+        else:
+            matches = self._scan_content(content, filename, rel_path, is_text)
+            self._cache_store(content_hash, filename.name, rel_path, matches)
+
+        finally:
+            if self._profiler:
+                self._profiler.add_file(mimetype or "unknown", time.perf_counter() - start_time, filesize)
+
+        return matches
+
+
+    def _cache_fingerprint(self, name:str) -> str:
+        """
+        Return the fingerprint findings of a file are cached under
+
+        Besides the regexes and scan settings, the content searched can
+        depend on the extension of the file and on the analyzer, i.e.
+        binary plists are converted to JSON in ipa files
+        """
+
+        key = [self._scan_fingerprint, type(self).__name__, Path(name).suffix.lower()]
+
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+    def _cache_lookup(self, content_hash:str, name:str, filename:str,
+                      rel_path:str) -> dict[str, RegExMatch] | None:
+        """
+        Return the findings of a file from the findings cache
+
+        Parameters
+        ----------
+        content_hash : str
+            sha256 of the content of the file
+
+        name : str
+            Name of the file, or of the archive member
+
+        filename : str
+            Absolute path reported for the file
+
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        Returns
+        ----------
+        dict[str, RegExMatch] | None
+            Matches of the file, None if it is not cached
+        """
+
+        findings = self._findings_cache.lookup(content_hash, self._cache_fingerprint(name))
+
+        if findings is None:
+            return None
+
+        matches = {}
+
+        for finding in findings:
+            # Matches located within the file, i.e. in a nested archive
+            location = finding.pop("location", "")
+
+            if location:
+                a_match = RegExMatch.from_dict({**finding, "rel_path": f"{rel_path}{location}",
+                                                "absolute_path": f"{filename}{location}"})
+
+            else:
+                a_match = RegExMatch.from_dict({**finding, "rel_path": rel_path, "absolute_path": filename})
+
+            s = f"{str(a_match.absolute_path)}{a_match.regex_match}"
+            matches[hashlib.md5(s.encode('utf-8')).hexdigest()] = a_match
+
+        return matches
+
+
+    def _cache_store(self, content_hash:str | None, name:str, rel_path:str,
+                     matches:dict[str, RegExMatch]) -> None:
+        """
+        Save the findings of a file to the findings cache, unless a regex ran
+        out of time in it or its nested archives were not fully expanded
+
+        Parameters
+        ----------
+        content_hash : str | None
+            sha256 of the content of the file, None if the cache is disabled
+
+        name : str
+            Name of the file, or of the archive member
+
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        matches : dict[str, RegExMatch]
+            Matches found in the file
+        """
+
+        incomplete = [timeout["path"] for timeout in self.timeouts] + self._truncated
+
+        if content_hash is None or any(path == str(rel_path) or path.startswith(f"{rel_path}!/")
+                                       for path in incomplete):
+            return
+
+        findings = []
+
+        for a_match in matches.values():
+            finding = a_match.to_dict()
+            location = str(a_match.rel_path)[len(str(rel_path)):]
+            del finding["rel_path"], finding["absolute_path"]
+
+            if location:
+                finding["location"] = location
+
+            findings.append(finding)
+
+        self._findings_cache.store(content_hash, self._cache_fingerprint(name), findings)
+
+
+    def _extract(self, spool:FindingsSpool) -> None:
+        """
+        Write the findings in the spool to the output file, grouped by regex
+
+        Parameters
+        ----------
+        spool : FindingsSpool
+            Spool the findings were written to
+        """
+
+        # Sort the matches by regex hit, only their offsets in the spool are kept in memory
+        sorted_matches = spool.index()
+        self.finding_counts = {key: len(offsets) for key, offsets in sorted_matches.items()}
+
+        if len(sorted_matches):
+
+            # Write results to file
+            with open(self.outfile, "a", encoding="utf-8") as fd:
+
+                # iterate through sorted matches
+                for key, offsets in sorted_matches.items():
+
+                    fd.write(f"[+]{key}\n")
+                    fd.write(f"{Appalyzer.SECTION_BREAK}\n")
+
+                    for matchobj in spool.read(offsets):
+
+                        regex_name = matchobj.regex_name
+                        secret = matchobj.regex_match
+                        line = matchobj.line_match
+                        rel_path = matchobj.rel_path
+
+                        fd.write(f"- PATH: {rel_path}\
+                                    \n  RegEx: {regex_name}\
+                                    \n  SECRET: {secret.strip()}\
+                                    \n  LINE: {line}\n\n")
+
+                    fd.write(f"{Appalyzer.SECTION_BREAK}\n")
+
+
+    def _write_timeouts(self) -> None:
+        """
+        Write the regexes that ran out of time, and the files they were abandoned in, to the output file
+        """
+
+        if not self.timeouts:
+            return
+
+        Appalyzer.logger.warning("[!]%s regexes ran out of time, see %s", len(self.timeouts), self.outfile)
+
+        with open(self.outfile, "a", encoding="utf-8") as fd:
+
+            fd.write("[!]Skipped, time budget exceeded\n")
+            fd.write(f"{Appalyzer.SECTION_BREAK}\n")
+
+            for timeout in self.timeouts:
+                skipped = "rest of the file" if timeout["budget"] == "file" else "regex"
+
+                fd.write(f"- PATH: {timeout['path']}\
+                            \n  RegEx: {timeout['regex']}\
+                            \n  SKIPPED: {skipped} after {timeout['seconds']}s\n\n")
+
+            fd.write(f"{Appalyzer.SECTION_BREAK}\n")
+
+
+    def _write_triage(self) -> None:
+        """
+        Write the number of files and bytes skipped by each rule of the triage policy to the output file
+        """
+
+        if not self._triage.skipped:
+            return
+
+        report = self._triage.report()
+
+        Appalyzer.logger.info("Files skipped by the triage policy\n%s", report)
+
+        with open(self.outfile, "a", encoding="utf-8") as fd:
+            fd.write(f"[*]Skipped by the triage policy\n{Appalyzer.SECTION_BREAK}\n")
+            fd.write(f"{report}\n{Appalyzer.SECTION_BREAK}\n")
+
+
+    def _emit(self, spool:FindingsSpool) -> None:
+        """
+        Write the findings in the spool in each of the machine readable
+        formats, next to the output file
+
+        Parameters
+        ----------
+        spool : FindingsSpool
+            Spool the findings were written to
+        """
+
+        artifact_sha256 = None if self._is_dir else self._get_file_hashes()["sha256"]
+
+        for fmt in self._output_formats:
+
+            emitter_class = EMITTERS[fmt]
+            emitfile = self.outfile.with_suffix(emitter_class.EXTENSION)
+
+            with emitter_class(emitfile, self.app, artifact_sha256, list(self._regexes)) as emitter:
+                for a_match in spool.matches():
+                    emitter.write(a_match)
+
+            Appalyzer.logger.info("%s results can be found here %s", fmt, emitfile)
+
+
+    def _report(self, results:Iterator[dict[str, RegExMatch]]) -> None:
+        """
+        Spool the findings of each file as it is searched, then write the
+        output file from the spool
+
+        If the scan is interrupted, i.e. Ctrl-C, the findings so far are
+        still written to the output file and the spool is kept
+
+        Parameters
+        ----------
+        results : Iterator[dict[str, RegExMatch]]
+            Matches found in each file, as the files are searched
+        """
+
+        spool_file = self.outfile.with_name(f"{self.outfile.name}{FindingsSpool.SPOOL_SUFFIX}")
+        complete = False
+
+        with FindingsSpool(spool_file) as spool:
+
+            try:
+                for matches in results:
+                    if matches:
+                        with self._stage("write"):
+                            spool.write(matches.values())
+
+                complete = True
+
+            finally:
+                spool.close()
+
+                if not complete:
+                    Appalyzer.logger.warning("[!]Scan interrupted, writing the %s findings found so far to %s",
+                                             spool.count, self.outfile)
+
+                    with open(self.outfile, "a", encoding="utf-8") as fd:
+                        fd.write(f"[!]Scan interrupted, results are incomplete\n{Appalyzer.SECTION_BREAK}\n")
+
+                with self._stage("write"):
+                    self._extract(spool)
+                    self._write_timeouts()
+                    self._write_triage()
+                    self._emit(spool)
+
+                if self._profiler:
+                    self._write_profile()
+
+        if complete:
+            spool_file.unlink()
+
+        else:
+            Appalyzer.logger.warning("[!]Findings were kept in %s", spool_file)
+
+        if self._findings_cache:
+            hits, misses = self._findings_cache.collect()
+            Appalyzer.logger.info("[*]Findings cache: %s of %s files already searched", hits, hits + misses)
+            self._findings_cache.evict()
+
+
+    def _write_profile(self) -> None:
+        """
+        Log the profile tables and write the profile next to the output file
+        """
+
+        Appalyzer.logger.info("Profile of the scan, times are summed across the scanner workers\n%s",
+                              self._profiler.report(self._profile_top))
+
+        self._profiler.dump(self.outfile.with_name(f"{self.outfile.stem}_profile.json"))
+
+
+    def _search_threads(self, finder:str, items:Iterable, *args) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the files, or archive members, using a pool of threads
+
+        Parameters
+        ----------
+        finder : str
+            Name of the method searching one item, i.e. "_finder"
+
+        items : Iterable
+            Files, or archive members, to search
+
+        args : any
+            Extra arguments passed to the finder after the item
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each item, as the items are searched
+        """
+
+        find = getattr(self, finder)
+
+        # A shared pool interleaves the files of concurrent searches, each
+        # search keeping at most max_pending files in its queue
+        if self._executor:
+            max_pending = self._executor._max_workers * Appalyzer.MAX_PENDING_PER_WORKER
+
+            yield from _as_completed(self._executor, lambda item: find(item, *args), items, max_pending)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._scan_workers,
+                                                   thread_name_prefix='LocalSecretScanner_') as executor:
+
+            max_pending = executor._max_workers * Appalyzer.MAX_PENDING_PER_WORKER
+
+            yield from _as_completed(executor, lambda item: find(item, *args), items, max_pending)
+
+
+    def _collect_records(self) -> dict[str, any]:
+        """
+        Return what was recorded while searching, i.e. timeouts, and forget
+        it, to send it from a scanner worker process back to the parent process
+        """
+
+        records = {"timeouts": self.timeouts, "truncated": self._truncated, "skipped": self._triage.collect(),
+                   "profile": self._profiler.collect() if self._profiler else None,
+                   "cache": self._findings_cache.collect() if self._findings_cache else None}
+        self.timeouts = []
+        self._truncated = []
+
+        return records
+
+
+    def _merge_records(self, records:dict[str, any]) -> None:
+        """
+        Add what a scanner worker process recorded, see _collect_records
+        """
+
+        self.timeouts.extend(records["timeouts"])
+        self._truncated.extend(records["truncated"])
+        self._triage.merge(records["skipped"])
+
+        if records["profile"]:
+            self._profiler.merge(records["profile"])
+
+        if records["cache"]:
+            self._findings_cache.merge(records["cache"])
+
+
+    def _search_processes(self, finder:str, items:Iterable, *args,
+                          batched:bool = False) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the files, or archive members, using a pool of processes
+
+        Batches of items are sent to the worker processes, each holding
+        its own copy of the compiled regexes and its own libmagic handle
+
+        Parameters
+        ----------
+        finder : str
+            Name of the method searching one item, i.e. "_finder"
+
+        items : Iterable
+            Files, or archive members, to search
+
+        args : any
+            Extra arguments passed to the finder after the item
+
+        batched : bool
+            Items are already batches, i.e. the files completed by a running decompiler
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each item, as the items are searched
+        """
+
+        if batched:
+            batches = items
+
+        else:
+            items = iter(items)
+            batches = iter(lambda: list(itertools.islice(items, Appalyzer.PROCESS_BATCH_SIZE)), [])
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self._scan_workers,
+                                                    initializer=_init_worker,
+                                                    initargs=(self,)) as executor:
+
+            max_pending = executor._max_workers * Appalyzer.MAX_PENDING_PER_WORKER
+
+            for results, records in _as_completed(executor, functools.partial(_scan_batch, finder, args),
+                                                  batches, max_pending):
+                self._merge_records(records)
+
+                yield from results
+
+
+    def _scan_files(self, file_list:list[Path], scan_dir:str, finder:str = "_finder",
+                    content_hashes:dict[Path, str] = None) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the files with the configured backend
+
+        Parameters
+        ----------
+        file_list : list[Path]
+            Files to search
+
+        scan_dir : str
+            Directory being searched
+
+        finder : str
+            Name of the method searching a file
+
+        content_hashes : dict[Path, str]
+            sha256 of files already hashed, i.e. by an incremental scan, not
+            hashed again for deduplication or the findings cache
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each file, as the files are searched
+        """
+
+        # Set before the scanner processes get their copy of the analyzer
+        self._content_hashes = dict(content_hashes or {})
+        copies = {}
+
+        if self._dedup_content:
+            with self._stage("dedup"):
+                file_list, copies = self._dedup_files(file_list, scan_dir, self._content_hashes)
+
+        if self._scan_backend == "process":
+            results = self._search_processes(finder, file_list, scan_dir)
+
+        else:
+            results = self._search_threads(finder, file_list, scan_dir)
+
+        return self._fan_out(results, copies)
+
+
+    def _dedup_files(self, file_list:list[Path], scan_dir:str,
+                     hashes:dict[Path, str] = None) -> tuple[list[Path], dict[str, list[tuple[str, str]]]]:
+        """
+        Keep one file of each distinct content
+
+        Only files of the same size can have the same content, so only
+        those are hashed
+
+        Parameters
+        ----------
+        file_list : list[Path]
+            Files to search
+
+        scan_dir : str
+            Directory being searched
+
+        hashes : dict[Path, str]
+            sha256 of files already hashed, the files hashed here are added to it
+
+        Returns
+        ----------
+        tuple[list[Path], dict[str, list[tuple[str, str]]]]
+            The files to search, in the same order, and the relative path of each
+            file searched mapped to the absolute and relative paths of its copies
+        """
+
+        hashes = {} if hashes is None else hashes
+
+        by_size = collections.defaultdict(list)
+
+        for filename in file_list:
+            by_size[filename.stat().st_size].append(filename)
+
+        same_size = [filename for group in by_size.values() if len(group) > 1
+                     for filename in group if filename not in hashes]
+
+        def content_hash(filename:Path) -> str | None:
+            try:
+                return Appalyzer.hash_file(filename)
+            except OSError:
+                return None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._scan_workers,
+                                                   thread_name_prefix='ContentHasher_') as executor:
+            for filename, sha256 in zip(same_size, executor.map(content_hash, same_size)):
+                if sha256:
+                    hashes[filename] = sha256
+
+        return self._dedup(file_list, lambda filename: hashes.get(filename),
+                           lambda filename: (str(filename), str(filename.relative_to(scan_dir))),
+                           lambda filename: filename.stat().st_size)
+
+
+    def _dedup_members(self, archive:str, members:list[ZipInfo]) -> tuple[list[ZipInfo], dict[str, list[tuple[str, str]]]]:
+        """
+        Keep one archive member of each distinct content
+
+        Only members with the same size and CRC-32, as stored in the
+        archive, can have the same content, so only those are read and
+        hashed.  CRC-32 collisions are easy to craft, a member is not
+        dropped on its CRC-32 alone
+
+        Parameters
+        ----------
+        archive : str
+            Path of the archive
+
+        members : list[ZipInfo]
+            Members to search
+
+        Returns
+        ----------
+        tuple[list[ZipInfo], dict[str, list[tuple[str, str]]]]
+            The members to search, in the same order, and the relative path of each
+            member searched mapped to the absolute and relative paths of its copies
+        """
+
+        by_crc = collections.defaultdict(list)
+
+        for info in members:
+            by_crc[(info.file_size, info.CRC)].append(info)
+
+        same_crc = [info for group in by_crc.values() if len(group) > 1 for info in group]
+
+        with ZipFile(archive, mode='r') as zfile:
+
+            def content_hash(info:ZipInfo) -> str | None:
+                member_hash = hashlib.sha256()
+
+                try:
+                    with zfile.open(info) as fd:
+                        while chunk := fd.read(1024 * 1024):
+                            member_hash.update(chunk)
+
+                except (OSError, BadZipFile) as err:
+                    Appalyzer.logger.debug("Could not hash %s!/%s: %s", archive, info.filename, err)
+                    return None
+
+                return member_hash.hexdigest()
+
+            # Reads of a ZipFile are serialized, the threads only decompress and hash concurrently
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self._scan_workers,
+                                                       thread_name_prefix='ContentHasher_') as executor:
+                hashes = dict(zip(same_crc, executor.map(content_hash, same_crc)))
+
+        return self._dedup(members, lambda info: hashes.get(info),
+                           lambda info: (f"{archive}!/{info.filename}", self._member_rel_path(info.filename)),
+                           lambda info: info.file_size)
+
+
+    def _dedup(self, items:list, content_key:Callable, paths:Callable,
+               size:Callable) -> tuple[list, dict[str, list[tuple[str, str]]]]:
+        """
+        Keep the first item of each distinct content, see _dedup_files and _dedup_members
+
+        Parameters
+        ----------
+        items : list
+            Files, or archive members, to search
+
+        content_key : Callable
+            Return the key of the content of an item, None if it is unique
+
+        paths : Callable
+            Return the absolute and relative paths of an item
+
+        size : Callable
+            Return the size of an item
+
+        Returns
+        ----------
+        tuple[list, dict[str, list[tuple[str, str]]]]
+            The items to search and the copies of each item searched
+        """
+
+        unique = []
+        first = {}
+        copies = collections.defaultdict(list)
+        duplicate_bytes = 0
+
+        for item in items:
+            key = content_key(item)
+
+            if key is None or key not in first:
+                unique.append(item)
+
+                if key is not None:
+                    first[key] = paths(item)[1]
+
+            else:
+                copies[first[key]].append(paths(item))
+                duplicate_bytes += size(item)
+
+        if copies:
+            Appalyzer.logger.info("Searching %s distinct contents of %s files, skipping %.2f MB of copies",
+                                  len(unique), len(items), duplicate_bytes / 1024 ** 2)
+
+        return unique, dict(copies)
+
+
+    def _fan_out(self, results:Iterator[dict[str, RegExMatch]],
+                 copies:dict[str, list[tuple[str, str]]]) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Report the matches of each file searched at each of its copies too
+
+        Parameters
+        ----------
+        results : Iterator[dict[str, RegExMatch]]
+            Matches found in each file searched
+
+        copies : dict[str, list[tuple[str, str]]]
+            Relative path of each file searched mapped to the absolute and
+            relative paths of its copies, from _dedup
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each file searched, then at each of its copies
+        """
+
+        for matches in results:
+            yield matches
+
+            if not matches:
+                continue
+
+            source = Appalyzer._copied_file(str(next(iter(matches.values())).rel_path), copies)
+
+            for absolute_path, rel_path in copies.get(source, ()):
+                copied = {}
+
+                for a_match in matches.values():
+                    location = str(a_match.rel_path)[len(source):]
+                    s = f"{absolute_path}{location}{a_match.regex_match}"
+                    copied[hashlib.md5(s.encode('utf-8')).hexdigest()] = \
+                        dataclasses.replace(a_match, rel_path=f"{rel_path}{location}",
+                                            absolute_path=f"{absolute_path}{location}")
+
+                yield copied
+
+        # The copies of a file a regex ran out of time in, or whose nested
+        # archives were not fully expanded, are incomplete too
+        self.timeouts.extend({**timeout, "path": path} for timeout in list(self.timeouts)
+                             for path in Appalyzer._copied_paths(timeout["path"], copies))
+        self._truncated.extend(path for truncated in list(self._truncated)
+                               for path in Appalyzer._copied_paths(truncated, copies))
+
+
+    @staticmethod
+    def _copied_file(path:str, copies:dict[str, list[tuple[str, str]]]) -> str:
+        """
+        Return the file searched a match, or a timeout, was found in, to look
+        up its copies.  Matches located within the file, i.e.
+        Foo.dll#US[0x70000001] or lib.jar!/config.properties, are found in
+        the file before their location
+        """
+
+        if path in copies:
+            return path
+
+        return next((prefix for prefix in (path.partition("!/")[0], path.rpartition("#")[0])
+                     if prefix in copies), path)
+
+
+    @staticmethod
+    def _copied_paths(path:str, copies:dict[str, list[tuple[str, str]]]) -> list[str]:
+        """
+        Return the relative path at each copy of the file of a path, keeping
+        the location within the file, see _copied_file
+        """
+
+        source = Appalyzer._copied_file(path, copies)
+
+        return [f"{rel_path}{path[len(source):]}" for _, rel_path in copies.get(source, ())]
+
+
+    def _include_member(self, info:ZipInfo) -> bool:
+        """
+        Return True if an archive member should be searched
+
+        Directories and members skipped by the triage policy are not searched
+
+        Parameters
+        ----------
+        info : ZipInfo
+            Archive member
+
+        Returns
+        ----------
+        bool
+            True if the member should be searched
+        """
+
+        if info.is_dir():
+            return False
+
+        rel_path = self._member_rel_path(info.filename)
+        rule = self._triage.check(rel_path, info.file_size)
+
+        if rule:
+            self._triage.skip(rule, rel_path, info.file_size)
+            return False
+
+        return True
+
+
+    def _triage_files(self, file_list:list[Path], scan_dir:str) -> list[Path]:
+        """
+        Return the files of a directory the triage policy does not skip,
+        the deprioritized ones last
+
+        Parameters
+        ----------
+        file_list : list[Path]
+            Files of the directory
+
+        scan_dir : str
+            Directory being searched
+
+        Returns
+        ----------
+        list[Path]
+            Files to search
+        """
+
+        kept = []
+
+        for filename in file_list:
+            rel_path = filename.relative_to(scan_dir)
+            size = filename.stat().st_size
+            rule = self._triage.check(rel_path, size)
+
+            if rule:
+                self._triage.skip(rule, rel_path, size)
+            else:
+                kept.append(filename)
+
+        Appalyzer.logger.info("Searching %s of %s files", len(kept), len(file_list))
+
+        return sorted(kept, key=lambda f: self._triage.is_deprioritized(f.relative_to(scan_dir)))
+
+
+    def _member_rel_path(self, name:str) -> str:
+        """
+        Return the path reported for an archive member
+        """
+        return name
+
+
+    def _member_content(self, name:str, data:bytes) -> str | None:
+        """
+        Return the content to search for an archive member that needs
+        converting first, i.e. plist files
+
+        Parameters
+        ----------
+        name : str
+            Name of the member in the archive
+
+        data : bytes
+            Decompressed member
+
+        Returns
+        ----------
+        str | None
+            Content to search, None to search the text or strings of the member
+        """
+        return None
+
+
+    def _member_strings(self, name:str, header:bytes, fd:BinaryIO) -> tuple[str, StringsMap] | None:
+        """
+        Return the strings of a binary archive member along with their
+        locations, read straight from the member, i.e. the string sections
+        of Mach-O binaries
+
+        Parameters
+        ----------
+        name : str
+            Name of the member in the archive
+
+        header : bytes
+            First bytes of the member
+
+        fd : BinaryIO
+            The member, positioned after the header
+
+        Returns
+        ----------
+        tuple[str, StringsMap] | None
+            Strings separated by new lines and their map, None to search the
+            strings of the whole member, fd is then left after the header
+        """
+        return None
+
+
+    def _finder_member(self, name:str, archive:str) -> dict[str, RegExMatch]:
+        """
+        Search an archive member using regular expressions, without
+        extracting it to disk
+
+        Parameters
+        ----------
+        name : str
+            Name of the member in the archive
+
+        archive : str
+            Path of the archive
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the member
+        """
+
+        return self._search_member(_get_archive(archive), name, f"{archive}!/{name}", self._member_rel_path(name))
+
+
+    def _search_member(self, zfile:ZipFile, name:str, filename:str, rel_path:str,
+                       depth:int = 0, budget:ArchiveBudget = None) -> dict[str, RegExMatch]:
+        """
+        Search an archive member, expanding it if it is an archive itself
+
+        Parameters
+        ----------
+        zfile : ZipFile
+            The archive
+
+        name : str
+            Name of the member in the archive
+
+        filename : str
+            Absolute path reported for the member, i.e. outer.zip!/inner.jar!/path
+
+        rel_path : str
+            Path reported for the member, relative to the archive being searched
+
+        depth : int
+            Number of archives the archive is nested in, 0 for the archive being searched
+
+        budget : ArchiveBudget
+            What is left to expand from the outermost nested archive, None
+            for members of the archive being searched
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the member
+        """
+
+        matches = {}
+        start_time = time.perf_counter()
+        mimetype = None
+        info = None
+        content_hash = None
+        nested = None
+        spool = None
+        is_text = False
+
+        try:
+            info = zfile.getinfo(name)
+
+            # Members of nested archives are bounded, against zip bombs
+            if budget is not None:
+                rule = Appalyzer._spend(budget, info.file_size)
+
+                if rule:
+                    self._triage.skip(rule, rel_path, info.file_size)
+                    self._truncated.append(str(rel_path))
+                    return matches
+
+            with zfile.open(info) as fd:
+
+                with self._stage("type_detect"):
+                    header = fd.read(FileClassifier.HEADER_SIZE)
+                    mimetype = self._classifier.classify(name, header)
+
+                Appalyzer.logger.debug("[*]%s mimetype is %s", filename, mimetype)
+
+                if self._triage.denies_mimetype(mimetype):
+                    self._triage.skip("mimetype", rel_path, info.file_size)
+                    return matches
+
+                # Archives in the archive are expanded, up to the budget
+                expand = header.startswith(Appalyzer.ZIP_MAGIC) and depth < self._archive_depth \
+                    and (budget is not None or info.file_size <= self._archive_expanded)
+
+                if 'text' not in mimetype and not expand:
+                    with self._stage("extract"):
+                        located = self._member_strings(name, header, fd)
+
+                    if located:
+                        return self._scan_strings(*located, filename, rel_path)
+
+                if info.file_size > self._large_file_size and not expand:
+                    with zfile.open(info) as large_fd:
+                        return self._scan_windows(self._stream_windows(large_fd), filename,
+                                                  rel_path, 'text' in mimetype)
+
+                # The header was already read, only read the rest of the member.  Nested
+                # archives are kept in memory up to LARGE_FILE_MB, in a temporary file past it
+                with self._stage("extract"):
+                    if expand:
+                        spool = tempfile.SpooledTemporaryFile(max_size=max(self._large_file_size, 1))
+                        spool.write(header)
+                        shutil.copyfileobj(fd, spool, 1024 * 1024)
+                        spool.seek(0)
+
+                    else:
+                        data = header + fd.read()
+
+            if self._findings_cache:
+                with self._stage("cache"):
+                    if spool is not None:
+                        content_hash = hashlib.file_digest(spool, "sha256").hexdigest()
+                        spool.seek(0)
+
+                    else:
+                        content_hash = hashlib.sha256(data).hexdigest()
+
+                    cached = self._cache_lookup(content_hash, name, filename, rel_path)
+
+                if cached is not None:
+                    return cached
+
+            with self._stage("extract"):
+                if spool is not None:
+                    nested = Appalyzer._open_nested(spool)
+
+                    # Not an archive after all, searched like any other member
+                    if nested is None:
+                        spool.seek(0)
+                        data = spool.read()
+
+                if nested is None:
+                    content = self._member_content(name, data)
+
+                    if content is None:
+                        is_text = 'text' in mimetype
+
+                        if is_text:
+                            content = data.decode(Appalyzer._text_encoding(data[:2]), errors="ignore")
+
+                        else:
+                            content = self._strings.extract(data)
+
+                    del data
+
+        except Exception as err:
+            Appalyzer.logger.error("\n[!]Error: %s\n", err)
+
+        else:
+            if nested is not None:
+                with nested:
+                    matches = self._search_nested(nested, filename, rel_path, depth + 1, budget)
+
+            else:
+                matches = self._scan_content(content, filename, rel_path, is_text)
+
+            self._cache_store(content_hash, name, rel_path, matches)
+
+        finally:
+            if spool is not None:
+                spool.close()
+
+            if self._profiler:
+                self._profiler.add_file(mimetype or "unknown", time.perf_counter() - start_time,
+                                        info.file_size if info else 0)
+
+        return matches
+
+
+    @staticmethod
+    def _spend(budget:ArchiveBudget, size:int) -> str | None:
+        """
+        Take a member of a nested archive from the budget
+
+        Returns
+        ----------
+        str | None
+            Name of the triage rule skipping the member once the budget is
+            spent, None if the member can be expanded
+        """
+
+        if budget.members <= 0:
+            return "archive_members"
+
+        if size > budget.num_bytes:
+            return "archive_bytes"
+
+        budget.members -= 1
+        budget.num_bytes -= size
+
+        return None
+
+
+    @staticmethod
+    def _open_nested(fd:BinaryIO) -> ZipFile | None:
+        """
+        Open a nested archive, None if it is not a valid archive and should
+        be searched like any other file
+        """
+
+        try:
+            return ZipFile(fd, mode='r')
+
+        except BadZipFile as err:
+            Appalyzer.logger.debug("[*]Not expanding a nested archive: %s", err)
+            return None
+
+
+    def _search_nested(self, zfile:ZipFile, filename:str, rel_path:str, depth:int,
+                       budget:ArchiveBudget = None) -> dict[str, RegExMatch]:
+        """
+        Search the members of an archive nested in the file being searched,
+        in the same scanner worker, without extracting them
+
+        Each member is reported at <file>!/<member>, and the members of the
+        archives nested in it at <file>!/<member>!/<inner member>, up to
+        ARCHIVE_MAX_DEPTH levels.  All the archives nested in the file share
+        a budget of ARCHIVE_MAX_EXPANDED_MB and ARCHIVE_MAX_MEMBERS, members
+        past the budget are skipped and counted in the triage report
+
+        Parameters
+        ----------
+        zfile : ZipFile
+            The nested archive
+
+        filename : str
+            Absolute path reported for the nested archive
+
+        rel_path : str
+            Path reported for the nested archive
+
+        depth : int
+            Number of archives the nested archive is in, 1 for an archive
+            in the file being searched
+
+        budget : ArchiveBudget
+            What is left to expand from the outermost nested archive, None
+            to start a budget for this archive
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the members
+        """
+
+        if budget is None:
+            budget = ArchiveBudget(self._archive_expanded, self._archive_members)
+
+        matches = {}
+
+        with self._stage("walk"):
+            infolist = [info for info in zfile.infolist() if not info.is_dir()]
+
+        Appalyzer.logger.debug("[*]Expanding %s members of %s", len(infolist), filename)
+
+        for info in infolist:
+            inner_rel_path = f"{rel_path}!/{info.filename}"
+            rule = self._triage.check(inner_rel_path, info.file_size)
+
+            if rule:
+                self._triage.skip(rule, inner_rel_path, info.file_size)
+                continue
+
+            matches.update(self._search_member(zfile, info.filename, f"{filename}!/{info.filename}",
+                                               inner_rel_path, depth, budget))
+
+        return matches
+
+
+    def _search_archive(self, archive:str) -> None:
+        """
+        Search the members of an archive, streaming each member into the
+        regular expressions instead of extracting the archive
+
+        Parameters
+        ----------
+        archive : str
+            Path of the archive
+        """
+
+        with self._stage("walk"):
+            with ZipFile(archive, mode='r') as zfile:
+                infolist = zfile.infolist()
+
+            # Largest members first, so a big binary found last does not hold up the whole
+            # scan, but after the others if deprioritized by the triage policy
+            members = [info for info in infolist if self._include_member(info)]
+            members = sorted(members, key=lambda i: (
+                self._triage.is_deprioritized(self._member_rel_path(i.filename)), -i.file_size))
+
+        copies = {}
+
+        if self._dedup_content:
+            with self._stage("dedup"):
+                members, copies = self._dedup_members(archive, members)
+
+        members = [info.filename for info in members]
+
+        Appalyzer.logger.info("Scanning Archive: %s", Path(archive).absolute())
+        Appalyzer.logger.info("Searching %s of %s archive members", len(members), len(infolist))
+        Appalyzer.logger.info(" ** Be patient...  This could take a while...")
+
+        if self._scan_backend == "process":
+            results = self._search_processes("_finder_member", members, archive)
+
+        else:
+            results = self._search_threads("_finder_member", members, archive)
+
+        results = self._fan_out(_closing_archive(archive, results), copies)
+
+        # Spool the matches as they are found and write them to the output file
+        with self._scan_limit:
+            self._report(results)
+
+
+    def _search(self, scan_dir:str) -> None:
+
+        results = self._search_dir(scan_dir)
+
+        # Spool the matches as they are found and write them to the output file
+        with self._scan_limit:
+            self._report(results)
+
+
+    def _search_dir(self, scan_dir:str) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the files of a directory, or of the running decompiler
+
+        Parameters
+        ----------
+        scan_dir : str
+            Directory to search
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each file, as the files are searched
+        """
+
+        if self._decompiler:
+            Appalyzer.logger.info("Scanning Directory: %s as it is decompiled", Path(scan_dir).absolute())
+            results = self._search_pipelined(scan_dir)
+
+        else:
+            # Walk directory and save all the file paths
+            with self._stage("walk"):
+                file_list = self._triage_files(self._get_dir_listing(scan_dir), scan_dir)
+
+            Appalyzer.logger.info("Scanning Directory: %s", Path(scan_dir).absolute())
+            Appalyzer.logger.info(" ** Be patient...  This could take a while...")
+
+            results = self._scan_files(file_list, scan_dir)
+
+        return results
+
+
+    def _search_pipelined(self, scan_dir:str) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the files of the running decompiler as they are written, so
+        the scan takes about as long as the longest of decompiling and searching
+
+        Files go through the triage policy and are deduplicated as they come,
+        the deprioritized ones are searched once the decompiler exited
+
+        Parameters
+        ----------
+        scan_dir : str
+            Directory the decompiler writes to, the decompiled app is reported
+            in the decompile cache when enabled
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each file, as the files are searched
+        """
+
+        proc, workdir, outdir, decompiled, finish = self._decompiler
+        self._decompiler = None
+        copies = {}
+
+        # Files are searched again once changed, their hashes can't be kept
+        self._content_hashes = {}
+
+        def ready_batches() -> Iterator[list[Path]]:
+            deferred = []
+
+            for batch in self._watch_decompiler(proc, workdir):
+                ready = []
+
+                with self._stage("walk"):
+                    for filename in self._triage_files(batch, workdir):
+                        if self._triage.is_deprioritized(filename.relative_to(workdir)):
+                            deferred.append(filename)
+                        else:
+                            ready.append(filename)
+
+                if self._dedup_content:
+                    with self._stage("dedup"):
+                        ready, batch_copies = self._dedup_files(ready, workdir)
+                        copies.update(batch_copies)
+
+                yield from self._split(ready)
+
+            # Let another decompiler start, i.e. in batch mode
+            decompiled()
+
+            yield from self._split(deferred)
+
+        if self._scan_backend == "process":
+            results = self._search_processes("_finder", ready_batches(), workdir, batched=True)
+
+        else:
+            results = self._search_threads("_finder", itertools.chain.from_iterable(ready_batches()), workdir)
+
+        results = self._fan_out(results, copies)
+
+        if outdir != Path(scan_dir):
+            results = self._relocate(results, outdir)
+
+        complete = False
+        reported = set()
+
+        try:
+            # A file changed after it was searched is searched again, report its matches once
+            for matches in results:
+                yield {key: a_match for key, a_match in matches.items() if key not in reported}
+                reported.update(matches)
+
+            complete = True
+
+        finally:
+            # Stopped early, i.e. Ctrl-C, don't leave the decompiler running
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+
+            finish(complete)
+
+
+    def _watch_decompiler(self, proc:subprocess.Popen, workdir:Path) -> Iterator[list[Path]]:
+        """
+        Yield the files written by a running decompiler once they are complete
+
+        The output directory is polled every PIPELINE_POLL_S seconds and a
+        file is complete once its size and modification time did not change
+        between two polls.  Once the decompiler exited, every file not yielded
+        yet, or changed since it was yielded, is yielded
+
+        Parameters
+        ----------
+        proc : subprocess.Popen
+            The decompiler
+
+        workdir : Path
+            Directory the decompiler writes to
+
+        Returns
+        ----------
+        Iterator[list[Path]]
+            Files completed since the previous poll
+        """
+
+        # path -> (size, mtime) when last seen, and when yielded
+        seen = {}
+        yielded = {}
+
+        while True:
+            exited = proc.poll() is not None
+            ready = []
+
+            for filename in self._get_dir_listing(workdir):
+
+                try:
+                    stat = filename.stat()
+
+                # Temporary files can be renamed between listing and stat
+                except OSError:
+                    continue
+
+                stamp = (stat.st_size, stat.st_mtime_ns)
+
+                if yielded.get(filename) == stamp:
+                    continue
+
+                if exited or seen.get(filename) == stamp:
+                    if filename in yielded:
+                        Appalyzer.logger.debug("[*]%s changed after it was searched, searching it again", filename)
+
+                    yielded[filename] = stamp
+                    ready.append(filename)
+
+                else:
+                    seen[filename] = stamp
+
+            if ready:
+                Appalyzer.logger.debug("[*]%s decompiled files ready to search", len(ready))
+                yield ready
+
+            if exited:
+                return
+
+            time.sleep(self._pipeline_poll)
+
+
+    @staticmethod
+    def _split(items:list) -> Iterator[list]:
+        """
+        Split items in batches of PROCESS_BATCH_SIZE
+        """
+        for i in range(0, len(items), Appalyzer.PROCESS_BATCH_SIZE):
+            yield items[i:i + Appalyzer.PROCESS_BATCH_SIZE]
+
+
+    def _relocate(self, results:Iterator[dict[str, RegExMatch]], scan_dir:str) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Report the matches of files searched in a temporary directory at their path in scan_dir
+        """
+
+        for matches in results:
+            yield {key: dataclasses.replace(a_match, absolute_path=Path(scan_dir).joinpath(a_match.rel_path))
+                   for key, a_match in matches.items()}
+
+
+    @staticmethod
+    def hash_file(file_path:str) -> str:
+        """
+        Return the sha256 of the contents of a file
+
+        Parameters
+        ----------
+        file_path : str
+            Absolute Path of the file
+
+        Returns
+        ----------
+        str
+            string representation of hex bytes for the sha256 value
+        """
+
+        file_hash = hashlib.sha256()
+
+        with open(file_path, "rb") as fd:
+            while chunk := fd.read(1024 * 1024):
+                file_hash.update(chunk)
+
+        return file_hash.hexdigest()
+
+
+    def get_filesize(self, file_path:str, unit:str = 'bytes') -> int:
+        """
+        Get the size of a file
+
+        Parameters
+        ----------
+        file_path : str
+            Absolute Path of the file
+
+        unit : str
+            Size to return.  Valid selections are
+                ['bytes', 'kb', 'mb', 'gb']
+                Default is bytes
+
+        Returns
+        ----------
+        int
+            size of the file
+
+        Raises
+        ------
+        ValueError
+            If unit is not defined
+        """
+
+        exponents_map = {'bytes': 0, 'kb': 1, 'mb': 2, 'gb': 3}
+
+        if unit not in exponents_map:
+            raise ValueError("Must select from ['bytes', 'kb', 'mb', 'gb']")
+
+        file_size = Path(file_path).stat().st_size
+        size = file_size / 1024 ** exponents_map[unit]
+
+        return round(size, 3)
+
+
+    def secret_search(self):
+        """ 
+        Perform secret search
+        """
+
+
+    def cleanup(self) -> None:
+        """
         Cleanup any temporary files created during execution
         """
 
-        if self._outdir:
-            shutil.rmtree(self._outdir.parent)
+        # Decompiled apps in the cache are kept for the next run, only the
+        # output of this run is removed when it was not stored in the cache
+        if self._workdir:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+
+            if not self._decompile_cache:
+                with contextlib.suppress(OSError):
+                    self._workdir.parent.rmdir()
+
+            self._workdir = None
 
         cache_dir = Path(f"{self.app}.cache")
         if cache_dir.is_dir():
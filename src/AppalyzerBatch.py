@@ -0,0 +1,416 @@
+"""Search a batch of applications for secrets, i.e. a nightly drop of builds"""
+import argparse
+import collections
+import concurrent.futures
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from AppAnalyzerConfig import AppAnalyzerConfig
+from AppalyzerCLI import banner, configure_logging
+from ApkAnalyzer import ApkAnalyzer
+from IpaAnalyzer import IpaAnalyzer
+from ZipAnalyzer import ZipAnalyzer
+from DllAnalyzer import DllAnalyzer
+
+ANALYZERS = {'.apk': ApkAnalyzer,
+             '.jar': ApkAnalyzer,
+             '.ipa': IpaAnalyzer,
+             '.zip': ZipAnalyzer,
+             '.dll': DllAnalyzer}
+
+STATE_FILENAME = "appalyzer_batch_state.json"
+SUMMARY_FILENAME = "appalyzer_batch_summary.json"
+
+
+def find_artifacts(targets:list[str]) -> list[Path]:
+    """
+    Find the apps to scan
+
+    Parameters
+    ----------
+    targets : list[str]
+        Directories (searched recursively), glob patterns, app files, or
+        manifest files listing one app per line
+
+    Returns
+    ----------
+    list[Path]
+        Absolute paths of the apps, in the order they were found
+    """
+
+    artifacts = []
+
+    for target in targets:
+        path = Path(target)
+
+        if path.is_dir():
+            found = sorted(f for f in path.rglob('*') if f.is_file())
+
+        elif path.is_file() and path.suffix.lower() in ANALYZERS:
+            found = [path]
+
+        elif path.is_file():
+            # Manifest, paths are relative to the manifest
+            with open(path, "r", encoding="utf-8") as fd:
+                lines = [line.strip() for line in fd]
+
+            found = [path.parent.joinpath(line) for line in lines if line and not line.startswith('#')]
+
+        else:
+            found = sorted(Path(f) for f in glob.glob(target, recursive=True))
+
+        artifacts.extend(f.absolute() for f in found
+                         if f.suffix.lower() in ANALYZERS and f.is_file())
+
+    return list(dict.fromkeys(artifacts))
+
+
+class BatchState():
+    """
+    Status of each app of a batch
+
+    The state is saved after every change, so a batch interrupted by a
+    restart only scans the apps that were not done
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, state_file:str) -> None:
+        """
+        Parameters
+        ----------
+        state_file : str
+            Path of the state file
+        """
+
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+        self._apps = {}
+
+        if self.state_file.is_file():
+
+            try:
+                with open(self.state_file, "r", encoding="utf-8") as fd:
+                    self._apps = json.load(fd).get("apps", {})
+
+            except (OSError, ValueError) as err:
+                BatchState.logger.error("[!] Could not read batch state %s: %s", self.state_file, err)
+
+
+    def is_done(self, artifact:Path) -> bool:
+        """
+        Return whether the app was already scanned and did not change since
+        """
+
+        entry = self._apps.get(str(artifact))
+        stat = artifact.stat()
+
+        return bool(entry) and entry["status"] == "done" and \
+            entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+
+    def get(self, artifact:Path) -> dict[str, any]:
+        """
+        Return the entry of an app
+        """
+        return self._apps.get(str(artifact), {})
+
+
+    def update(self, artifact:Path, status:str, **fields) -> None:
+        """
+        Record the status of an app and save the state
+
+        Parameters
+        ----------
+        artifact : Path
+            The app
+
+        status : str
+            "running", "done" or "failed"
+
+        fields : any
+            Other information to record, i.e. the results file
+        """
+
+        stat = artifact.stat()
+
+        with self._lock:
+            self._apps[str(artifact)] = {**self._apps.get(str(artifact), {}), **fields,
+                                         "status": status, "size": stat.st_size,
+                                         "mtime_ns": stat.st_mtime_ns, "updated": time.time()}
+
+            tmpfile = self.state_file.with_name(f"{self.state_file.name}.tmp")
+
+            with open(tmpfile, "w", encoding="utf-8") as fd:
+                json.dump({"apps": self._apps}, fd, indent=4)
+
+            os.replace(tmpfile, self.state_file)
+
+
+class BatchScanner():
+    """
+    Scan a batch of apps concurrently
+
+    Decompiling and searching are limited separately: only a few decompilers
+    (i.e. jadx, which needs a lot of memory) run at once, while other apps
+    are searched
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, artifacts:list[Path], state:BatchState, regex_file:str = None,
+                 outdir:str = None, do_cleanup:bool = False) -> None:
+        """
+        Parameters
+        ----------
+        artifacts : list[Path]
+            Apps to scan
+
+        state : BatchState
+            Status of the apps from previous runs
+
+        regex_file : str
+            Custom regex file, None to use the default regex file
+
+        outdir : str
+            Directory to write the results files to, None to write them next to each app
+
+        do_cleanup : bool
+            Cleanup the working directory of each app once it is scanned
+        """
+
+        appconfig = AppAnalyzerConfig()
+
+        self.artifacts = artifacts
+        self.state = state
+        self.regex_file = regex_file
+        self.outdir = Path(outdir) if outdir else None
+        self.do_cleanup = do_cleanup
+        self.decompile_jobs = appconfig.get_batch_decompile_jobs()
+        self.scan_jobs = appconfig.get_batch_scan_jobs()
+        self._decompile_limit = threading.Semaphore(self.decompile_jobs)
+        self._scan_limit = threading.Semaphore(self.scan_jobs)
+        self._print_lock = threading.Lock()
+
+
+    def __status(self, index:int, artifact:Path, message:str) -> None:
+        """
+        Print the status of an app
+        """
+        with self._print_lock:
+            print(f"[*] ({index}/{len(self.artifacts)}) {artifact.name}: {message}", flush=True)
+
+
+    def _scan_artifact(self, index:int, artifact:Path) -> None:
+        """
+        Decompile and search an app, recording its status
+
+        Parameters
+        ----------
+        index : int
+            Position of the app in the batch, for the status messages
+
+        artifact : Path
+            The app
+        """
+
+        self.state.update(artifact, "running")
+        self.__status(index, artifact, "running")
+
+        start_time = time.perf_counter()
+        appalyzer = None
+
+        try:
+            appalyzer = ANALYZERS[artifact.suffix.lower()](artifact, self.regex_file)
+            appalyzer.set_stage_limits(self._decompile_limit, self._scan_limit)
+
+            # Apps with the same name in different directories, i.e. app-release.apk,
+            # get their own results files, tagged with a hash of their path
+            if self.outdir:
+                digest = hashlib.sha256(str(artifact.absolute()).encode("utf-8")).hexdigest()[:8]
+                name = appalyzer.outfile.name[len(artifact.name):]
+                appalyzer.outfile = self.outdir.joinpath(f"{artifact.name}_{digest}{name}")
+
+            appalyzer.secret_search()
+
+        except Exception as err:
+            BatchScanner.logger.exception("[!] Failed to scan %s", artifact)
+            self.state.update(artifact, "failed", error=str(err),
+                              seconds=time.perf_counter() - start_time)
+            self.__status(index, artifact, f"failed, {err}")
+
+        else:
+            findings = sum(appalyzer.finding_counts.values())
+            self.state.update(artifact, "done", outfile=str(appalyzer.outfile), error=None,
+                              findings=appalyzer.finding_counts, timeouts=appalyzer.timeouts,
+                              seconds=time.perf_counter() - start_time)
+            self.__status(index, artifact, f"done, {findings} findings in {appalyzer.outfile}")
+
+        finally:
+            if appalyzer and self.do_cleanup:
+                appalyzer.cleanup()
+
+
+    def run(self) -> dict[str, any]:
+        """
+        Scan every app of the batch that is not done yet
+
+        Returns
+        ----------
+        dict[str, any]
+            Summary of the batch
+        """
+
+        start_time = time.perf_counter()
+        to_scan = []
+
+        for index, artifact in enumerate(self.artifacts, 1):
+
+            if self.state.is_done(artifact):
+                self.__status(index, artifact, "done in a previous run, skipping")
+
+            else:
+                to_scan.append((index, artifact))
+
+        print(f"[*] Scanning {len(to_scan)} of {len(self.artifacts)} apps, "
+              f"{self.decompile_jobs} decompilers and {self.scan_jobs} scans at once")
+
+        # Enough jobs so a search can start while the decompilers are busy
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.decompile_jobs + self.scan_jobs,
+                                                   thread_name_prefix='BatchScanner_') as executor:
+
+            futures = [executor.submit(self._scan_artifact, index, artifact) for index, artifact in to_scan]
+
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+
+            except KeyboardInterrupt:
+                print("[!] Interrupted, waiting for the running apps to finish.  Run again to resume")
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+
+        return self.summarize(time.perf_counter() - start_time)
+
+
+    def summarize(self, seconds:float) -> dict[str, any]:
+        """
+        Summarize the status and findings of every app of the batch
+
+        Parameters
+        ----------
+        seconds : float
+            Time taken by this run
+
+        Returns
+        ----------
+        dict[str, any]
+            Summary of the batch
+        """
+
+        statuses = collections.Counter()
+        by_regex = collections.Counter()
+        failures = []
+        timeouts = []
+
+        for artifact in self.artifacts:
+            entry = self.state.get(artifact)
+            statuses[entry.get("status", "pending")] += 1
+
+            if entry.get("status") == "done":
+                by_regex.update(entry.get("findings", {}))
+                timeouts.extend({"app": str(artifact), **timeout} for timeout in entry.get("timeouts", []))
+
+            elif entry.get("status") == "failed":
+                failures.append({"app": str(artifact), "error": entry.get("error")})
+
+        return {"apps": len(self.artifacts),
+                "statuses": dict(statuses),
+                "findings": sum(by_regex.values()),
+                "findings_by_regex": dict(by_regex.most_common()),
+                "failures": failures,
+                "timeouts": timeouts,
+                "seconds": seconds}
+
+
+def main():
+    """Main Execution Module for batch scans"""
+
+    banner()
+
+    configure_logging()
+
+    parser = argparse.ArgumentParser(description="Search a batch of applications for secrets")
+    parser.add_argument("targets", help=f"Directories, glob patterns, or manifest files (one app per line) of the apps to scan, with extensions {list(ANALYZERS)}", type=str, nargs='+')
+    parser.add_argument('-r', '--regex', help="Custom regex file to use in JSON format", dest='regex_file', type=str, default=None)
+    parser.add_argument('-o', '--outdir', help="Directory to write the results files to (Default = next to each app)", dest='outdir', type=str, default=None)
+    parser.add_argument('-s', '--state', help=f"Batch state file, used to resume an interrupted batch (Default = OUTDIR_PATH/{STATE_FILENAME})", dest='state_file', type=str, default=None)
+    parser.add_argument('-d', '--decompile-jobs', help="Maximum number of decompilers running at once (Default = BATCH_DECOMPILE_JOBS in config.ini)", dest='decompile_jobs', type=int, default=None)
+    parser.add_argument('-j', '--scan-jobs', help="Maximum number of apps searched at once (Default = BATCH_SCAN_JOBS in config.ini)", dest='scan_jobs', type=int, default=None)
+    parser.add_argument('-b', '--backend', help="Scan files with a pool of threads or processes, auto uses processes when regexes have a time budget (Default = SCAN_BACKEND in config.ini)", dest='backend', choices=['auto', 'thread', 'process'], default=None)
+    parser.add_argument('-w', '--workers', help="Number of scanner workers of each app (Default = SCAN_WORKERS in config.ini)", dest='workers', type=int, default=None)
+    parser.add_argument('-f', '--format', help="Also write the findings as JSON Lines and/or SARIF 2.1.0, next to the results files (Default = OUTPUT_FORMATS in config.ini)", dest='formats', choices=['jsonl', 'sarif'], nargs='+', default=None)
+    parser.add_argument('--cleanup', help="Cleanup the working directory of each app once it is scanned (Default = False)", dest='do_cleanup', action='store_true')
+    args = parser.parse_args()
+
+    # Commandline arguments override the configuration file
+    appconfig = AppAnalyzerConfig()
+
+    if args.decompile_jobs is not None:
+        appconfig.set_config_value('BATCH_DECOMPILE_JOBS', args.decompile_jobs)
+
+    if args.scan_jobs is not None:
+        appconfig.set_config_value('BATCH_SCAN_JOBS', args.scan_jobs)
+
+    if args.backend:
+        appconfig.set_config_value('SCAN_BACKEND', args.backend)
+
+    if args.workers is not None:
+        appconfig.set_config_value('SCAN_WORKERS', args.workers)
+
+    if args.formats:
+        appconfig.set_config_value('OUTPUT_FORMATS', ','.join(args.formats))
+
+    artifacts = find_artifacts(args.targets)
+
+    if not artifacts:
+        print(f"[!] No apps found in {args.targets}")
+        return
+
+    if args.outdir:
+        Path(args.outdir).mkdir(parents=True, exist_ok=True)
+
+    state_file = Path(args.state_file or Path(appconfig.get_outdir_path()).joinpath(STATE_FILENAME))
+    state = BatchState(state_file)
+
+    scanner = BatchScanner(artifacts, state, args.regex_file, args.outdir, args.do_cleanup)
+    summary = scanner.run()
+
+    summary_file = state_file.with_name(SUMMARY_FILENAME)
+
+    with open(summary_file, "w", encoding="utf-8") as fd:
+        json.dump(summary, fd, indent=4)
+
+    print(f"[+] Scanned {summary['apps']} apps in {round(summary['seconds'], 1)} seconds: "
+          + ", ".join(f"{count} {status}" for status, count in summary["statuses"].items()))
+    print(f"[+] {summary['findings']} findings")
+
+    for regex_name, count in summary["findings_by_regex"].items():
+        print(f"    {count:>8}  {regex_name}")
+
+    for failure in summary["failures"]:
+        print(f"[!] Failed: {failure['app']}: {failure['error']}")
+
+    for timeout in summary["timeouts"]:
+        print(f"[!] Out of time: {timeout['app']}: {timeout['regex']} in {timeout['path']}")
+
+    print(f"[*] Summary can be found here {summary_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+"""Benchmark the Appalyzer scanner backends and analyzers"""
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import resource
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from AppAnalyzerConfig import AppAnalyzerConfig
+from Appalyzer import Appalyzer
+from ApkAnalyzer import ApkAnalyzer
+from DirAnalyzer import DirAnalyzer
+from DllAnalyzer import DllAnalyzer
+from IpaAnalyzer import IpaAnalyzer
+from ZipAnalyzer import ZipAnalyzer
+from BenchmarkCorpus import BenchmarkCorpus
+
+BACKENDS = ['thread', 'process']
+
+ANALYZERS = {"DirAnalyzer": DirAnalyzer,
+             "ApkAnalyzer": ApkAnalyzer,
+             "DllAnalyzer": DllAnalyzer,
+             "ZipAnalyzer": ZipAnalyzer,
+             "IpaAnalyzer": IpaAnalyzer}
+
+# Metrics compared against the baseline, and whether higher is better
+METRICS = {"files_per_s": True, "mb_per_s": True, "peak_rss_mb": False}
+
+
+def count_findings(outfile:Path) -> int:
+    """
+    Count the findings written to a results file
+    """
+    with open(outfile, "r", encoding="utf-8") as fd:
+        return sum(1 for line in fd if line.startswith("- PATH:"))
+
+
+def run_backend(scan_dir:Path, backend:str, workers:int, regex_file:str, outdir:Path) -> dict[str, any]:
+    """
+    Scan the directory once with the given backend
+
+    Parameters
+    ----------
+    scan_dir : Path
+        Decompiled application tree to scan
+
+    backend : str
+        Scanner backend, "thread" or "process"
+
+    workers : int
+        Number of scanner workers, 0 to let the executor decide
+
+    regex_file : str
+        Custom regex file, None to use the default regex file
+
+    outdir : Path
+        Directory to write the results file to
+
+    Returns
+    ----------
+    dict[str, any]
+        Timing and number of findings of the run
+    """
+
+    appconfig = AppAnalyzerConfig()
+    appconfig.set_config_value('SCAN_BACKEND', backend)
+    appconfig.set_config_value('SCAN_WORKERS', workers)
+
+    analyzer = Appalyzer(scan_dir, regex_file)
+    analyzer.outfile = outdir.joinpath(f"{backend}_{workers}_results.out")
+    analyzer._write_header()
+
+    start_time = time.perf_counter()
+    analyzer._search(scan_dir)
+    elapsed = time.perf_counter() - start_time
+
+    return {"backend": backend, "workers": workers, "seconds": elapsed,
+            "findings": count_findings(analyzer.outfile)}
+
+
+def input_size(target:Path) -> tuple[int, int]:
+    """
+    Return the number of files and bytes an analyzer has to search
+
+    Parameters
+    ----------
+    target : Path
+        Directory, or archive, being searched
+
+    Returns
+    ----------
+    tuple[int, int]
+        Number of files and their total size in bytes
+    """
+
+    if target.is_dir():
+        sizes = [f.stat().st_size for f in target.rglob('*') if f.is_file()]
+
+    else:
+        with zipfile.ZipFile(target, mode='r') as zfile:
+            sizes = [info.file_size for info in zfile.infolist() if not info.is_dir()]
+
+    return len(sizes), sum(sizes)
+
+
+def run_case(analyzer_name:str, target:str, scan_tree:str, planted:list[str],
+             overrides:dict[str, any], outdir:str) -> dict[str, any]:
+    """
+    Run an analyzer once on a synthetic app, in a fresh process so the
+    peak memory used is its own
+
+    Parameters
+    ----------
+    analyzer_name : str
+        Name of the analyzer class
+
+    target : str
+        App, or directory, to scan
+
+    scan_tree : str
+        Tree searched by the analyzer, the decompiled tree for apk and dll files
+
+    planted : list[str]
+        Secrets planted in the app
+
+    overrides : dict[str, any]
+        Configuration values to override
+
+    outdir : str
+        Directory to write the results file to
+
+    Returns
+    ----------
+    dict[str, any]
+        Timings, throughput, peak memory and findings of the run
+    """
+
+    logging.basicConfig(level=logging.WARNING)
+
+    appconfig = AppAnalyzerConfig()
+
+    for key, value in overrides.items():
+        appconfig.set_config_value(key, value)
+
+    analyzer = ANALYZERS[analyzer_name](target)
+    analyzer.outfile = Path(outdir).joinpath(f"{analyzer_name}_{overrides['SCAN_BACKEND']}_results.out")
+
+    stages = {}
+    start_time = time.perf_counter()
+
+    if isinstance(analyzer, (ApkAnalyzer, DllAnalyzer)):
+        analyzer._write_header()
+
+        stage_time = time.perf_counter()
+        analyzer._decompile_app()
+        stages["decompile"] = time.perf_counter() - stage_time
+
+        stage_time = time.perf_counter()
+        analyzer._search(analyzer._outdir)
+        stages["search"] = time.perf_counter() - stage_time
+
+    else:
+        stage_time = time.perf_counter()
+        analyzer.secret_search()
+        stages["search"] = time.perf_counter() - stage_time
+
+    elapsed = time.perf_counter() - start_time
+
+    # Breakdown of the search stage, when profiling
+    if analyzer._profiler:
+        stages.update({stage: seconds for stage, (seconds, _) in analyzer._profiler.stages.items()
+                       if stage != "decompile"})
+
+    # Peak memory of this process and of the scanner processes, in kilobytes on Linux
+    peak_rss = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    num_files, num_bytes = input_size(Path(scan_tree))
+
+    with open(analyzer.outfile, "r", encoding="utf-8") as fd:
+        report = fd.read()
+
+    analyzer.cleanup()
+
+    return {"seconds": elapsed,
+            "stages": stages,
+            "files": num_files,
+            "mb": num_bytes / 1024 ** 2,
+            "files_per_s": num_files / elapsed,
+            "mb_per_s": num_bytes / 1024 ** 2 / elapsed,
+            "peak_rss_mb": peak_rss / 1024,
+            "findings": report.count("- PATH:"),
+            "missed": [secret for secret in planted if secret not in report]}
+
+
+def make_corpus(corpus_dir:Path, num_files:int, num_members:int, num_frameworks:int,
+                seed:int) -> tuple[dict[str, tuple[Path, Path, list[str]]], Path]:
+    """
+    Generate the synthetic apps each analyzer is benchmarked on
+
+    Returns
+    ----------
+    tuple[dict[str, tuple[Path, Path, list[str]]], Path]
+        Analyzer names mapped to the app to scan, the tree it searches and
+        the secrets planted in it, and the fake decompiler
+    """
+
+    corpus = BenchmarkCorpus(corpus_dir, seed)
+    cases = {}
+
+    planted = len(corpus.planted)
+    tree = corpus.make_jadx_tree(num_files)
+    tree_planted = corpus.planted[planted:]
+
+    # Decompiling these "apps" copies the jadx tree
+    fake_decompiler = corpus.make_fake_decompiler(tree)
+    apk = corpus_dir.joinpath("bench.apk")
+    apk.write_bytes(b"PK\x05\x06" + bytes(18))
+    dll = corpus_dir.joinpath("bench.dll")
+    dll.write_bytes(b"MZ" + bytes(62))
+
+    cases["DirAnalyzer"] = (tree, tree, tree_planted)
+    cases["ApkAnalyzer"] = (apk, tree, tree_planted)
+    cases["DllAnalyzer"] = (dll, tree, tree_planted)
+
+    planted = len(corpus.planted)
+    archive = corpus.make_zip(num_members)
+    cases["ZipAnalyzer"] = (archive, archive, corpus.planted[planted:])
+
+    planted = len(corpus.planted)
+    archive = corpus.make_ipa(num_frameworks)
+    cases["IpaAnalyzer"] = (archive, archive, corpus.planted[planted:])
+
+    return cases, fake_decompiler
+
+
+def compare_baseline(results:dict[str, dict], baseline:dict[str, dict], threshold:float) -> list[str]:
+    """
+    Compare the results of a suite run against a baseline
+
+    Parameters
+    ----------
+    results : dict[str, dict]
+        Results of each case of this run
+
+    baseline : dict[str, dict]
+        Results of each case of the baseline run
+
+    threshold : float
+        Allowed relative change before a metric is reported as a regression, i.e. 0.15
+
+    Returns
+    ----------
+    list[str]
+        Description of each regression
+    """
+
+    regressions = []
+
+    for case, result in results.items():
+
+        if case not in baseline:
+            print(f"[*] {case}: not in the baseline")
+            continue
+
+        for metric, higher_is_better in METRICS.items():
+            old = baseline[case][metric]
+            new = result[metric]
+            change = (new - old) / old if old else 0.0
+
+            print(f"    {case:<24}{metric:<14}{old:>12.2f}{new:>12.2f}{change:>+10.1%}")
+
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append(f"{case} {metric} {old:.2f} -> {new:.2f} ({change:+.1%})")
+
+        if result["findings"] != baseline[case]["findings"]:
+            print(f"[!] {case}: {baseline[case]['findings']} findings in the baseline, {result['findings']} now")
+
+    return regressions
+
+
+def run_suite(args:argparse.Namespace) -> int:
+    """
+    Benchmark every analyzer on synthetic apps and compare against the baseline
+
+    Returns
+    ----------
+    int
+        Exit code, 1 if a metric regressed or a planted secret was missed
+    """
+
+    params = {"files": args.files, "members": args.members, "frameworks": args.frameworks,
+              "seed": args.seed}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        corpus_dir = Path(args.corpus_dir) if args.corpus_dir else Path(tmpdir).joinpath("corpus")
+        outdir = Path(tmpdir).joinpath("out")
+        outdir.mkdir()
+
+        print(f"[*] Generating synthetic apps in {corpus_dir}")
+        cases, fake_decompiler = make_corpus(corpus_dir, args.files, args.members, args.frameworks, args.seed)
+
+        results = {}
+        failed = False
+
+        print(f"{'analyzer':<14}{'backend':<9}{'seconds':>9}{'files/s':>10}{'mb/s':>9}"
+              f"{'rss mb':>9}{'findings':>10}  stages")
+
+        for backend in args.backends:
+            for analyzer_name, (target, scan_tree, planted) in cases.items():
+
+                overrides = {"SCAN_BACKEND": backend, "SCAN_WORKERS": args.workers[0],
+                             "OUTDIR_PATH": outdir, "DECOMPILE_CACHE": False,
+                             "INCREMENTAL": False, "JADX_PATH": fake_decompiler,
+                             "ILSPYCMD_PATH": fake_decompiler, "PROFILE": args.profile}
+
+                if args.regex_file:
+                    overrides["REGEX_PATH"] = args.regex_file
+
+                runs = []
+
+                for _ in range(args.repeat):
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=1,
+                                                                mp_context=multiprocessing.get_context("spawn")) as executor:
+                        runs.append(executor.submit(run_case, analyzer_name, str(target), str(scan_tree),
+                                                    planted, overrides, str(outdir)).result())
+
+                best = min(runs, key=lambda run: run["seconds"])
+                results[f"{analyzer_name}/{backend}"] = best
+
+                stages = " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in best["stages"].items())
+
+                print(f"{analyzer_name:<14}{backend:<9}{best['seconds']:>9.2f}{best['files_per_s']:>10.1f}"
+                      f"{best['mb_per_s']:>9.2f}{best['peak_rss_mb']:>9.1f}{best['findings']:>10}  {stages}")
+
+                if best["missed"]:
+                    failed = True
+                    print(f"[!] {analyzer_name}/{backend} missed {len(best['missed'])} planted secrets: {best['missed'][:5]}")
+
+    baseline_file = Path(args.baseline)
+
+    if args.save_baseline:
+        with open(baseline_file, "w", encoding="utf-8") as fd:
+            json.dump({"params": params, "results": results}, fd, indent=4)
+
+        print(f"[+] Baseline saved to {baseline_file}")
+
+    elif baseline_file.is_file():
+        with open(baseline_file, "r", encoding="utf-8") as fd:
+            baseline = json.load(fd)
+
+        if baseline["params"] != params:
+            print(f"[!] Baseline {baseline_file} was made with {baseline['params']}, not comparing")
+
+        else:
+            print(f"[*] Comparing against {baseline_file}, threshold {args.threshold:.0%}")
+            print(f"    {'case':<24}{'metric':<14}{'baseline':>12}{'now':>12}{'change':>10}")
+
+            regressions = compare_baseline(results, baseline["results"], args.threshold)
+
+            for regression in regressions:
+                print(f"[!] Regression: {regression}")
+
+            failed = failed or bool(regressions)
+
+    else:
+        print(f"[*] No baseline found at {baseline_file}, save one with --save-baseline")
+
+    return 1 if failed else 0
+
+
+def main():
+    """Main Execution Module for the benchmark"""
+
+    parser = argparse.ArgumentParser(description="Compare the thread and process scanner backends on a decompiled application tree, "
+                                                 "or without a tree, benchmark every analyzer on synthetic apps")
+    parser.add_argument("scan_dir", help="Decompiled application tree to scan, i.e. jadx output directory (Default = run the synthetic benchmark suite)", type=str, nargs='?', default=None)
+    parser.add_argument('-r', '--regex', help="Custom regex file to use in JSON format", dest='regex_file', type=str, default=None)
+    parser.add_argument('-w', '--workers', help="Number of scanner workers to benchmark (Default = 0, let the executor decide)", dest='workers', type=int, nargs='+', default=[0])
+    parser.add_argument('-n', '--repeat', help="Number of runs for each backend, the best run is reported (Default = 3)", dest='repeat', type=int, default=3)
+    parser.add_argument('-b', '--backend', help="Scanner backends to benchmark in the suite (Default = thread process)", dest='backends', choices=BACKENDS, nargs='+', default=BACKENDS)
+    parser.add_argument('--files', help="Number of Java files in the synthetic jadx tree (Default = 2000)", dest='files', type=int, default=2000)
+    parser.add_argument('--members', help="Number of members in the synthetic zip file (Default = 500)", dest='members', type=int, default=500)
+    parser.add_argument('--frameworks', help="Number of frameworks in the synthetic ipa file (Default = 50)", dest='frameworks', type=int, default=50)
+    parser.add_argument('--seed', help="Seed used to generate the synthetic apps (Default = 42)", dest='seed', type=int, default=42)
+    parser.add_argument('--corpus-dir', help="Directory to generate the synthetic apps in (Default = temporary directory)", dest='corpus_dir', type=str, default=None)
+    parser.add_argument('--profile', help="Break the search stage of the suite down into the profiled stages, slows the scans down", dest='profile', action='store_true')
+    parser.add_argument('--baseline', help="Baseline results file (Default = benchmark_baseline.json)", dest='baseline', type=str, default="benchmark_baseline.json")
+    parser.add_argument('--save-baseline', help="Save the results of this run as the baseline", dest='save_baseline', action='store_true')
+    parser.add_argument('--threshold', help="Relative change of a metric reported as a regression (Default = 0.15)", dest='threshold', type=float, default=0.15)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.scan_dir is None:
+        raise SystemExit(run_suite(args))
+
+    scan_dir = Path(args.scan_dir)
+    file_list = [x for x in scan_dir.glob('**/*') if x.is_file()]
+    total_mb = sum(x.stat().st_size for x in file_list) / 1024 ** 2
+
+    print(f"[*] Benchmarking {len(file_list)} files ({round(total_mb, 1)} mb) in {scan_dir}")
+    print(f"{'backend':<10}{'workers':>8}{'seconds':>10}{'files/s':>10}{'mb/s':>10}{'findings':>10}")
+
+    with tempfile.TemporaryDirectory() as outdir:
+
+        for backend in BACKENDS:
+            for workers in args.workers:
+
+                runs = [run_backend(scan_dir, backend, workers, args.regex_file, Path(outdir))
+                        for _ in range(args.repeat)]
+                best = min(runs, key=lambda run: run["seconds"])
+
+                print(f"{backend:<10}{workers:>8}{best['seconds']:>10.2f}"
+                      f"{len(file_list) / best['seconds']:>10.1f}"
+                      f"{total_mb / best['seconds']:>10.2f}{best['findings']:>10}")
+
+
+if __name__ == '__main__':
+    main()
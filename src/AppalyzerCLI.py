@@ -86,8 +86,39 @@ def main():
 	parser.add_argument("scanobj", help=f"Directory or Application file to scan.  Currently only supports apps with extensions, {FILE_EXT} ", type=str)
 	parser.add_argument('--cleanup', help="Cleanup working directory on exit (Default = False)", dest='do_cleanup', action='store_true')
 	parser.add_argument('-r', '--regex', help="Custom regex file to use in JSON format", dest='regex_file', type=str, default=None)
+	parser.add_argument('-b', '--backend', help="Scan files with a pool of threads or processes, auto uses processes when regexes have a time budget (Default = SCAN_BACKEND in config.ini)", dest='backend', choices=['auto', 'thread', 'process'], default=None)
+	parser.add_argument('-i', '--incremental', help="Only search files of a directory changed since the last scan (Default = INCREMENTAL in config.ini)", dest='incremental', action='store_true')
+	parser.add_argument('-w', '--workers', help="Number of scanner workers (Default = SCAN_WORKERS in config.ini)", dest='workers', type=int, default=None)
+	parser.add_argument('-p', '--profile', help="Record the time spent in each stage, file type and regex, and print the slowest (Default = PROFILE in config.ini)", dest='profile', action='store_true')
+	parser.add_argument('-m', '--apk-mode', help="Search apps decompiled by jadx, only the string pools of their dex files, or both (Default = APK_SCAN_MODE in config.ini)", dest='apk_mode', choices=['decompile', 'dex', 'both'], default=None)
+	parser.add_argument('-d', '--dll-mode', help="Search DLLs decompiled by ilspycmd, only the strings of their metadata and resources, or both.  With a directory, the metadata of every DLL under it is searched (Default = DLL_SCAN_MODE in config.ini)", dest='dll_mode', choices=['decompile', 'metadata', 'both'], default=None)
+	parser.add_argument('-f', '--format', help="Also write the findings as JSON Lines and/or SARIF 2.1.0, next to the results file (Default = OUTPUT_FORMATS in config.ini)", dest='formats', choices=['jsonl', 'sarif'], nargs='+', default=None)
 	args = parser.parse_args()
 
+	# Commandline arguments override the configuration file
+	appconfig = AppAnalyzerConfig()
+
+	if args.backend:
+		appconfig.set_config_value('SCAN_BACKEND', args.backend)
+
+	if args.workers is not None:
+		appconfig.set_config_value('SCAN_WORKERS', args.workers)
+
+	if args.incremental:
+		appconfig.set_config_value('INCREMENTAL', True)
+
+	if args.formats:
+		appconfig.set_config_value('OUTPUT_FORMATS', ','.join(args.formats))
+
+	if args.profile:
+		appconfig.set_config_value('PROFILE', True)
+
+	if args.apk_mode:
+		appconfig.set_config_value('APK_SCAN_MODE', args.apk_mode)
+
+	if args.dll_mode:
+		appconfig.set_config_value('DLL_SCAN_MODE', args.dll_mode)
+
 	# define some vars
 	app_extension = None
 	do_cleanup = args.do_cleanup
@@ -120,7 +151,11 @@ def main():
 	else:
 		print("[*] Using default regex file")
 
-	if Path(scanobj).is_dir():
+	if Path(scanobj).is_dir() and args.dll_mode:
+		print("[+] Creating DLL directory scanner...")
+		appalyzer = DllAnalyzer(scanobj, regex_file)
+
+	elif Path(scanobj).is_dir():
 		print("[+] Creating Directory scanner...")
 		appalyzer = DirAnalyzer(scanobj, regex_file)
 
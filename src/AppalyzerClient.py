@@ -0,0 +1,220 @@
+"""Thin client of the scan daemon, a drop in for AppalyzerCLI in CI where the start up cost dominates"""
+import argparse
+import http.client
+import json
+import socket
+import sys
+import time
+from pathlib import Path
+from AppAnalyzerConfig import AppAnalyzerConfig
+
+# Seconds each status request waits for the job to finish
+POLL_WAIT = 30
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP connection over a Unix domain socket
+    """
+
+    def __init__(self, socket_path:str, timeout:float = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DaemonClient():
+    """
+    Submit scans to the daemon and fetch their results
+    """
+
+    def __init__(self, socket_path:str = None, port:int = None) -> None:
+        """
+        Parameters
+        ----------
+        socket_path : str
+            Unix domain socket of the daemon
+
+        port : int
+            Port of the daemon on 127.0.0.1, used instead of the socket
+        """
+
+        self.socket_path = socket_path
+        self.port = port
+
+
+    def _request(self, method:str, path:str, body:dict[str, any] = None) -> tuple[int, str]:
+        """
+        Send a request to the daemon
+
+        Returns
+        ----------
+        tuple[int, str]
+            Status code and body of the response
+        """
+
+        # Status requests wait up to POLL_WAIT seconds for the job
+        timeout = POLL_WAIT + 30
+
+        if self.port:
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+
+        else:
+            conn = UnixHTTPConnection(self.socket_path, timeout=timeout)
+
+        try:
+            data = json.dumps(body).encode("utf-8") if body is not None else None
+            conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+
+            return response.status, response.read().decode("utf-8")
+
+        finally:
+            conn.close()
+
+
+    def _json(self, method:str, path:str, body:dict[str, any] = None) -> dict[str, any]:
+        """
+        Send a request to the daemon and return its json response
+
+        Raises
+        ----------
+        RuntimeError
+            If the daemon refused the request
+        """
+
+        status, text = self._request(method, path, body)
+        response = json.loads(text)
+
+        if status >= 400:
+            raise RuntimeError(response.get("error", text))
+
+        return response
+
+
+    def submit(self, target:str, client:str = None, regex_file:str = None, cleanup:bool = False) -> dict[str, any]:
+        """
+        Queue a scan, paths are sent absolute since the daemon runs elsewhere
+        """
+
+        return self._json("POST", "/jobs", {"target": str(Path(target).absolute()), "client": client,
+                                            "regex_file": str(Path(regex_file).absolute()) if regex_file else None,
+                                            "cleanup": cleanup})
+
+
+    def status(self, job_id:str = None, wait:float = 0) -> dict[str, any]:
+        """
+        Return the status of a job, waiting up to wait seconds for it to
+        finish, or the status of the daemon if job_id is None
+        """
+
+        if job_id is None:
+            return self._json("GET", "/status")
+
+        return self._json("GET", f"/jobs/{job_id}?wait={wait}")
+
+
+    def wait(self, job_id:str) -> dict[str, any]:
+        """
+        Return the status of a job once it is finished
+        """
+
+        while True:
+            job = self.status(job_id, POLL_WAIT)
+
+            if job["status"] in ("done", "failed"):
+                return job
+
+
+    def results(self, job_id:str) -> str:
+        """
+        Return the results file of a finished job
+        """
+
+        status, text = self._request("GET", f"/jobs/{job_id}/results")
+
+        if status >= 400:
+            raise RuntimeError(json.loads(text).get("error", text))
+
+        return text
+
+
+def main():
+    """Main Execution Module for the daemon client"""
+
+    appconfig = AppAnalyzerConfig()
+
+    parser = argparse.ArgumentParser(description="Search for secrets in a directory or application with a running AppalyzerDaemon.py")
+    parser.add_argument("scanobj", help="Directory or Application file to scan, omit to use --job or --status", type=str, nargs='?')
+    parser.add_argument('-r', '--regex', help="Custom regex file to use in JSON format", dest='regex_file', type=str, default=None)
+    parser.add_argument('--cleanup', help="Cleanup working directory once scanned (Default = False)", dest='do_cleanup', action='store_true')
+    parser.add_argument('-c', '--client', help="Name of this client, i.e. the CI pipeline, jobs of different clients are run round robin (Default = the host name)", dest='client', type=str, default=socket.gethostname())
+    parser.add_argument('-s', '--socket', help="Unix domain socket of the daemon (Default = DAEMON_SOCKET in config.ini, or OUTDIR_PATH/appalyzer.sock)", dest='socket', type=str, default=None)
+    parser.add_argument('-P', '--port', help="Port of the daemon on 127.0.0.1 instead of a Unix domain socket (Default = DAEMON_PORT in config.ini)", dest='port', type=int, default=None)
+    parser.add_argument('--no-wait', help="Print the job id and exit without waiting for the results", dest='no_wait', action='store_true')
+    parser.add_argument('--job', help="Wait for a job submitted with --no-wait and print its results", dest='job_id', type=str, default=None)
+    parser.add_argument('--status', help="Print the status of the daemon", dest='status', action='store_true')
+    parser.add_argument('-o', '--output', help="Write the results to this file instead of printing them", dest='output', type=str, default=None)
+    parser.add_argument('--fail-on-findings', help="Exit with 1 when secrets are found", dest='fail_on_findings', action='store_true')
+    args = parser.parse_args()
+
+    port = args.port if args.port is not None else appconfig.get_daemon_port()
+    client = DaemonClient(args.socket or appconfig.get_daemon_socket(), port)
+
+    start_time = time.time()
+
+    try:
+        if args.status:
+            print(json.dumps(client.status(), indent=4))
+            return
+
+        if args.job_id:
+            job_id = args.job_id
+
+        elif args.scanobj:
+            job_id = client.submit(args.scanobj, args.client, args.regex_file, args.do_cleanup)["id"]
+            print(f"[*] Submitted job {job_id}", file=sys.stderr)
+
+            if args.no_wait:
+                print(job_id)
+                return
+
+        else:
+            parser.print_help(sys.stderr)
+            sys.exit(1)
+
+        job = client.wait(job_id)
+
+        if job["status"] == "failed":
+            print(f"[!] Job {job_id} failed: {job['error']}", file=sys.stderr)
+            sys.exit(1)
+
+        results = client.results(job_id)
+
+    except (OSError, RuntimeError) as err:
+        print(f"[!] {err}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fd:
+            fd.write(results)
+
+    else:
+        print(results)
+
+    findings = sum(job["findings"].values())
+
+    print(f"[+] {findings} findings, search took {round(time.time() - start_time, 1)} seconds "
+          f"({round(job['finished'] - job['started'], 1)} seconds in the daemon)", file=sys.stderr)
+
+    if args.fail_on_findings and findings:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
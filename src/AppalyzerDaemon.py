@@ -0,0 +1,586 @@
+"""Long running scan daemon, keeping the regexes compiled and the scanner workers warm between scans"""
+import argparse
+import collections
+import concurrent.futures
+import dataclasses
+import http.server
+import json
+import logging
+import os
+import shutil
+import signal
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+from AppAnalyzerConfig import AppAnalyzerConfig
+from AppalyzerBatch import ANALYZERS
+from AppalyzerCLI import banner, configure_logging
+from DirAnalyzer import DirAnalyzer
+
+RESULTS_DIRNAME = "daemon_results"
+
+
+@dataclasses.dataclass
+class ScanJob:
+    '''
+    Scan submitted to the daemon
+    '''
+    id: str
+    target: str
+    client: str
+    regex_file: str = None
+    cleanup: bool = False
+    status: str = "queued"
+    submitted: float = dataclasses.field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    outfile: str = None
+    findings: dict[str, int] = None
+    timeouts: list[dict[str, any]] = None
+    error: str = None
+    done: threading.Event = dataclasses.field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> dict[str, any]:
+        '''
+        Return the job as a json serializable dict
+        '''
+        return {field.name: getattr(self, field.name) for field in dataclasses.fields(self)
+                if field.name != "done"}
+
+
+class JobScheduler():
+    """
+    Run the jobs submitted by several clients, a few at a time
+
+    Each client, i.e. a CI pipeline, has its own queue and the queues are
+    served round robin, so a client submitting many jobs does not hold
+    back the others.  The jobs of a client run in the order they were submitted
+    """
+
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, jobs:int, run:Callable[[ScanJob], None]) -> None:
+        """
+        Parameters
+        ----------
+        jobs : int
+            Maximum number of jobs running at once
+
+        run : Callable[[ScanJob], None]
+            Called with each ScanJob to run it
+        """
+
+        self._run = run
+        self._cond = threading.Condition()
+        # client -> deque of jobs, clients in the order they are served
+        self._queues = collections.OrderedDict()
+        self._stopping = False
+        self.running = 0
+        self._threads = [threading.Thread(target=self._worker, name=f"ScanJob_{i}", daemon=True)
+                         for i in range(jobs)]
+
+        for thread in self._threads:
+            thread.start()
+
+
+    def submit(self, job:ScanJob) -> int:
+        """
+        Queue a job
+
+        Returns
+        ----------
+        int
+            Number of jobs of the same client queued before it
+        """
+
+        with self._cond:
+            queue = self._queues.setdefault(job.client, collections.deque())
+            queue.append(job)
+            self._cond.notify()
+
+            return len(queue) - 1
+
+
+    def queued(self) -> int:
+        """
+        Return the number of jobs waiting to run
+        """
+        with self._cond:
+            return sum(len(queue) for queue in self._queues.values())
+
+
+    def _next(self) -> ScanJob:
+        """
+        Take the next job of the client that was served the longest ago
+        """
+
+        client, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+
+        if queue:
+            self._queues.move_to_end(client)
+
+        else:
+            del self._queues[client]
+
+        return job
+
+
+    def _worker(self) -> None:
+        """
+        Run jobs until the scheduler is stopped
+        """
+
+        while True:
+            with self._cond:
+                while not self._queues and not self._stopping:
+                    self._cond.wait()
+
+                if self._stopping:
+                    return
+
+                job = self._next()
+                self.running += 1
+
+            try:
+                self._run(job)
+
+            except Exception:
+                JobScheduler.logger.exception("[!] Job %s crashed", job.id)
+
+            finally:
+                with self._cond:
+                    self.running -= 1
+
+
+    def stop(self) -> None:
+        """
+        Stop taking jobs off the queues and wait for the running jobs
+        """
+
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+        for thread in self._threads:
+            thread.join()
+
+
+class ScanDaemon():
+    """
+    Run scan jobs with warm state
+
+    The regexes of each regex file are compiled once (see Appalyzer) and
+    the files of every job are searched by one pool of scanner threads,
+    interleaving the files of concurrent jobs.  libmagic is loaded once by
+    each scanner thread.  The configuration is shared by every job, only the
+    target, regex file and cleanup are set per job.  Results of the last
+    MAX_FINISHED_JOBS jobs are kept
+    """
+
+    logger = logging.getLogger(__name__)
+
+    MAX_FINISHED_JOBS = 500
+
+    def __init__(self, jobs:int = None) -> None:
+        """
+        Parameters
+        ----------
+        jobs : int
+            Maximum number of jobs running at once, None for DAEMON_JOBS in config.ini
+        """
+
+        appconfig = AppAnalyzerConfig()
+
+        self.results_dir = Path(appconfig.get_outdir_path()).joinpath(RESULTS_DIRNAME)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._finished = collections.deque()
+        self._executor = None
+
+        if appconfig.get_scan_backend() == "thread":
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=appconfig.get_scan_workers(),
+                                                                   thread_name_prefix='LocalSecretScanner_')
+
+        self._scheduler = JobScheduler(jobs or appconfig.get_daemon_jobs(), self._run_job)
+
+
+    def submit(self, target:str, client:str = "default", regex_file:str = None,
+               cleanup:bool = False) -> ScanJob:
+        """
+        Queue a scan
+
+        Parameters
+        ----------
+        target : str
+            Absolute path of the app or directory to scan
+
+        client : str
+            Name of the client, jobs of different clients are run round robin
+
+        regex_file : str
+            Absolute path of a custom regex file, None to use the default regex file
+
+        cleanup : bool
+            Cleanup the working directory once the app is scanned
+
+        Returns
+        ----------
+        ScanJob
+            The job
+
+        Raises
+        ----------
+        ValueError
+            If the target or the regex file can't be scanned with
+        """
+
+        target_path = Path(target)
+
+        if not target_path.is_absolute() or not target_path.exists():
+            raise ValueError(f"{target} is not an absolute path to an existing app or directory")
+
+        if not target_path.is_dir() and target_path.suffix.lower() not in ANALYZERS:
+            raise ValueError(f"Unsupported file format: {target_path.suffix}")
+
+        if regex_file and (not Path(regex_file).is_absolute() or not Path(regex_file).is_file()):
+            raise ValueError(f"{regex_file} is not an absolute path to a regex file")
+
+        job = ScanJob(uuid.uuid4().hex[:12], str(target_path), str(client), regex_file, bool(cleanup))
+
+        with self._lock:
+            self._jobs[job.id] = job
+
+        position = self._scheduler.submit(job)
+        ScanDaemon.logger.info("[*] Job %s queued for %s, %s: %s", job.id, client, position, target)
+
+        return job
+
+
+    def get(self, job_id:str) -> ScanJob | None:
+        """
+        Return a job, None if it is unknown
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+
+    def status(self) -> dict[str, any]:
+        """
+        Return the status of the daemon
+        """
+
+        with self._lock:
+            statuses = collections.Counter(job.status for job in self._jobs.values())
+
+        return {"pid": os.getpid(), "uptime": time.time() - self.started,
+                "queued": self._scheduler.queued(), "running": self._scheduler.running,
+                "jobs": dict(statuses)}
+
+
+    def _run_job(self, job:ScanJob) -> None:
+        """
+        Scan the target of a job, recording its status
+        """
+
+        job.status = "running"
+        job.started = time.time()
+        appalyzer = None
+
+        try:
+            target = Path(job.target)
+
+            if target.is_dir():
+                appalyzer = DirAnalyzer(target, job.regex_file)
+
+            else:
+                appalyzer = ANALYZERS[target.suffix.lower()](target, job.regex_file)
+
+            if self._executor:
+                appalyzer.set_executor(self._executor)
+
+            # Results of each job go to their own directory, removed with the job
+            job_dir = self.results_dir.joinpath(job.id)
+            job_dir.mkdir()
+            appalyzer.outfile = job_dir.joinpath(appalyzer.outfile.name)
+
+            appalyzer.secret_search()
+
+        except Exception as err:
+            ScanDaemon.logger.exception("[!] Job %s failed to scan %s", job.id, job.target)
+            job.status = "failed"
+            job.error = str(err)
+
+        else:
+            job.status = "done"
+            job.outfile = str(appalyzer.outfile)
+            job.findings = appalyzer.finding_counts
+            job.timeouts = appalyzer.timeouts
+
+        finally:
+            if appalyzer and job.cleanup:
+                appalyzer.cleanup()
+
+            job.finished = time.time()
+            job.done.set()
+            self._retire(job)
+
+            ScanDaemon.logger.info("[*] Job %s %s in %.1f seconds", job.id, job.status,
+                                   job.finished - job.started)
+
+
+    def _retire(self, job:ScanJob) -> None:
+        """
+        Forget the oldest finished jobs, and remove their results, once
+        more than MAX_FINISHED_JOBS are kept
+        """
+
+        with self._lock:
+            self._finished.append(job.id)
+            forgotten = []
+
+            while len(self._finished) > ScanDaemon.MAX_FINISHED_JOBS:
+                forgotten.append(self._jobs.pop(self._finished.popleft()))
+
+        for old_job in forgotten:
+            shutil.rmtree(self.results_dir.joinpath(old_job.id), ignore_errors=True)
+
+
+    def stop(self) -> None:
+        """
+        Wait for the running jobs, queued jobs are dropped
+        """
+
+        self._scheduler.stop()
+
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+
+class DaemonRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    JSON API of the daemon
+
+    POST /jobs                 submit {"target", "client", "regex_file", "cleanup"}
+    GET  /jobs/<id>[?wait=s]   status of a job, waiting up to s seconds for it to finish
+    GET  /jobs/<id>/results    results file of a finished job
+    GET  /status               status of the daemon
+
+    Requests must be sent as application/json, and on a port with a 127.0.0.1 or
+    localhost Host header, so a web page can't submit jobs or read results
+    through the browser of the user, i.e. with DNS rebinding
+    """
+
+    logger = logging.getLogger(__name__)
+
+    # Longest a status request waits for a job to finish
+    MAX_WAIT = 60
+
+    def log_message(self, format:str, *args) -> None:
+        DaemonRequestHandler.logger.debug(format, *args)
+
+
+    def _send(self, code:int, body:any, content_type:str = "application/json") -> None:
+        """
+        Send a response, body is sent as json unless it is a string
+        """
+
+        data = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def _host_allowed(self) -> bool:
+        """
+        Check the Host header when listening on a port, sending an error if it isn't allowed
+        """
+
+        allowed_hosts = self.server.allowed_hosts
+
+        if allowed_hosts is not None and self.headers.get("Host") not in allowed_hosts:
+            self._send(403, {"error": f"Host {self.headers.get('Host')} is not allowed"})
+            return False
+
+        return True
+
+
+    def do_POST(self) -> None:
+        """
+        Submit a job
+        """
+
+        if not self._host_allowed():
+            return
+
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"error": f"Content-Type must be application/json, not {self.headers.get_content_type()}"})
+            return
+
+        if self.path != "/jobs":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            job = self.server.scan_daemon.submit(request["target"], request.get("client") or "default",
+                                                 request.get("regex_file"), request.get("cleanup", False))
+
+        except (KeyError, ValueError) as err:
+            self._send(400, {"error": str(err)})
+
+        else:
+            self._send(202, job.to_dict())
+
+
+    def do_GET(self) -> None:
+        """
+        Return the status of the daemon or of a job, or the results of a job
+        """
+
+        if not self._host_allowed():
+            return
+
+        path, _, query = self.path.partition("?")
+        parts = path.strip("/").split("/")
+
+        if parts == ["status"]:
+            self._send(200, self.server.scan_daemon.status())
+            return
+
+        if len(parts) not in (2, 3) or parts[0] != "jobs" or len(parts) == 3 and parts[2] != "results":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        job = self.server.scan_daemon.get(parts[1])
+
+        if job is None:
+            self._send(404, {"error": f"Unknown job {parts[1]}"})
+            return
+
+        if len(parts) == 2:
+            params = dict(param.partition("=")[::2] for param in query.split("&") if param)
+
+            try:
+                wait = min(float(params.get("wait", 0)), DaemonRequestHandler.MAX_WAIT)
+
+            except ValueError:
+                self._send(400, {"error": f"Invalid wait {params['wait']}"})
+                return
+
+            if wait > 0:
+                job.done.wait(wait)
+
+            self._send(200, job.to_dict())
+
+        elif job.status != "done":
+            self._send(409, {"error": f"Job {job.id} is {job.status}", **job.to_dict()})
+
+        else:
+            with open(job.outfile, "r", encoding="utf-8") as fd:
+                self._send(200, fd.read(), "text/plain; charset=utf-8")
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    HTTP server listening on a Unix domain socket, only the user running the daemon can connect
+    """
+
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        Path(self.server_address).unlink(missing_ok=True)
+
+        # Create the socket without access for others, instead of restricting it once it exists
+        umask = os.umask(0o177)
+
+        try:
+            super().server_bind()
+
+        finally:
+            os.umask(umask)
+
+
+    def get_request(self) -> tuple[any, tuple[str, int]]:
+        # The request handler expects a (host, port) client address
+        request, _ = super().get_request()
+        return request, ("local", 0)
+
+
+def main():
+    """Main Execution Module for the scan daemon"""
+
+    banner()
+
+    configure_logging()
+
+    parser = argparse.ArgumentParser(description="Search applications for secrets submitted over a local socket, see AppalyzerClient.py")
+    parser.add_argument('-s', '--socket', help="Unix domain socket to listen on (Default = DAEMON_SOCKET in config.ini, or OUTDIR_PATH/appalyzer.sock)", dest='socket', type=str, default=None)
+    parser.add_argument('-P', '--port', help="Listen on this port of 127.0.0.1 instead of a Unix domain socket (Default = DAEMON_PORT in config.ini)", dest='port', type=int, default=None)
+    parser.add_argument('-j', '--jobs', help="Maximum number of jobs running at once (Default = DAEMON_JOBS in config.ini)", dest='jobs', type=int, default=None)
+    parser.add_argument('-b', '--backend', help="Scan files with a pool of threads or processes, auto uses processes when regexes have a time budget, only threads are kept warm between jobs (Default = SCAN_BACKEND in config.ini)", dest='backend', choices=['auto', 'thread', 'process'], default=None)
+    parser.add_argument('-w', '--workers', help="Number of scanner workers shared by the jobs (Default = SCAN_WORKERS in config.ini)", dest='workers', type=int, default=None)
+    parser.add_argument('-f', '--format', help="Also write the findings as JSON Lines and/or SARIF 2.1.0, next to the results files (Default = OUTPUT_FORMATS in config.ini)", dest='formats', choices=['jsonl', 'sarif'], nargs='+', default=None)
+    args = parser.parse_args()
+
+    # Commandline arguments override the configuration file
+    appconfig = AppAnalyzerConfig()
+
+    if args.backend:
+        appconfig.set_config_value('SCAN_BACKEND', args.backend)
+
+    if args.workers is not None:
+        appconfig.set_config_value('SCAN_WORKERS', args.workers)
+
+    if args.formats:
+        appconfig.set_config_value('OUTPUT_FORMATS', ','.join(args.formats))
+
+    port = args.port if args.port is not None else appconfig.get_daemon_port()
+
+    if port:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", port), DaemonRequestHandler)
+        server.allowed_hosts = {f"127.0.0.1:{port}", f"localhost:{port}"}
+        address = f"http://127.0.0.1:{port}"
+
+    else:
+        socket_path = args.socket or appconfig.get_daemon_socket()
+        server = UnixHTTPServer(socket_path, DaemonRequestHandler)
+        server.allowed_hosts = None
+        address = socket_path
+
+    server.scan_daemon = ScanDaemon(args.jobs)
+
+    # Stop like on Ctrl-C when the service manager stops the daemon
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"[*] Listening on {address}")
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        print("[*] Stopping, waiting for the running jobs to finish")
+        server.server_close()
+
+        if not port:
+            Path(address).unlink(missing_ok=True)
+
+        server.scan_daemon.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,11 @@ class RegExMatchPosition:
 class RegExMatch:
     '''
     Regex Match
+
+    match_pos is the position of the context of the match, secret_pos the
+    position of the secret in the text of the file, in characters or in
+    bytes (secret_unit).  secret_pos is None when the content searched was
+    not the text of the file, i.e. its printable strings
     '''
     rel_path: str
     absolute_path: str
@@ -21,6 +26,28 @@ class RegExMatch:
     regex_match: str
     regex_name: str
     match_pos: RegExMatchPosition
+    secret_pos: RegExMatchPosition = None
+    secret_unit: str = None
+
+    def to_dict(self) -> dict[str, any]:
+        '''
+        Return the match as a json serializable dict
+        '''
+        d = dataclasses.asdict(self)
+        d["rel_path"] = str(self.rel_path)
+        d["absolute_path"] = str(self.absolute_path)
+
+        return d
+
+    @classmethod
+    def from_dict(cls, d:dict[str, any]) -> "RegExMatch":
+        '''
+        Create a match from a dict returned by to_dict
+        '''
+        secret_pos = d.get("secret_pos")
+
+        return cls(**{**d, "match_pos": RegExMatchPosition(**d["match_pos"]),
+                      "secret_pos": RegExMatchPosition(**secret_pos) if secret_pos else None})
 
 @dataclasses.dataclass
 class FileObj:
@@ -30,3 +57,12 @@ class FileObj:
     file_path: str
     file_contents: str
     matches: list[RegExMatch]
+
+
+@dataclasses.dataclass
+class ArchiveBudget:
+    '''
+    Bytes and members left to expand from the archives nested in a file
+    '''
+    num_bytes: int
+    members: int
@@ -0,0 +1,298 @@
+"""Module used to generate synthetic applications to benchmark Appalyzer with"""
+import json
+import plistlib
+import random
+import string
+import struct
+import sys
+import zipfile
+from pathlib import Path
+
+
+class BenchmarkCorpus():
+    """
+    Generate synthetic applications with planted secrets
+
+    The same seed always generates the same applications, so runs on the
+    same machine can be compared.  Nothing but the Python standard library
+    is needed, a fake decompiler stands in for jadx and ilspycmd.
+    """
+
+    JAVA_WORDS = ["public", "private", "static", "final", "void", "return", "new", "this",
+                  "String", "int", "boolean", "if", "else", "for", "while", "null", "import",
+                  "android", "content", "Context", "view", "View", "getString", "setText"]
+
+    # 64-bit little endian Mach-O file for arm64
+    MACHO_MAGIC_64 = 0xfeedfacf
+    MACHO_CPU_ARM64 = 0x0100000c
+
+    def __init__(self, corpus_dir:str, seed:int = 42) -> None:
+        """
+        Parameters
+        ----------
+        corpus_dir : str
+            Directory to generate the applications in
+
+        seed : int
+            Seed of the random generator
+        """
+
+        self.corpus_dir = Path(corpus_dir)
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self.planted = []
+        self._random = random.Random(seed)
+
+
+    def __secret(self) -> str:
+        """
+        Return a new random secret, matched by the default regexes, and remember it
+        """
+
+        kind = self._random.choice(["aws", "github", "gcp"])
+
+        if kind == "aws":
+            secret = "AKIA" + "".join(self._random.choices(string.ascii_uppercase + string.digits, k=16))
+
+        elif kind == "github":
+            secret = "ghp_" + "".join(self._random.choices(string.ascii_letters + string.digits, k=36))
+
+        else:
+            secret = "AIzaSy" + "".join(self._random.choices(string.ascii_letters + string.digits, k=33))
+
+        self.planted.append(secret)
+
+        return secret
+
+
+    def __java_source(self, package:str, class_name:str, lines:int, plant:bool) -> str:
+        """
+        Return the source of a decompiled looking Java class
+        """
+
+        body = []
+
+        for i in range(lines):
+            words = " ".join(self._random.choices(BenchmarkCorpus.JAVA_WORDS, k=8))
+            body.append(f"        {words}; // {i}")
+
+        if plant:
+            body.insert(self._random.randrange(len(body) + 1),
+                        f'        String key = "{self.__secret()}";')
+
+        return (f"package {package};\n\nimport android.content.Context;\n\n"
+                f"public class {class_name} {{\n    public void run() {{\n"
+                + "\n".join(body) + "\n    }\n}\n")
+
+
+    def __binary_blob(self, size:int, plant:bool, header:bytes = b"") -> bytes:
+        """
+        Return random binary data with a few printable strings, like a compiled binary
+        """
+
+        blob = bytearray(header)
+        blob += self._random.randbytes(size)
+
+        for _ in range(max(size // 4096, 1)):
+            offset = self._random.randrange(len(blob))
+            text = " ".join(self._random.choices(BenchmarkCorpus.JAVA_WORDS, k=4)).encode("ascii")
+            blob[offset:offset] = b"\x00" + text + b"\x00"
+
+        if plant:
+            offset = self._random.randrange(len(header), len(blob))
+            blob[offset:offset] = b"\x00" + self.__secret().encode("ascii") + b"\x00"
+
+        return bytes(blob)
+
+
+    def __macho_binary(self, size:int, plant:bool) -> bytes:
+        """
+        Return a thin arm64 Mach-O file, random code in __text and
+        printable strings in __cstring, like a compiled binary
+        """
+
+        code = self.__binary_blob(size, False)
+        texts = [" ".join(self._random.choices(BenchmarkCorpus.JAVA_WORDS, k=4)) for _ in range(max(size // 4096, 1))]
+
+        if plant:
+            texts.insert(self._random.randrange(len(texts) + 1), self.__secret())
+
+        cstrings = b"".join(text.encode("ascii") + b"\x00" for text in texts)
+
+        # Header, one LC_SEGMENT_64 of two sections, then their contents
+        commands_size = 72 + 2 * 80
+        offset = 32 + commands_size
+        address = 0x100000000 + offset
+        sections = b""
+
+        for name, content_offset, content in (("__text", offset, code), ("__cstring", offset + len(code), cstrings)):
+            sections += name.encode("ascii").ljust(16, b"\x00") + b"__TEXT".ljust(16, b"\x00")
+            sections += struct.pack("<QQIIIIIIII", address + content_offset - offset, len(content), content_offset,
+                                    0, 0, 0, 0, 0, 0, 0)
+
+        segment = struct.pack("<II", 0x19, commands_size) + b"__TEXT".ljust(16, b"\x00")
+        segment += struct.pack("<QQQQIIII", 0x100000000, offset + len(code) + len(cstrings), 0,
+                               offset + len(code) + len(cstrings), 5, 5, 2, 0)
+        header = struct.pack("<IiIIIIII", BenchmarkCorpus.MACHO_MAGIC_64, BenchmarkCorpus.MACHO_CPU_ARM64,
+                             0, 2, 1, commands_size, 0, 0)
+
+        return header + segment + sections + code + cstrings
+
+
+    def make_jadx_tree(self, num_files:int, lines:int = 200, plant_every:int = 25) -> Path:
+        """
+        Generate a jadx like output tree of Java sources and resources
+
+        Parameters
+        ----------
+        num_files : int
+            Number of Java files
+
+        lines : int
+            Number of lines of each Java file
+
+        plant_every : int
+            Plant a secret in one of every plant_every files
+
+        Returns
+        ----------
+        Path
+            Root of the tree
+        """
+
+        tree = self.corpus_dir.joinpath("jadx")
+        sources = tree.joinpath("sources")
+
+        for i in range(num_files):
+            package = f"com.example.bench.pkg{i % 50}"
+            package_dir = sources.joinpath(*package.split("."))
+            package_dir.mkdir(parents=True, exist_ok=True)
+
+            source = self.__java_source(package, f"Class{i}", lines, i % plant_every == 0)
+            package_dir.joinpath(f"Class{i}.java").write_text(source, encoding="utf-8")
+
+        values = tree.joinpath("resources", "res", "values")
+        values.mkdir(parents=True, exist_ok=True)
+
+        strings_xml = ["<resources>"]
+        strings_xml += [f'    <string name="label_{i}">Label {i}</string>' for i in range(500)]
+        strings_xml.append(f'    <string name="api_token">{self.__secret()}</string>')
+        strings_xml.append("</resources>\n")
+        values.joinpath("strings.xml").write_text("\n".join(strings_xml), encoding="utf-8")
+
+        tree.joinpath("resources", "classes.dex").write_bytes(self.__binary_blob(512 * 1024, True))
+
+        return tree
+
+
+    def make_zip(self, num_members:int, plant_every:int = 10) -> Path:
+        """
+        Generate a zip file with text, binary and media members
+
+        Parameters
+        ----------
+        num_members : int
+            Number of members
+
+        plant_every : int
+            Plant a secret in one of every plant_every members
+
+        Returns
+        ----------
+        Path
+            Path of the zip file
+        """
+
+        archive = self.corpus_dir.joinpath("bench.zip")
+
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zfile:
+
+            for i in range(num_members):
+                plant = i % plant_every == 0
+
+                if i % 3 == 0:
+                    zfile.writestr(f"lib/native{i}.so", self.__binary_blob(64 * 1024, plant))
+
+                elif i % 7 == 0:
+                    # Media members are skipped by default
+                    zfile.writestr(f"assets/image{i}.png", self._random.randbytes(32 * 1024))
+
+                else:
+                    zfile.writestr(f"src/Class{i}.java",
+                                   self.__java_source("com.example.bench", f"Class{i}", 100, plant))
+
+        return archive
+
+
+    def make_ipa(self, num_frameworks:int) -> Path:
+        """
+        Generate an ipa file with plists, a provisioning profile and Mach-O binaries
+
+        Parameters
+        ----------
+        num_frameworks : int
+            Number of frameworks in the app
+
+        Returns
+        ----------
+        Path
+            Path of the ipa file
+        """
+
+        archive = self.corpus_dir.joinpath("bench.ipa")
+        app_dir = "Payload/Bench.app/"
+
+        info = {"CFBundleName": "Bench", "CFBundleIdentifier": "com.example.bench",
+                "ApiToken": self.__secret(),
+                "Settings": {f"key{i}": f"value {i}" for i in range(100)}}
+
+        profile = plistlib.dumps({"AppIDName": "Bench", "TeamName": "Example",
+                                  "Entitlements": {"application-identifier": "ABCDE12345.com.example.bench"}})
+
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zfile:
+
+            zfile.writestr(f"{app_dir}Info.plist", plistlib.dumps(info))
+            zfile.writestr(f"{app_dir}Bench", self.__macho_binary(2 * 1024 ** 2, True))
+            zfile.writestr(f"{app_dir}embedded.mobileprovision", b"\x30\x82\x00\x00" + profile)
+            zfile.writestr(f"{app_dir}Assets.car", self.__binary_blob(256 * 1024, False))
+            zfile.writestr(f"{app_dir}en.lproj/Localizable.strings",
+                           plistlib.dumps({"token": self.__secret()}, fmt=plistlib.FMT_BINARY))
+
+            for i in range(num_frameworks):
+                framework = f"{app_dir}Frameworks/Lib{i}.framework/"
+                zfile.writestr(f"{framework}Lib{i}", self.__macho_binary(256 * 1024, i % 5 == 0))
+                zfile.writestr(f"{framework}Info.plist",
+                               plistlib.dumps({"CFBundleName": f"Lib{i}"}, fmt=plistlib.FMT_BINARY))
+
+        return archive
+
+
+    def make_fake_decompiler(self, tree:Path) -> Path:
+        """
+        Generate a script standing in for jadx and ilspycmd, copying a tree to the output directory
+
+        Parameters
+        ----------
+        tree : Path
+            Tree the fake decompiler outputs
+
+        Returns
+        ----------
+        Path
+            Path of the script
+        """
+
+        script = self.corpus_dir.joinpath("fake_decompiler")
+        script.write_text(f"""#!{sys.executable}
+import shutil
+import sys
+
+if "--version" in sys.argv:
+    print("fake-decompiler 1.0")
+    sys.exit(0)
+
+flag = "--output-dir" if "--output-dir" in sys.argv else "--outputdir"
+shutil.copytree({json.dumps(str(tree.absolute()))}, sys.argv[sys.argv.index(flag) + 1], dirs_exist_ok=True)
+""", encoding="utf-8")
+        script.chmod(0o755)
+
+        return script
@@ -0,0 +1,282 @@
+"""Module used to cache decompiled applications between runs"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+
+class DecompileCache():
+    """
+    Content addressed cache of decompiler output trees
+
+    Entries are keyed by the hash of the application, the decompiler version
+    and the decompiler flags.  The least recently used entries are removed
+    once the cache grows over its maximum size.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    MARKER_FILENAME = ".appalyzer_cache.json"
+
+    # Temporary directories left by a run older than this are removed, even if its pid is reused
+    STALE_WORKDIR_S = 24 * 3600
+
+    _TOOL_VERSIONS = {}
+
+    def __init__(self, cache_dir:str, max_size:int) -> None:
+        """
+        Parameters
+        ----------
+        cache_dir : str
+            Directory to store the decompiled applications in
+
+        max_size : int
+            Maximum size of the cache in bytes
+        """
+
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+
+    @classmethod
+    def get_tool_version(cls, tool_path:str) -> str:
+        """
+        Return the version reported by a decompiler
+
+        Parameters
+        ----------
+        tool_path : str
+            Path of the decompiler binary
+
+        Returns
+        ----------
+        str
+            Version of the decompiler, "unknown" if it could not be found
+        """
+
+        if tool_path not in cls._TOOL_VERSIONS:
+
+            try:
+                proc = subprocess.run([str(tool_path), "--version"], capture_output=True,
+                                      text=True, timeout=120, check=False)
+                version = proc.stdout.strip() or "unknown"
+
+            except (OSError, subprocess.SubprocessError) as err:
+                DecompileCache.logger.debug("Could not get the version of %s: %s", tool_path, err)
+                version = "unknown"
+
+            cls._TOOL_VERSIONS[tool_path] = version
+
+        return cls._TOOL_VERSIONS[tool_path]
+
+
+    def key(self, app_hash:str, tool_version:str, flags:list[str]) -> str:
+        """
+        Return the cache key of a decompiled application
+
+        Parameters
+        ----------
+        app_hash : str
+            Hash of the application contents
+
+        tool_version : str
+            Version of the decompiler
+
+        flags : list[str]
+            Decompiler flags, excluding the input and output paths
+
+        Returns
+        ----------
+        str
+            Cache key
+        """
+
+        s = json.dumps([app_hash, tool_version, flags])
+
+        return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+
+    def entry_path(self, key:str) -> Path:
+        """
+        Return the directory the decompiled output tree of a key is stored in once committed
+        """
+        return self.cache_dir.joinpath(key)
+
+
+    def get(self, key:str) -> Path | None:
+        """
+        Return the decompiled output tree stored under the key
+
+        Parameters
+        ----------
+        key : str
+            Cache key
+
+        Returns
+        ----------
+        Path | None
+            Directory of the decompiled application, None if not cached
+        """
+
+        entry = self.entry_path(key)
+        marker = entry.joinpath(DecompileCache.MARKER_FILENAME)
+
+        if not marker.is_file():
+            return None
+
+        # Mark the entry as recently used
+        marker.touch()
+
+        return entry
+
+
+    def reserve(self, key:str) -> Path:
+        """
+        Return a new temporary directory for the decompiler to write to
+
+        Parameters
+        ----------
+        key : str
+            Cache key
+
+        Returns
+        ----------
+        Path
+            Temporary directory, to be passed to commit once decompiled
+        """
+
+        # Collect what interrupted runs left behind first
+        if self.cache_dir.is_dir():
+            self.evict()
+
+        workdir = self.cache_dir.joinpath(f"{key}.tmp-{os.getpid()}-{time.time_ns()}")
+        workdir.mkdir(parents=True)
+
+        return workdir
+
+
+    def commit(self, key:str, workdir:Path, info:dict[str, any]) -> Path:
+        """
+        Store a decompiled output tree in the cache
+
+        Parameters
+        ----------
+        key : str
+            Cache key
+
+        workdir : Path
+            Temporary directory returned by reserve
+
+        info : dict[str, any]
+            Information about the decompilation to store with the entry
+
+        Returns
+        ----------
+        Path
+            Directory of the cached decompiled application
+        """
+
+        size = sum(f.stat().st_size for f in workdir.rglob("*") if f.is_file())
+        info = {**info, "size": size, "created": time.time()}
+
+        with open(workdir.joinpath(DecompileCache.MARKER_FILENAME), "w", encoding="utf-8") as fd:
+            json.dump(info, fd, indent=4)
+
+        entry = self.entry_path(key)
+
+        try:
+            workdir.rename(entry)
+
+        except OSError:
+            # Another run stored the same application first
+            DecompileCache.logger.debug("Cache entry %s already exists, discarding %s", key, workdir)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.evict(keep=key)
+
+        return entry
+
+
+    @staticmethod
+    def _is_stale(workdir:Path) -> bool:
+        """
+        Return True if a temporary directory was left by a run which is not running anymore
+
+        Parameters
+        ----------
+        workdir : Path
+            Temporary directory returned by reserve, named <key>.tmp-<pid>-<time>
+        """
+
+        try:
+            pid = int(workdir.name.split(".tmp-")[1].split("-")[0])
+
+            if time.time() - workdir.stat().st_mtime > DecompileCache.STALE_WORKDIR_S:
+                return True
+
+        except (IndexError, ValueError, OSError):
+            return False
+
+        if pid == os.getpid():
+            return False
+
+        try:
+            os.kill(pid, 0)
+
+        except ProcessLookupError:
+            return True
+
+        except OSError:
+            pass
+
+        return False
+
+
+    def evict(self, keep:str = None) -> None:
+        """
+        Remove the temporary directories left by interrupted runs, then the
+        least recently used entries until the cache fits in its maximum size
+
+        Parameters
+        ----------
+        keep : str
+            Key of an entry that must not be removed
+        """
+
+        for workdir in self.cache_dir.glob("*.tmp-*"):
+
+            if workdir.is_dir() and DecompileCache._is_stale(workdir):
+                DecompileCache.logger.info("Removing decompiler output left by an interrupted run %s", workdir)
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        entries = []
+
+        for marker in self.cache_dir.glob(f"*/{DecompileCache.MARKER_FILENAME}"):
+
+            try:
+                with open(marker, "r", encoding="utf-8") as fd:
+                    size = json.load(fd).get("size", 0)
+
+                entries.append((marker.stat().st_mtime, size, marker.parent))
+
+            except (OSError, ValueError) as err:
+                DecompileCache.logger.debug("Skipping cache entry %s: %s", marker.parent, err)
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, entry in sorted(entries):
+
+            if total <= self.max_size:
+                break
+
+            if entry.name == keep:
+                continue
+
+            DecompileCache.logger.info("Removing least recently used decompiled app %s", entry)
+
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,156 @@
+"""Module used to read the string pool of Android DEX files without decompiling them"""
+import logging
+import re
+import struct
+from typing import Iterator
+from StringsExtractor import StringsMap
+
+
+class DexStrings():
+    """
+    String pool of a DEX file
+
+    Every string literal of the code, along with class, method and field
+    names, is stored once in the string pool.  The string_ids table of the
+    header points to each string, stored as its length in UTF-16 code
+    units (uleb128) followed by MUTF-8 bytes and a NUL byte.  MUTF-8 is
+    UTF-8 with NUL encoded on two bytes and characters outside the BMP
+    encoded as a surrogate pair of three bytes each
+    """
+
+    logger = logging.getLogger(__name__)
+
+    MAGIC = b"dex\n"
+
+    HEADER_SIZE = 0x70
+
+    ENDIAN_CONSTANT = 0x12345678
+
+    # Offsets in the header
+    ENDIAN_TAG_OFF = 0x28
+    STRING_IDS_OFF = 0x38
+
+    SURROGATES_REGEX = re.compile("[\ud800-\udfff]")
+
+    def __init__(self, data:bytes) -> None:
+        """
+        Parameters
+        ----------
+        data : bytes
+            Content of the DEX file
+
+        Raises
+        ----------
+        ValueError
+            If the data is not a DEX file, or its string_ids table is out of bounds
+        """
+
+        if len(data) < DexStrings.HEADER_SIZE or not data.startswith(DexStrings.MAGIC):
+            raise ValueError("not a DEX file")
+
+        endian_tag, = struct.unpack_from("<I", data, DexStrings.ENDIAN_TAG_OFF)
+
+        if endian_tag != DexStrings.ENDIAN_CONSTANT:
+            raise ValueError(f"unsupported endian tag {endian_tag:#x}")
+
+        size, offset = struct.unpack_from("<II", data, DexStrings.STRING_IDS_OFF)
+
+        if offset + size * 4 > len(data):
+            raise ValueError(f"string_ids table of {size} strings at {offset:#x} is out of bounds")
+
+        self._data = data
+        self.offsets = struct.unpack_from(f"<{size}I", data, offset)
+
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+
+    @staticmethod
+    def decode_mutf8(raw:bytes) -> str:
+        """
+        Decode MUTF-8 bytes
+        """
+
+        if raw.isascii():
+            return raw.decode("ascii")
+
+        try:
+            text = raw.replace(b"\xc0\x80", b"\x00").decode("utf-8", errors="surrogatepass")
+
+        except UnicodeDecodeError:
+            return raw.decode("utf-8", errors="replace")
+
+        # Join the surrogate pairs, lone surrogates can't be written out
+        if DexStrings.SURROGATES_REGEX.search(text):
+            text = text.encode("utf-16-le", errors="surrogatepass").decode("utf-16-le", errors="replace")
+
+        return text
+
+
+    def string_data(self, index:int) -> tuple[int, int]:
+        """
+        Return the start and end offsets of the MUTF-8 bytes of a string
+
+        Raises
+        ----------
+        ValueError
+            If the string data is out of bounds
+        """
+
+        start = self.offsets[index]
+
+        # Skip the uleb128 length, the string ends at the first NUL byte
+        try:
+            while self._data[start] & 0x80:
+                start += 1
+
+        except IndexError:
+            raise ValueError(f"string {index} at {self.offsets[index]:#x} is out of bounds") from None
+
+        start += 1
+        end = self._data.find(b"\x00", start)
+
+        if end < 0:
+            raise ValueError(f"string {index} at {self.offsets[index]:#x} is not terminated")
+
+        return start, end
+
+
+    def strings(self) -> Iterator[tuple[int, int, str]]:
+        """
+        Return the strings of the pool, in string_ids order
+
+        Returns
+        ----------
+        Iterator[tuple[int, int, str]]
+            Start and end offsets of the MUTF-8 bytes in the file and text of each string
+        """
+
+        for index in range(len(self.offsets)):
+            start, end = self.string_data(index)
+
+            yield start, end, DexStrings.decode_mutf8(self._data[start:end])
+
+
+    def extract(self) -> tuple[str, StringsMap]:
+        """
+        Return the strings of the pool, one string per line, and a map from
+        positions in the returned text back to the strings
+
+        Returns
+        ----------
+        tuple[str, StringsMap]
+            Strings separated by new lines and their map
+        """
+
+        texts = []
+        string_map = StringsMap()
+        position = 0
+
+        for index, (start, end, text) in enumerate(self.strings()):
+            string_map.add(position, (start, end), text, f"string_ids[{index}]")
+            texts.append(text)
+            position += len(text) + 1
+
+        return "\n".join(texts), string_map
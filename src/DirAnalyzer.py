@@ -1,6 +1,12 @@
 """Module to handle secret searching in Directories """
+import concurrent.futures
+import hashlib
 import logging
+from pathlib import Path
+from typing import Iterator
 from Appalyzer import Appalyzer
+from AppalyzerObjects import RegExMatch
+from ScanManifest import ScanManifest
 
 class DirAnalyzer(Appalyzer):
     """
@@ -20,10 +26,136 @@ class DirAnalyzer(Appalyzer):
         super().__init__(app, regexfile)
 
         self.outfile =  self.app.joinpath(f"dirscan_{self._time_now}_results.out")
+        self._incremental = self._config.get_incremental()
 
         if not self._is_dir:
             raise NotADirectoryError("f{self.app} is not a directory")
 
+    def __reuse_findings(self, entry:dict[str, any], filename:Path, rel_path:Path) -> dict[str, RegExMatch]:
+        """
+        Return the findings of a file recorded in the manifest
+
+        Parameters
+        ----------
+        entry : dict[str, any]
+            Manifest entry of the file
+
+        filename : Path
+            Current path of the file
+
+        rel_path : Path
+            Path of the file relative to the directory
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the file
+        """
+
+        matches = {}
+
+        for finding in entry["findings"]:
+            # Matches in archives nested in the file keep their location, i.e. lib.jar!/config.properties
+            location = str(finding["rel_path"])[len(str(rel_path)):]
+            absolute_path = f"{filename}{location}" if location else filename
+            a_match = RegExMatch.from_dict({**finding, "absolute_path": absolute_path})
+
+            s = f"{str(absolute_path)}{a_match.regex_match}"
+            matches[hashlib.md5(s.encode('utf-8')).hexdigest()] = a_match
+
+        return matches
+
+    def _scan_files(self, file_list:list[Path], scan_dir:str) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the files, in incremental mode only files that changed since
+        the last scan are searched and findings of the others are reused
+
+        Parameters
+        ----------
+        file_list : list[Path]
+            Files to search
+
+        scan_dir : str
+            Directory being searched
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each file, as the files are searched
+        """
+
+        # The manifest holds findings, don't report them a second time
+        file_list = [f for f in file_list if not f.name.startswith(ScanManifest.MANIFEST_FILENAME)]
+
+        if not self._incremental:
+            yield from super()._scan_files(file_list, scan_dir)
+            return
+
+        manifest = ScanManifest(Path(scan_dir).joinpath(ScanManifest.MANIFEST_FILENAME),
+                                self._get_scan_fingerprint())
+        changed = []
+        stats = {f: f.stat() for f in file_list}
+
+        # Unchanged size and modification time, reuse the findings without opening the file
+        for filename in file_list:
+            rel_path = filename.relative_to(scan_dir)
+            entry = manifest.lookup(rel_path, stats[filename])
+
+            if entry:
+                matches = self.__reuse_findings(entry, filename, rel_path)
+                manifest.update(rel_path, stats[filename], entry["sha256"], list(matches.values()))
+                yield matches
+
+            else:
+                changed.append(filename)
+
+        # Touched files whose contents did not change, reuse the findings
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self._scan_workers,
+                                                   thread_name_prefix='ManifestHasher_') as executor:
+            hashes = dict(zip(changed, executor.map(Appalyzer.hash_file, changed)))
+
+        to_scan = []
+
+        for filename in changed:
+            rel_path = filename.relative_to(scan_dir)
+            entry = manifest.lookup_hash(rel_path, stats[filename], hashes[filename])
+
+            if entry:
+                matches = self.__reuse_findings(entry, filename, rel_path)
+                manifest.update(rel_path, stats[filename], hashes[filename], list(matches.values()))
+                yield matches
+
+            else:
+                to_scan.append(filename)
+
+        DirAnalyzer.logger.info("Reusing findings of %s unchanged files, scanning %s changed files",
+                                len(file_list) - len(to_scan), len(to_scan))
+
+        # Search the changed files and record their findings
+        findings = {filename: [] for filename in to_scan}
+
+        for matches in super()._scan_files(to_scan, scan_dir, content_hashes=hashes):
+
+            if matches:
+                yield matches
+
+                for a_match in matches.values():
+                    findings[Path(str(a_match.absolute_path).partition("!/")[0])].append(a_match)
+
+        # Files a regex ran out of time in, or in an archive nested in them, and files
+        # whose nested archives were not fully expanded are searched again next time
+        timed_out = {path.partition("!/")[0] for path in
+                     [timeout["path"] for timeout in self.timeouts] + self._truncated}
+
+        for filename in to_scan:
+            rel_path = filename.relative_to(scan_dir)
+
+            if str(rel_path) not in timed_out:
+                manifest.update(rel_path, stats[filename], hashes[filename], findings[filename])
+
+        # Only saved once every file was searched, an interrupted scan keeps the previous manifest
+        manifest.save()
+
     def secret_search(self) -> None:
         """ 
         Perform secret search
@@ -1,9 +1,12 @@
 """Class used to decompile and search for secrets in .Net DLLs"""
-import shlex
-import subprocess
+import itertools
 import logging
-import sys
+import time
+from pathlib import Path
+from typing import Iterator
 from Appalyzer import Appalyzer
+from AppalyzerObjects import RegExMatch
+from DotNetMetadata import DotNetMetadata
 
 
 class DllAnalyzer(Appalyzer):
@@ -13,19 +16,28 @@ class DllAnalyzer(Appalyzer):
 
     logger = logging.getLogger(__name__)
 
+    ASSEMBLY_SUFFIXES = (".dll", ".exe")
+
+    def __init__(self, app:str, regexfile:str=None) -> None:
+        """
+        Parameters
+        ----------
+        app : str
+            The path to the DLL to analyze, or to a directory of DLLs
+        """
+
+        super().__init__(app, regexfile)
+
+        self._dll_mode = self._config.get_dll_scan_mode()
+
+
     def _decompile_app(self) -> None:
-        """ 
+        """
         Decompile the app and store in directory
         Process will take some time to decompile application
         """
 
-        # Create the temp directory
-        self._outdir = self._outdir.joinpath(f"{self.app.stem}",
-                                             f"{self.app.stem}_{self._time_now}")
-
-        self._outdir.mkdir(parents=True, exist_ok=True)
-
-        # Get jadx binary path
+        # Get ilspycmd binary path
         try:
             cmd_path = self._config.get_ilspycmd_path()
 
@@ -35,25 +47,112 @@ class DllAnalyzer(Appalyzer):
         else:
 
             # Create the decompile command
-            decompile_cmd = [str(cmd_path), "--outputdir", str(self._outdir), str(self.app)]
+            def decompile_cmd(outdir):
+                return [str(cmd_path), "--outputdir", str(outdir), str(self.app)]
 
-            DllAnalyzer.logger.info("Decompiling dll %s... This may take awhile...", self.app.name)
-            DllAnalyzer.logger.debug("Decompile command: \"%s\"", shlex.join(decompile_cmd))
+            # Decompile the dll file, or reuse a previous decompilation
+            self._run_decompiler(cmd_path, decompile_cmd)
 
-            # Decompile the apk file
-            proc = subprocess.Popen(decompile_cmd)
-            proc.wait()
+
+    def _finder_metadata(self, filename:Path, parent_dir:str) -> dict[str, RegExMatch]:
+        """
+        Search the string literals, names and resources of a .Net assembly,
+        without decompiling it
+
+        Each match is reported at the string it was found in, i.e.
+        Foo.dll#US[0x70000001] for a string literal, its position being the
+        offsets of the string in the file.  Native DLLs are searched like any
+        other binary file
+
+        Parameters
+        ----------
+        filename : Path
+            Assembly to search
+
+        parent_dir : str
+            Directory being searched, used to get the relative path of the file
+
+        Returns
+        ----------
+        dict[str, RegExMatch]
+            Matches found in the assembly
+        """
+
+        matches = {}
+        rel_path = Path(filename).relative_to(parent_dir)
+        start_time = time.perf_counter()
+
+        try:
+            with self._stage("extract"):
+                with open(filename, "rb") as fd:
+                    data = fd.read()
+
+                content, string_map = DotNetMetadata(data).extract(self._strings)
+
+        except ValueError as err:
+            DllAnalyzer.logger.debug("[*]Searching the strings of %s: %s", filename, err)
+            return self._finder(filename, parent_dir)
+
+        except Exception as err:
+            Appalyzer.logger.error("\n[!]Error: %s: %s\n", filename, err)
+
+        else:
+            matches = self._scan_strings(content, string_map, filename, rel_path)
+
+            if self._profiler:
+                self._profiler.add_file("application/x-dotnet-assembly", time.perf_counter() - start_time,
+                                        len(data))
+
+        return matches
+
+
+    def _search_metadata(self) -> Iterator[dict[str, RegExMatch]]:
+        """
+        Search the metadata of the DLL, or of every DLL and EXE of the directory
+
+        Returns
+        ----------
+        Iterator[dict[str, RegExMatch]]
+            Matches found in each assembly, as the assemblies are searched
+        """
+
+        if not self._is_dir:
+            return self._scan_files([self.app.absolute()], self.app.absolute().parent, "_finder_metadata")
+
+        with self._stage("walk"):
+            file_list = [f for f in self._get_dir_listing(self.app)
+                         if f.suffix.lower() in DllAnalyzer.ASSEMBLY_SUFFIXES]
+            file_list = self._triage_files(file_list, self.app)
+
+        DllAnalyzer.logger.info("Searching the metadata of %s assemblies under %s", len(file_list), self.app)
+
+        return self._scan_files(file_list, self.app, "_finder_metadata")
 
 
     def secret_search(self) -> None:
-        """ 
+        """
         Perform secret search
+
+        With DLL_SCAN_MODE=metadata, or for a directory of DLLs, only the
+        strings of the metadata and resources are searched, with both
+        ilspycmd decompiles the DLL as a deep pass
         """
         # Write header
         self._write_header()
 
+        if self._is_dir or self._dll_mode == "metadata":
+            with self._scan_limit:
+                self._report(self._search_metadata())
+            return
+
         # Decompile the App
         self._decompile_app()
 
-        # Start searching for secrets
-        self._search(self._outdir)
+        # Start searching for secrets, the metadata first when pipelined while ilspycmd runs
+        results = self._search_dir(self._outdir)
+
+        if self._dll_mode == "both":
+            results = itertools.chain(self._search_metadata(), results)
+
+        with self._scan_limit:
+            self._report(results)
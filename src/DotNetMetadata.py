@@ -0,0 +1,294 @@
+"""Module used to read the strings of .Net assemblies without decompiling them"""
+import logging
+import struct
+from typing import Iterator
+from StringsExtractor import StringsExtractor, StringsMap
+
+
+class DotNetMetadata():
+    """
+    Strings of a .Net assembly
+
+    The CLI header of the PE file points to the metadata and to the
+    embedded managed resources.  The metadata holds the string literals of
+    the code in the #US heap, as UTF-16 blobs, and the names of the types,
+    methods, fields, ... in the #Strings heap, as NUL terminated UTF-8
+    strings.  Managed resources, i.e. .resources files and embedded config
+    files, are stored one after the other, each prefixed with its length
+    """
+
+    logger = logging.getLogger(__name__)
+
+    PE_SIGNATURE = b"PE\x00\x00"
+
+    METADATA_SIGNATURE = 0x424A5342
+
+    PE32_MAGIC = 0x10b
+    PE32_PLUS_MAGIC = 0x20b
+
+    # Index of the CLI header in the data directories
+    CLI_HEADER_DIRECTORY = 14
+
+    # Tokens of user strings are their offset in the #US heap with this table type
+    USER_STRING_TOKEN = 0x70000000
+
+    def __init__(self, data:bytes) -> None:
+        """
+        Parameters
+        ----------
+        data : bytes
+            Content of the assembly
+
+        Raises
+        ----------
+        ValueError
+            If the data is not a .Net assembly, or its metadata is out of bounds
+        """
+
+        self._data = data
+        self._sections = []
+        self.streams = {}
+        self.resources = (0, 0)
+
+        try:
+            self.__parse()
+
+        except struct.error as err:
+            raise ValueError(f"truncated PE file: {err}") from None
+
+
+    def __parse(self) -> None:
+        """
+        Read the headers of the PE file and the stream headers of the metadata
+        """
+
+        data = self._data
+
+        if not data.startswith(b"MZ"):
+            raise ValueError("not a PE file")
+
+        pe_offset, = struct.unpack_from("<I", data, 0x3c)
+
+        if data[pe_offset:pe_offset + 4] != DotNetMetadata.PE_SIGNATURE:
+            raise ValueError("not a PE file")
+
+        num_sections, = struct.unpack_from("<H", data, pe_offset + 6)
+        optional_size, = struct.unpack_from("<H", data, pe_offset + 20)
+        optional = pe_offset + 24
+        magic, = struct.unpack_from("<H", data, optional)
+
+        if magic == DotNetMetadata.PE32_MAGIC:
+            num_directories, = struct.unpack_from("<I", data, optional + 92)
+            directories = optional + 96
+
+        elif magic == DotNetMetadata.PE32_PLUS_MAGIC:
+            num_directories, = struct.unpack_from("<I", data, optional + 108)
+            directories = optional + 112
+
+        else:
+            raise ValueError(f"unsupported optional header magic {magic:#x}")
+
+        for i in range(num_sections):
+            virtual_size, virtual_address, raw_size, raw_offset = \
+                struct.unpack_from("<IIII", data, optional + optional_size + i * 40 + 8)
+            self._sections.append((virtual_address, max(virtual_size, raw_size), raw_offset))
+
+        if num_directories <= DotNetMetadata.CLI_HEADER_DIRECTORY:
+            raise ValueError("not a .Net assembly")
+
+        cli_rva, _ = struct.unpack_from("<II", data, directories + DotNetMetadata.CLI_HEADER_DIRECTORY * 8)
+
+        if not cli_rva:
+            raise ValueError("not a .Net assembly")
+
+        cli_header = self.rva_to_offset(cli_rva)
+        metadata_rva, _ = struct.unpack_from("<II", data, cli_header + 8)
+        resources_rva, resources_size = struct.unpack_from("<II", data, cli_header + 24)
+
+        if resources_rva:
+            self.resources = (self.rva_to_offset(resources_rva), resources_size)
+
+        # Metadata root, its version string is padded to 4 bytes
+        metadata = self.rva_to_offset(metadata_rva)
+        signature, = struct.unpack_from("<I", data, metadata)
+
+        if signature != DotNetMetadata.METADATA_SIGNATURE:
+            raise ValueError(f"bad metadata signature {signature:#x}")
+
+        version_length, = struct.unpack_from("<I", data, metadata + 12)
+        num_streams, = struct.unpack_from("<H", data, metadata + 18 + version_length)
+        header = metadata + 20 + version_length
+
+        for _ in range(num_streams):
+            offset, size = struct.unpack_from("<II", data, header)
+            end = data.find(b"\x00", header + 8, header + 8 + 32)
+
+            if end < 0:
+                raise ValueError("bad metadata stream header")
+
+            name = data[header + 8:end].decode("ascii", errors="replace")
+            self.streams[name] = (metadata + offset, size)
+            header += 8 + (end - header - 8 + 4) // 4 * 4
+
+
+    def rva_to_offset(self, rva:int) -> int:
+        """
+        Return the offset in the file of a relative virtual address
+
+        Raises
+        ----------
+        ValueError
+            If the address is not in a section of the file
+        """
+
+        for virtual_address, size, raw_offset in self._sections:
+            if virtual_address <= rva < virtual_address + size:
+                return rva - virtual_address + raw_offset
+
+        raise ValueError(f"address {rva:#x} is not in a section")
+
+
+    def _heap(self, name:str) -> tuple[int, bytes]:
+        """
+        Return the offset in the file and the content of a metadata heap, empty if missing
+        """
+
+        offset, size = self.streams.get(name, (0, 0))
+
+        return offset, self._data[offset:offset + size]
+
+
+    def user_strings(self) -> Iterator[tuple[int, int, int, str]]:
+        """
+        Return the string literals of the code, from the #US heap
+
+        Each string is a blob, a compressed length then UTF-16 characters
+        and a final byte flagging special characters
+
+        Returns
+        ----------
+        Iterator[tuple[int, int, int, str]]
+            Token, start and end offsets of the UTF-16 bytes in the file and
+            text of each string
+        """
+
+        base, heap = self._heap("#US")
+        index = 1
+
+        while index < len(heap):
+            first = heap[index]
+
+            if first & 0x80 == 0:
+                length, start = first, index + 1
+
+            elif first & 0xc0 == 0x80 and index + 1 < len(heap):
+                length, start = (first & 0x3f) << 8 | heap[index + 1], index + 2
+
+            elif first & 0xe0 == 0xc0 and index + 3 < len(heap):
+                length, = struct.unpack_from(">I", heap, index)
+                length, start = length & 0x1fffffff, index + 4
+
+            else:
+                break
+
+            end = start + (length - 1 if length % 2 else length)
+
+            if length > 1:
+                yield (DotNetMetadata.USER_STRING_TOKEN | index, base + start, base + end,
+                       heap[start:end].decode("utf-16-le", errors="replace"))
+
+            index = start + length
+
+
+    def strings(self) -> Iterator[tuple[int, int, int, str]]:
+        """
+        Return the names of the types, methods, fields, ... from the #Strings heap
+
+        Returns
+        ----------
+        Iterator[tuple[int, int, int, str]]
+            Index in the heap, start and end offsets of the UTF-8 bytes in the
+            file and text of each string
+        """
+
+        base, heap = self._heap("#Strings")
+        index = 1
+
+        while index < len(heap):
+            end = heap.find(b"\x00", index)
+
+            if end < 0:
+                end = len(heap)
+
+            if end > index:
+                yield index, base + index, base + end, heap[index:end].decode("utf-8", errors="replace")
+
+            index = end + 1
+
+
+    def resources_data(self) -> Iterator[tuple[int, bytes]]:
+        """
+        Return the embedded managed resources, each is a length followed by
+        the data and aligned to 8 bytes
+
+        Returns
+        ----------
+        Iterator[tuple[int, bytes]]
+            Offset in the file and content of each resource
+        """
+
+        base, size = self.resources
+        data = self._data[base:base + size]
+        pos = 0
+
+        while pos + 4 <= len(data):
+            length, = struct.unpack_from("<I", data, pos)
+
+            if length > len(data) - pos - 4:
+                break
+
+            yield base + pos + 4, data[pos + 4:pos + 4 + length]
+
+            pos = (pos + 4 + length + 7) // 8 * 8
+
+
+    def extract(self, strings_extractor:StringsExtractor) -> tuple[str, StringsMap]:
+        """
+        Return the string literals, the names and the printable strings of
+        the resources, one string per line, and a map from positions in the
+        returned text back to the strings
+
+        Parameters
+        ----------
+        strings_extractor : StringsExtractor
+            Used to extract the printable strings of the resources
+
+        Returns
+        ----------
+        tuple[str, StringsMap]
+            Strings separated by new lines and their map, strings are located at
+            US[<token>], Strings[<index>] and resources[<index>]
+        """
+
+        texts = []
+        string_map = StringsMap()
+        position = 0
+
+        def add(span:tuple[int, int], text:str, label:str) -> None:
+            nonlocal position
+
+            string_map.add(position, span, text, label)
+            texts.append(text)
+            position += len(text) + 1
+
+        for token, start, end, text in self.user_strings():
+            add((start, end), text, f"US[{token:#010x}]")
+
+        for index, start, end, text in self.strings():
+            add((start, end), text, f"Strings[{index:#x}]")
+
+        for i, (base, data) in enumerate(self.resources_data()):
+            for offset, text, width in strings_extractor.runs(data):
+                add((base + offset, base + offset + len(text) * width), text, f"resources[{i}]")
+
+        return "\n".join(texts), string_map
@@ -0,0 +1,121 @@
+"""Module used to tell the type of a file without loading libmagic for most files"""
+import codecs
+import logging
+import threading
+from pathlib import PurePath
+import magic
+
+# Per thread libmagic handle, loading the magic database is expensive
+_MAGIC = threading.local()
+
+
+def _get_magic() -> magic.Magic:
+    """
+    Return the libmagic handle of the current thread
+    """
+    if not hasattr(_MAGIC, "handle"):
+        _MAGIC.handle = magic.Magic(mime=True)
+
+    return _MAGIC.handle
+
+
+class FileClassifier():
+    """
+    Tell the mimetype of a file from its extension and its first bytes
+
+    Decompiled trees are almost only Java, C#, smali and XML files, so known
+    text extensions are trusted as long as the first bytes look like text.
+    Common binary formats are recognized by their signature.  libmagic is only
+    asked about the rest, and its answer is cached per extension and signature
+    """
+
+    logger = logging.getLogger(__name__)
+
+    # Bytes read from the start of a file to classify it
+    HEADER_SIZE = 8 * 1024
+
+    # Bytes of the header the libmagic answers are cached by
+    SIGNATURE_SIZE = 8
+
+    TEXT_EXTENSIONS = {
+        ".java": "text/x-java", ".kt": "text/x-kotlin", ".smali": "text/x-smali",
+        ".cs": "text/x-csharp", ".vb": "text/x-vb", ".il": "text/x-msil",
+        ".swift": "text/x-swift", ".m": "text/x-objective-c", ".h": "text/x-c",
+        ".c": "text/x-c", ".cpp": "text/x-c++", ".js": "text/javascript",
+        ".ts": "text/x-typescript", ".html": "text/html", ".htm": "text/html",
+        ".css": "text/css", ".xml": "text/xml", ".xaml": "text/xml", ".resx": "text/xml",
+        ".csproj": "text/xml", ".config": "text/xml", ".svg": "text/xml",
+        ".json": "text/json", ".yml": "text/yaml", ".yaml": "text/yaml",
+        ".properties": "text/plain", ".ini": "text/plain", ".cfg": "text/plain",
+        ".conf": "text/plain", ".txt": "text/plain", ".md": "text/plain", ".csv": "text/csv",
+        ".gradle": "text/plain", ".pro": "text/plain", ".mf": "text/plain", ".sf": "text/plain",
+        ".sh": "text/x-shellscript", ".py": "text/x-python", ".sql": "text/x-sql",
+        ".pem": "text/plain", ".env": "text/plain",
+    }
+
+    # Signatures of binary formats, checked in order
+    SIGNATURES = [
+        (b"\xfe\xed\xfa\xce", "application/x-mach-binary"),
+        (b"\xce\xfa\xed\xfe", "application/x-mach-binary"),
+        (b"\xfe\xed\xfa\xcf", "application/x-mach-binary"),
+        (b"\xcf\xfa\xed\xfe", "application/x-mach-binary"),
+        # Fat Mach-O, also the signature of Java class files
+        (b"\xca\xfe\xba\xbe", "application/x-mach-binary"),
+        (b"\x7fELF", "application/x-executable"),
+        (b"dex\n", "application/x-dex"),
+        (b"PK\x03\x04", "application/zip"),
+        (b"PK\x05\x06", "application/zip"),
+        (b"bplist", "application/x-bplist"),
+        (b"\x89PNG\r\n\x1a\n", "image/png"),
+        (b"\xff\xd8\xff", "image/jpeg"),
+        (b"GIF8", "image/gif"),
+        (b"\x1f\x8b", "application/gzip"),
+        (b"MZ", "application/x-dosexec"),
+        # Binary XML of Android apps, i.e. AndroidManifest.xml in an apk
+        (b"\x03\x00\x08\x00", "application/x-android-binary-xml"),
+    ]
+
+    # Bytes found in text, everything else is only found in binary files
+    TEXT_CHARS = bytes({7, 8, 9, 10, 12, 13, 27} | set(range(0x20, 0x100)) - {0x7f})
+
+    def __init__(self) -> None:
+        # (extension, signature) -> mimetype, answers of libmagic
+        self._cache = {}
+
+
+    def classify(self, name:str, header:bytes) -> str:
+        """
+        Return the mimetype of a file
+
+        Parameters
+        ----------
+        name : str
+            Name of the file, or of the archive member
+
+        header : bytes
+            First HEADER_SIZE bytes of the file
+
+        Returns
+        ----------
+        str
+            Mimetype of the file, containing "text" for text files
+        """
+
+        for signature, mimetype in FileClassifier.SIGNATURES:
+            if header.startswith(signature):
+                return mimetype
+
+        if header.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "text/plain"
+
+        if not header.translate(None, FileClassifier.TEXT_CHARS):
+            return FileClassifier.TEXT_EXTENSIONS.get(PurePath(name).suffix.lower(), "text/plain")
+
+        key = (PurePath(name).suffix.lower(), header[:FileClassifier.SIGNATURE_SIZE])
+
+        if key not in self._cache:
+            self._cache[key] = _get_magic().from_buffer(header)
+
+            FileClassifier.logger.debug("libmagic classified %s as %s", name, self._cache[key])
+
+        return self._cache[key]
@@ -0,0 +1,218 @@
+"""Module used to cache the findings of file contents between runs"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class FindingsCache():
+    """
+    SQLite cache of the findings of file contents, shared by every scan
+
+    Entries are keyed by the sha256 of a file content and the fingerprint of
+    the regexes and scan settings, so third party files found in many apps
+    are only searched once.  Findings are stored without their paths.
+    Each thread, and scanner worker process, has its own connection, and
+    the database is in WAL mode so they can read while another one writes.
+    The least recently used entries are removed once the cache grows over
+    its maximum size.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    FILENAME = "findings_cache.sqlite"
+
+    # Seconds waited for another connection to finish writing
+    BUSY_TIMEOUT = 30
+
+    # Last use of an entry is only updated once a day, so hits rarely write
+    TOUCH_INTERVAL = 24 * 3600
+
+    def __init__(self, db_file:str, max_size:int) -> None:
+        """
+        Parameters
+        ----------
+        db_file : str
+            Path of the SQLite database
+
+        max_size : int
+            Maximum size of the findings stored in bytes
+        """
+
+        self.db_file = Path(db_file)
+        self.max_size = max_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS findings ("
+                         "content_hash TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+                         "findings TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL, "
+                         "PRIMARY KEY (content_hash, fingerprint))")
+            conn.execute("CREATE INDEX IF NOT EXISTS findings_last_used ON findings (last_used)")
+
+
+    def __getstate__(self) -> dict[str, any]:
+        # Connections can't be shared with the scanner worker processes
+        state = self.__dict__.copy()
+        del state["_local"], state["_lock"]
+        return state
+
+
+    def __setstate__(self, state:dict[str, any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+
+    def reset(self) -> None:
+        """
+        Forget the hits and misses counted so far
+        """
+
+        # [hits, misses]
+        self.stats = [0, 0]
+
+
+    def collect(self) -> list[int]:
+        """
+        Return the hits and misses counted so far and reset, i.e. to send the
+        counts of a scanner worker process back to the parent process
+        """
+
+        with self._lock:
+            stats = self.stats
+            self.reset()
+
+        return stats
+
+
+    def merge(self, stats:list[int]) -> None:
+        """
+        Add the hits and misses returned by collect, i.e. from a scanner worker process
+        """
+
+        with self._lock:
+            self.stats = [self.stats[0] + stats[0], self.stats[1] + stats[1]]
+
+
+    def _count(self, hit:bool) -> None:
+        with self._lock:
+            self.stats[0 if hit else 1] += 1
+
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Return the connection of the current thread
+        """
+
+        # A connection inherited from the parent of a forked worker can't be used
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_file, timeout=FindingsCache.BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+
+        return self._local.conn
+
+
+    def lookup(self, content_hash:str, fingerprint:str) -> list[dict[str, any]] | None:
+        """
+        Return the findings of a file content
+
+        Parameters
+        ----------
+        content_hash : str
+            sha256 of the content
+
+        fingerprint : str
+            Fingerprint of the regexes and scan settings
+
+        Returns
+        ----------
+        list[dict[str, any]] | None
+            Findings without their paths, None if the content is not cached
+        """
+
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT findings, last_used FROM findings WHERE content_hash = ? AND fingerprint = ?",
+                               (content_hash, fingerprint)).fetchone()
+
+            if row is None:
+                self._count(False)
+                return None
+
+            now = time.time()
+
+            if now - row[1] > FindingsCache.TOUCH_INTERVAL:
+                with conn:
+                    conn.execute("UPDATE findings SET last_used = ? WHERE content_hash = ? AND fingerprint = ?",
+                                 (now, content_hash, fingerprint))
+
+        except sqlite3.Error as err:
+            FindingsCache.logger.warning("[!]Could not read the findings cache %s: %s", self.db_file, err)
+            return None
+
+        self._count(True)
+
+        return json.loads(row[0])
+
+
+    def store(self, content_hash:str, fingerprint:str, findings:list[dict[str, any]]) -> None:
+        """
+        Save the findings of a file content
+
+        Parameters
+        ----------
+        content_hash : str
+            sha256 of the content
+
+        fingerprint : str
+            Fingerprint of the regexes and scan settings
+
+        findings : list[dict[str, any]]
+            Findings without their paths
+        """
+
+        data = json.dumps(findings)
+
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO findings VALUES (?, ?, ?, ?, ?)",
+                             (content_hash, fingerprint, data, len(data) + len(content_hash) + len(fingerprint),
+                              time.time()))
+
+        except sqlite3.Error as err:
+            FindingsCache.logger.warning("[!]Could not write to the findings cache %s: %s", self.db_file, err)
+
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache is under its maximum size
+        """
+
+        try:
+            with self._connect() as conn:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM findings").fetchone()[0]
+
+                if total <= self.max_size:
+                    return
+
+                # Keep the most recently used entries fitting in the maximum size
+                removed = conn.execute("DELETE FROM findings WHERE rowid IN ("
+                                       "SELECT rowid FROM (SELECT rowid, SUM(size) OVER "
+                                       "(ORDER BY last_used DESC, rowid) AS kept FROM findings) "
+                                       "WHERE kept > ?)", (self.max_size,)).rowcount
+
+            FindingsCache.logger.info("Evicted %s entries from the findings cache %s", removed, self.db_file)
+
+        except sqlite3.Error as err:
+            FindingsCache.logger.warning("[!]Could not evict from the findings cache %s: %s", self.db_file, err)
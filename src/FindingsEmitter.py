@@ -0,0 +1,184 @@
+"""Module used to write findings in machine readable formats"""
+import hashlib
+import json
+import logging
+from pathlib import Path
+from AppalyzerObjects import RegExMatch
+
+
+class FindingsEmitter():
+    """
+    Base class of the machine readable outputs
+
+    Findings are written one at a time, so the whole result set is never
+    held in memory as one document
+    """
+
+    logger = logging.getLogger(__name__)
+
+    EXTENSION = None
+
+    def __init__(self, outfile:str, artifact:str, artifact_sha256:str | None,
+                 rules:list[str]) -> None:
+        """
+        Parameters
+        ----------
+        outfile : str
+            Path of the file to write
+
+        artifact : str
+            Path of the application or directory that was scanned
+
+        artifact_sha256 : str | None
+            Hash of the application, None for directories
+
+        rules : list[str]
+            Names of the regular expressions used
+        """
+
+        self.outfile = Path(outfile)
+        self.artifact = str(artifact)
+        self.artifact_sha256 = artifact_sha256
+        self.rules = rules
+        self.count = 0
+        self._fd = None
+
+
+    def __enter__(self) -> "FindingsEmitter":
+        self._fd = open(self.outfile, "w", encoding="utf-8")
+        self._write_start()
+        return self
+
+
+    def __exit__(self, *exc) -> None:
+        self._write_end()
+        self._fd.close()
+
+        FindingsEmitter.logger.info("Wrote %s findings to %s", self.count, self.outfile)
+
+
+    def _write_start(self) -> None:
+        """
+        Write what comes before the findings
+        """
+
+
+    def _write_end(self) -> None:
+        """
+        Write what comes after the findings
+        """
+
+
+    def write(self, a_match:RegExMatch) -> None:
+        """
+        Write a finding
+
+        Parameters
+        ----------
+        a_match : RegExMatch
+            The finding
+        """
+        raise NotImplementedError
+
+
+class JsonlEmitter(FindingsEmitter):
+    """
+    JSON Lines output, one finding per line
+    """
+
+    EXTENSION = ".jsonl"
+
+    def write(self, a_match:RegExMatch) -> None:
+        """
+        Write a finding as a single line
+        """
+
+        record = {"artifact": self.artifact,
+                  "artifact_sha256": self.artifact_sha256,
+                  **a_match.to_dict()}
+
+        self._fd.write(json.dumps(record) + "\n")
+        self.count += 1
+
+
+class SarifEmitter(FindingsEmitter):
+    """
+    SARIF 2.1.0 output
+
+    The document is written around the results, so each result is written
+    as it is found instead of building the document in memory
+    """
+
+    EXTENSION = ".sarif"
+
+    SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+    SARIF_VERSION = "2.1.0"
+    TOOL_NAME = "Appalyzer"
+    TOOL_URI = "https://github.com/danf42/appalyzer"
+
+    def _write_start(self) -> None:
+        """
+        Write the run, up to its results
+        """
+
+        artifact = {"location": {"uri": Path(self.artifact).absolute().as_uri()}}
+
+        if self.artifact_sha256:
+            artifact["hashes"] = {"sha-256": self.artifact_sha256}
+
+        driver = {"name": SarifEmitter.TOOL_NAME,
+                  "informationUri": SarifEmitter.TOOL_URI,
+                  "rules": [{"id": name, "shortDescription": {"text": name}} for name in self.rules]}
+
+        run = {"tool": {"driver": driver}, "artifacts": [artifact]}
+
+        # Leave the run open, the results are written one at a time
+        head = json.dumps({"$schema": SarifEmitter.SARIF_SCHEMA,
+                           "version": SarifEmitter.SARIF_VERSION,
+                           "runs": [run]})
+
+        self._fd.write(head[:-len("}]}")] + ', "results": [\n')
+
+
+    def _write_end(self) -> None:
+        """
+        Close the results and the run
+        """
+
+        self._fd.write("\n]}]}\n")
+
+
+    def write(self, a_match:RegExMatch) -> None:
+        """
+        Write a finding as a SARIF result
+        """
+
+        region = {"snippet": {"text": a_match.line_match}}
+
+        # Secrets found in the printable strings of a binary file have no offsets in its text
+        if a_match.secret_pos:
+            unit = "byte" if a_match.secret_unit == "byte" else "char"
+            region[f"{unit}Offset"] = a_match.secret_pos.start
+            region[f"{unit}Length"] = a_match.secret_pos.end - a_match.secret_pos.start
+
+        location = {"physicalLocation": {"artifactLocation": {"uri": Path(a_match.rel_path).as_posix()},
+                                         "region": region}}
+
+        result = {"ruleId": a_match.regex_name,
+                  "level": "warning",
+                  "message": {"text": f"{a_match.regex_name} found in {Path(a_match.rel_path).as_posix()}"},
+                  "locations": [location],
+                  "partialFingerprints": {
+                      "secretHash/v1": hashlib.sha256(a_match.regex_match.encode("utf-8")).hexdigest()},
+                  "properties": {"secret": a_match.regex_match,
+                                 "absolutePath": str(a_match.absolute_path)}}
+
+        if self.count:
+            self._fd.write(",\n")
+
+        self._fd.write(json.dumps(result))
+        self.count += 1
+
+
+EMITTERS = {"jsonl": JsonlEmitter,
+            "sarif": SarifEmitter}
@@ -0,0 +1,156 @@
+"""Module used to write findings to disk as soon as they are found"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+from AppalyzerObjects import RegExMatch
+
+
+class FindingsSpool():
+    """
+    Write-ahead spool of findings, one JSON object per line
+
+    Findings are appended and flushed as each file is searched, so they are
+    not held in memory and survive a crash or an interrupted scan.  The
+    report is built from the spool once the scan is done.
+    """
+
+    logger = logging.getLogger(__name__)
+
+    SPOOL_SUFFIX = ".spool.jsonl"
+
+    def __init__(self, spool_file:str) -> None:
+        """
+        Parameters
+        ----------
+        spool_file : str
+            Path of the spool file, it is truncated
+        """
+
+        self.spool_file = Path(spool_file)
+        self.count = 0
+        self._fd = open(self.spool_file, "w", encoding="utf-8")
+
+
+    def __enter__(self) -> "FindingsSpool":
+        return self
+
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+    def write(self, matches:Iterable[RegExMatch]) -> None:
+        """
+        Append the findings of a file to the spool
+
+        Parameters
+        ----------
+        matches : Iterable[RegExMatch]
+            Matches found in the file
+        """
+
+        lines = [json.dumps(a_match.to_dict()) + "\n" for a_match in matches]
+
+        if lines:
+            self._fd.writelines(lines)
+            self._fd.flush()
+            self.count += len(lines)
+
+
+    def close(self) -> None:
+        """
+        Flush the spool to disk and close it
+        """
+
+        if not self._fd.closed:
+            self._fd.flush()
+            os.fsync(self._fd.fileno())
+            self._fd.close()
+
+
+    def index(self) -> dict[str, list[int]]:
+        """
+        Return the offset of each finding in the spool, grouped by regex name
+
+        Returns
+        ----------
+        dict[str, list[int]]
+            Regex names, in the order they were first found, mapped to the
+            offsets of their findings
+        """
+
+        groups = {}
+
+        with open(self.spool_file, "rb") as fd:
+
+            offset = 0
+
+            for line in fd:
+                a_match = FindingsSpool.__parse(line)
+
+                if a_match:
+                    groups.setdefault(a_match.regex_name, []).append(offset)
+
+                offset += len(line)
+
+        return groups
+
+
+    def matches(self) -> Iterator[RegExMatch]:
+        """
+        Read every finding back from the spool, in the order they were found
+
+        Returns
+        ----------
+        Iterator[RegExMatch]
+            The findings
+        """
+
+        with open(self.spool_file, "rb") as fd:
+
+            for line in fd:
+                a_match = FindingsSpool.__parse(line)
+
+                if a_match:
+                    yield a_match
+
+
+    def read(self, offsets:list[int]) -> Iterator[RegExMatch]:
+        """
+        Read findings back from the spool
+
+        Parameters
+        ----------
+        offsets : list[int]
+            Offsets of the findings, from index
+
+        Returns
+        ----------
+        Iterator[RegExMatch]
+            The findings
+        """
+
+        with open(self.spool_file, "rb") as fd:
+
+            for offset in offsets:
+                fd.seek(offset)
+                a_match = FindingsSpool.__parse(fd.readline())
+
+                if a_match:
+                    yield a_match
+
+
+    @staticmethod
+    def __parse(line:bytes) -> RegExMatch | None:
+        """
+        Parse a line of the spool, None if it was cut short by a crash
+        """
+
+        try:
+            return RegExMatch.from_dict(json.loads(line))
+
+        except (ValueError, TypeError, KeyError) as err:
+            FindingsSpool.logger.debug("Skipping incomplete spool line: %s", err)
+            return None
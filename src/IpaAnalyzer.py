@@ -1,12 +1,14 @@
 """Module to Decompile and Search for secrets in iOS Mobile Applications"""
 import logging
-from zipfile import ZipFile
+from typing import BinaryIO
+from zipfile import ZipFile, ZipInfo
 import plistlib
+import re
 import json
 from datetime import date, datetime
-from pathlib import Path
-import magic
 from Appalyzer import Appalyzer
+from MachOStrings import MachOStrings
+from StringsExtractor import StringsMap
 
 class IpaAnalyzer(Appalyzer):
     """
@@ -15,7 +17,12 @@ class IpaAnalyzer(Appalyzer):
 
     logger = logging.getLogger(__name__)
 
-    MACO_EXE_MAGIC = "Mach-O 64-bit arm64"
+    APP_DIR_REGEX = re.compile(r"(.*?[^/]+\.app/)")
+
+    # Provisioning profiles are an xml plist wrapped in a CMS signature
+    EMBEDDED_PLIST_REGEX = re.compile(rb"<\?xml.*?</plist>", re.DOTALL)
+
+    BINARY_PLIST_MAGIC = b"bplist"
 
     def __init__(self, app:str, regexfile:str=None) -> None:
         """        
@@ -27,7 +34,7 @@ class IpaAnalyzer(Appalyzer):
 
         super().__init__(app, regexfile)
 
-        self.__toscan_dir = None
+        self.__app_prefix = None
 
 
     def __json_serializer(self, obj:any) -> any:
@@ -51,82 +58,112 @@ class IpaAnalyzer(Appalyzer):
             return obj.isoformat()
 
         elif isinstance(obj, bytes):
-            return obj.decode('utf-8', errors="ignore")
+            # Data values are often archived plists or binary blobs, search their strings
+            if obj.startswith(IpaAnalyzer.BINARY_PLIST_MAGIC):
+                nested = self.__plist_to_json("nested plist", obj)
+                if nested is not None:
+                    return nested
+
+            return self._strings.extract(obj)
 
         else:
             IpaAnalyzer.logger.debug("[!] Unsupported serializable object %s : type: %s", obj, type(obj))
             raise TypeError (f"[!] Type {type(obj)} not serializable")
 
-    def __plist_to_json(self, pfile:str) -> None:
+    def __plist_to_json(self, name:str, data:bytes) -> str | None:
         """
-        Convert plist file to json file
+        Convert plist data to json
 
         Parameters
         ----------
-        pfile : str
-            Absolute path to the plist file
+        name : str
+            Name of the plist file
+
+        data : bytes
+            Contents of the plist file
+
+        Returns
+        ----------
+        str | None
+            Indented json, None if the data is not a valid plist
+        """
+
+        try:
+            pfiledata = plistlib.loads(data)
+
+        except (plistlib.InvalidFileException, ValueError) as e:
+            IpaAnalyzer.logger.error("[!] Error processing %s : %s", name, str(e))
+            return None
+
+        IpaAnalyzer.logger.debug("[plistfile] Converted %s to json", name)
 
+        return json.dumps(pfiledata, indent=4, ensure_ascii=False, default=self.__json_serializer)
+
+
+    def __find_app_prefix(self) -> str:
         """
+        Find the *.app directory in the ipa file
 
-        outfile = f"{pfile}.json"
+        Returns
+        ----------
+        str
+            Path of the *.app directory in the archive, i.e. "Payload/MyApp.app/"
+        """
 
-        with open(pfile, 'rb') as fd:
+        with ZipFile(self.app, mode='r') as zfile:
+            prefixes = {mo.group(1) for mo in map(IpaAnalyzer.APP_DIR_REGEX.match, zfile.namelist()) if mo}
 
-            try:
-                pfiledata = plistlib.load(fd)
+        return sorted(prefixes)[0]
 
-            except plistlib.InvalidFileException as e:
-                IpaAnalyzer.logger.error("[!] Error processing %s : %s", pfile, str(e))
 
-            else:
-                IpaAnalyzer.logger.debug("[plistfile] Writing contentes to %s", outfile)
-                with open(outfile, "w", encoding="utf-8") as fd:
-                    json.dump(pfiledata, fd, indent=4, default=self.__json_serializer)
+    def _include_member(self, info:ZipInfo) -> bool:
+        """
+        Only search the members of the *.app directory
+        """
+        return info.filename.startswith(self.__app_prefix) and super()._include_member(info)
 
 
-    def __decompile_app(self) -> None:
+    def _member_rel_path(self, name:str) -> str:
         """
-        Decompile the app and store in directory
-        Process will take some time to decompile application
+        Report members relative to the *.app directory
         """
+        return name[len(self.__app_prefix):]
 
-        # Create the temp directory
-        self._outdir = self._outdir.joinpath(f"{self.app.stem}", \
-                                             f"{self.app.stem}_{self._time_now}")
-        self._outdir.mkdir(parents=True, exist_ok=True)
 
-        # Unzip ipa file to self_outdir
-        IpaAnalyzer.logger.info("Unzipping file...")
-        unzipped_dir = self._outdir.joinpath("unzipped")
-        zfile = ZipFile(self.app, mode='r')
-        zfile.extractall(path=unzipped_dir)
+    def _member_content(self, name:str, data:bytes) -> str | None:
+        """
+        Search plist files (xml, binary and the plist embedded in
+        *.mobileprovision files) as json, other binary files (*.car, ...)
+        have their strings extracted
+        """
 
-        # Find mobile file in the extracted archive
-        appdir =  Path(sorted(unzipped_dir.glob("**/*.app"))[0])
-        dirlist = sorted(appdir.rglob("*"))
+        if name.endswith(".plist") or data.startswith(IpaAnalyzer.BINARY_PLIST_MAGIC):
+            return self.__plist_to_json(name, data)
 
-        # Set the scandir to the *.app directory
-        self.__toscan_dir = appdir
+        if name.endswith(".mobileprovision"):
+            mo = IpaAnalyzer.EMBEDDED_PLIST_REGEX.search(data)
+            if mo:
+                return self.__plist_to_json(name, mo.group())
 
-        for item in dirlist:
+        return None
 
-            if Path(item).is_file():
 
-                m = magic.from_file(item)
-                ext = Path(item).suffix
+    def _member_strings(self, name:str, header:bytes, fd:BinaryIO) -> tuple[str, StringsMap] | None:
+        """
+        Search Mach-O binaries, thin or fat, by the strings of their string
+        sections only, located at Test#arm64:__TEXT,__cstring@0x100004f20
+        """
 
-                if IpaAnalyzer.MACO_EXE_MAGIC in m:
-                    IpaAnalyzer.logger.debug("Pricessing binary file:  %s in binary %s", \
-                                             {IpaAnalyzer.MACO_EXE_MAGIC}, item)
-                    self._run_strings(item)
+        if not MachOStrings.is_macho(header):
+            return None
 
-                elif ext == ".plist":
-                    IpaAnalyzer.logger.debug("Processing plist file: %s", item)
-                    self.__plist_to_json(item)
+        try:
+            return MachOStrings(fd).extract(self._strings)
 
-                elif ext == ".car" or ext == ".mobileprovision":
-                    IpaAnalyzer.logger.debug("Running strings on file:  %s", item)
-                    self._run_strings(item)
+        except ValueError as err:
+            IpaAnalyzer.logger.debug("[*]Searching the strings of %s: %s", name, err)
+            fd.seek(len(header))
+            return None
 
 
     def secret_search(self) -> None:
@@ -137,8 +174,8 @@ class IpaAnalyzer(Appalyzer):
         # Write header
         self._write_header()
 
-        # Decompile the App
-        self.__decompile_app()
+        # Find the *.app directory in the archive
+        self.__app_prefix = self.__find_app_prefix()
 
-        # Start searching for secrets
-        self._search(self.__toscan_dir)
+        # Search the members straight from the archive, nothing is extracted to disk
+        self._search_archive(self.app)
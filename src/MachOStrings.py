@@ -0,0 +1,310 @@
+"""Module used to read the strings of Mach-O binaries from their string sections only"""
+import logging
+import struct
+from typing import BinaryIO, Iterator
+from StringsExtractor import StringsExtractor, StringsMap
+
+
+class MachOStrings():
+    """
+    String sections of a Mach-O binary, thin or fat, 32 or 64-bit
+
+    Only the sections holding strings are read, instead of the whole
+    binary: C strings (__cstring, __objc_methname, __objc_classname),
+    UTF-16 strings (__ustring) and constant data (__const), of which the
+    printable runs are kept.  The code sections and their noise are skipped
+    """
+
+    logger = logging.getLogger(__name__)
+
+    MH_MAGIC = 0xfeedface
+    MH_CIGAM = 0xcefaedfe
+    MH_MAGIC_64 = 0xfeedfacf
+    MH_CIGAM_64 = 0xcffaedfe
+
+    FAT_MAGIC = 0xcafebabe
+    FAT_MAGIC_64 = 0xcafebabf
+
+    # Java class files share the fat magic, their version is where the number of archs is
+    MAX_FAT_ARCHS = 32
+
+    LC_SEGMENT = 0x1
+    LC_SEGMENT_64 = 0x19
+
+    # Section types without content in the file
+    ZEROFILL_TYPES = (0x1, 0xc, 0x12)
+
+    # Section name -> how its strings are stored
+    STRING_SECTIONS = {"__cstring": "cstring",
+                       "__objc_methname": "cstring",
+                       "__objc_classname": "cstring",
+                       "__ustring": "utf16",
+                       "__const": "runs"}
+
+    CPU_TYPES = {7: "i386",
+                 0x01000007: "x86_64",
+                 12: "arm",
+                 0x0100000c: "arm64",
+                 0x0200000c: "arm64_32",
+                 18: "ppc",
+                 0x01000012: "ppc64"}
+
+    def __init__(self, fd:BinaryIO) -> None:
+        """
+        Parameters
+        ----------
+        fd : BinaryIO
+            Seekable Mach-O file, the header of each slice, its load commands
+            and its string sections are read in file order so only forward
+            seeks are needed, i.e. on an archive member
+
+        Raises
+        ----------
+        ValueError
+            If the file is not a Mach-O binary, or its fat header is out of bounds
+        """
+
+        self._fd = fd
+        self._slices = self.__parse()
+
+
+    @staticmethod
+    def is_macho(header:bytes) -> bool:
+        """
+        Return True if the header is the one of a thin or fat Mach-O binary
+        """
+
+        if len(header) < 8:
+            return False
+
+        magic, nfat = struct.unpack_from(">II", header)
+
+        if magic in (MachOStrings.FAT_MAGIC, MachOStrings.FAT_MAGIC_64):
+            return 0 < nfat <= MachOStrings.MAX_FAT_ARCHS
+
+        return struct.unpack_from("<I", header)[0] in (MachOStrings.MH_MAGIC, MachOStrings.MH_CIGAM,
+                                                       MachOStrings.MH_MAGIC_64, MachOStrings.MH_CIGAM_64)
+
+
+    def _read(self, offset:int, size:int) -> bytes:
+        """
+        Read size bytes at an offset of the file
+
+        Raises
+        ----------
+        ValueError
+            If the file is shorter
+        """
+
+        self._fd.seek(offset)
+        data = self._fd.read(size)
+
+        if len(data) != size:
+            raise ValueError(f"{size} bytes at {offset:#x} are out of bounds")
+
+        return data
+
+
+    def __parse(self) -> list[tuple[int, bytes]]:
+        """
+        Find the slice of each architecture
+
+        Returns
+        ----------
+        list[tuple[int, bytes]]
+            Offset in the file and first 8 bytes of each slice, in file order
+        """
+
+        header = self._read(0, 8)
+
+        if not MachOStrings.is_macho(header):
+            raise ValueError("not a Mach-O file")
+
+        magic, nfat = struct.unpack_from(">II", header)
+
+        if magic == MachOStrings.FAT_MAGIC:
+            archs = self._read(8, nfat * 20)
+            slices = [struct.unpack_from(">II", archs, i * 20 + 8)[0] for i in range(nfat)]
+
+        elif magic == MachOStrings.FAT_MAGIC_64:
+            archs = self._read(8, nfat * 32)
+            slices = [struct.unpack_from(">Q", archs, i * 32 + 8)[0] for i in range(nfat)]
+
+        else:
+            # The header of a thin binary was just read
+            return [(0, header)]
+
+        # The first bytes of a slice are read once the previous slices were searched
+        return [(base, None) for base in sorted(set(slices))]
+
+
+    def __parse_thin(self, base:int, header:bytes | None) -> list[tuple[str, str, str, int, int, int]]:
+        """
+        Find the string sections of a thin Mach-O binary, or of a slice of a fat one
+
+        Returns
+        ----------
+        list[tuple[str, str, str, int, int, int]]
+            Architecture, segment and section names, address, offset in the
+            file and size of each string section, in file order
+        """
+
+        if header is None:
+            header = self._read(base, 8)
+
+        magic, = struct.unpack_from("<I", header)
+
+        if magic in (MachOStrings.MH_MAGIC, MachOStrings.MH_MAGIC_64):
+            endian = "<"
+
+        elif magic in (MachOStrings.MH_CIGAM, MachOStrings.MH_CIGAM_64):
+            endian = ">"
+
+        else:
+            raise ValueError(f"bad Mach-O magic {magic:#x} at {base:#x}")
+
+        is_64 = magic in (MachOStrings.MH_MAGIC_64, MachOStrings.MH_CIGAM_64)
+        header_size = 32 if is_64 else 28
+
+        cputype, = struct.unpack_from(f"{endian}i", header, 4)
+        _, _, ncmds, sizeofcmds = struct.unpack_from(f"{endian}IIII", self._read(base + 8, header_size - 8))
+        arch = MachOStrings.CPU_TYPES.get(cputype, f"cpu{cputype:#x}")
+        commands = self._read(base + header_size, sizeofcmds)
+
+        # Layout of segment_command(_64) and section(_64)
+        if is_64:
+            segment_cmd, nsects_off, sections_off, section_size, section_fmt = \
+                MachOStrings.LC_SEGMENT_64, 64, 72, 80, f"{endian}QQI"
+
+        else:
+            segment_cmd, nsects_off, sections_off, section_size, section_fmt = \
+                MachOStrings.LC_SEGMENT, 48, 56, 68, f"{endian}III"
+
+        flags_off = 64 if is_64 else 56
+        sections = []
+        pos = 0
+
+        for _ in range(ncmds):
+            cmd, cmdsize = struct.unpack_from(f"{endian}II", commands, pos)
+
+            if cmdsize < 8:
+                raise ValueError(f"bad load command size {cmdsize} at {base + header_size + pos:#x}")
+
+            if cmd == segment_cmd:
+                nsects, = struct.unpack_from(f"{endian}I", commands, pos + nsects_off)
+
+                for i in range(nsects):
+                    section = pos + sections_off + i * section_size
+                    sectname = commands[section:section + 16].split(b"\x00")[0].decode("ascii", errors="replace")
+                    segname = commands[section + 16:section + 32].split(b"\x00")[0].decode("ascii", errors="replace")
+                    addr, size, offset = struct.unpack_from(section_fmt, commands, section + 32)
+                    flags, = struct.unpack_from(f"{endian}I", commands, section + flags_off)
+
+                    if sectname in MachOStrings.STRING_SECTIONS and offset and size \
+                            and flags & 0xff not in MachOStrings.ZEROFILL_TYPES:
+                        sections.append((arch, segname, sectname, addr, base + offset, size))
+
+            pos += cmdsize
+
+        return sorted(sections, key=lambda section: section[4])
+
+
+    def __sections(self) -> Iterator[tuple[str, str, str, int, int, int]]:
+        """
+        Find the string sections of each slice once the previous slices were read
+        """
+
+        for base, header in self._slices:
+            try:
+                yield from self.__parse_thin(base, header)
+
+            except struct.error as err:
+                raise ValueError(f"truncated Mach-O file: {err}") from None
+
+
+    def extract(self, strings_extractor:StringsExtractor) -> tuple[str, StringsMap]:
+        """
+        Return the strings of the string sections, one string per line, and
+        a map from positions in the returned text back to the strings
+
+        Parameters
+        ----------
+        strings_extractor : StringsExtractor
+            Used to extract the printable strings of __const sections, its
+            minimum length applies to all the strings
+
+        Returns
+        ----------
+        tuple[str, StringsMap]
+            Strings separated by new lines and their map, strings are located
+            at <arch>:<segment>,<section>@<address>
+
+        Raises
+        ----------
+        ValueError
+            If the load commands or sections of a slice are out of bounds
+        """
+
+        texts = []
+        string_map = StringsMap()
+        position = 0
+        size = 0
+        count = 0
+
+        for arch, segname, sectname, addr, offset, section_size in self.__sections():
+            data = self._read(offset, section_size)
+            kind = MachOStrings.STRING_SECTIONS[sectname]
+            size += section_size
+            count += 1
+
+            if kind == "cstring":
+                strings = MachOStrings.__split(data, b"\x00", 1, "utf-8")
+
+            elif kind == "utf16":
+                strings = MachOStrings.__split(data, b"\x00\x00", 2, "utf-16-le")
+
+            else:
+                strings = ((start, start + len(text) * width, text)
+                           for start, text, width in strings_extractor.runs(data))
+
+            for start, end, text in strings:
+                if len(text) < strings_extractor.min_length:
+                    continue
+
+                string_map.add(position, (offset + start, offset + end), text,
+                               f"{arch}:{segname},{sectname}@{addr + start:#x}")
+                texts.append(text)
+                position += len(text) + 1
+
+        MachOStrings.logger.debug("Read %s bytes of %s string sections", size, count)
+
+        return "\n".join(texts), string_map
+
+
+    @staticmethod
+    def __split(data:bytes, terminator:bytes, width:int, encoding:str) -> Iterator[tuple[int, int, str]]:
+        """
+        Split NUL terminated strings
+
+        Returns
+        ----------
+        Iterator[tuple[int, int, str]]
+            Start and end offsets in the data and text of each string
+        """
+
+        start = 0
+
+        while start < len(data):
+            end = data.find(terminator, start)
+
+            # UTF-16 terminators are aligned on characters
+            while end > 0 and (end - start) % width:
+                end = data.find(terminator, end + 1)
+
+            if end < 0:
+                end = len(data)
+
+            if end > start:
+                yield start, end, data[start:end].decode(encoding, errors="replace")
+
+            start = end + width
@@ -0,0 +1,381 @@
+"""Module used to compile the regular expressions once and run them against content"""
+import hashlib
+import json
+import logging
+import re
+from typing import Iterator
+from PatternLinter import PatternLinter
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+
+class MatcherEngine():
+    """
+    Compile the regular expressions once per run and use the literal anchors
+    required by each expression to decide which ones need to run on some content
+    """
+
+    logger = logging.getLogger(__name__)
+
+    # Anchors shorter than this show up in almost every file, don't bother with them
+    MIN_ANCHOR_LENGTH = 3
+
+    # Max number of literal strings a run of character classes can expand to
+    MAX_EXPANSION = 16
+
+    def __init__(self, regexes:dict[str, str], lint:str = "rewrite") -> None:
+        """
+        Parameters
+        ----------
+        regexes : dict[str, str]
+            Regular expression names mapped to the regular expressions
+
+        lint : str
+            "rewrite" to rewrite the constructs of the regular expressions known
+            to backtrack for a long time, "warn" to only log them, "off" to do neither
+        """
+
+        self._patterns = []
+
+        if lint != "off":
+            regexes = MatcherEngine._lint(regexes, lint == "rewrite")
+
+        self.fingerprint = hashlib.sha256(json.dumps(regexes, sort_keys=True).encode("utf-8")).hexdigest()
+
+        for name, pattern in regexes.items():
+
+            try:
+                compiled = re.compile(pattern)
+
+            except re.error as err:
+                MatcherEngine.logger.error("[!]Skipping regex %s, could not compile: %s", name, err)
+
+            else:
+                anchors = MatcherEngine._get_anchors(compiled.pattern)
+
+                MatcherEngine.logger.debug("Regex %s anchors: %s", name,
+                                           [sorted(clause) for clause in anchors])
+
+                self._patterns.append((name, compiled, anchors))
+
+        unanchored = [name for name, _, anchors in self._patterns if not anchors]
+        MatcherEngine.logger.info("Compiled %s regular expressions, %s without literal anchors",
+                                  len(self._patterns), len(unanchored))
+
+
+    @staticmethod
+    def _lint(regexes:dict[str, str], rewrite:bool) -> dict[str, str]:
+        """
+        Log the slow constructs of the regular expressions, and rewrite them if asked
+
+        Returns
+        ----------
+        dict[str, str]
+            Regular expression names mapped to the regular expressions to compile
+        """
+
+        linted = {}
+
+        for name, pattern in regexes.items():
+
+            linted[name], issues = PatternLinter.lint(pattern, rewrite)
+
+            if linted[name] != pattern:
+                MatcherEngine.logger.info("Rewrote regex %s to %s: %s", name, linted[name], "; ".join(issues))
+
+            else:
+                for issue in issues:
+                    MatcherEngine.logger.warning("[!]Regex %s: %s", name, issue)
+
+        return linted
+
+
+    def __len__(self) -> int:
+        """
+        Number of compiled regular expressions
+        """
+        return len(self._patterns)
+
+
+    def candidates(self, content:str) -> list[tuple[str, re.Pattern]]:
+        """
+        Return the regular expressions that could match the content
+
+        A regular expression is a candidate when, for every group of anchors
+        it requires, at least one of them is found in the content.
+        Regular expressions without anchors are always a candidate.
+
+        Parameters
+        ----------
+        content : str
+            Content to prefilter
+
+        Returns
+        ----------
+        list[tuple[str, re.Pattern]]
+            List of regex name and compiled regular expression
+        """
+
+        lowered = content.lower()
+        found = {}
+
+        def is_found(anchor:str) -> bool:
+            if anchor not in found:
+                found[anchor] = anchor in lowered
+            return found[anchor]
+
+        return [(name, compiled) for name, compiled, anchors in self._patterns
+                if all(any(is_found(a) for a in clause) for clause in anchors)]
+
+
+    def search(self, content:str, pos:int = 0) -> Iterator[tuple[str, re.Match]]:
+        """
+        Search the content with every candidate regular expression
+
+        Parameters
+        ----------
+        content : str
+            Content to search
+
+        pos : int
+            Position in the content to start searching from, the content
+            before it is only used as context (i.e. for lookbehinds)
+
+        Returns
+        ----------
+        Iterator[tuple[str, re.Match]]
+            The regex name and the first match for each regular expression that matched
+        """
+
+        for name, compiled in self.candidates(content):
+
+            mo = compiled.search(content, pos)
+
+            if mo:
+                yield name, mo
+
+
+    def finditer(self, content:str, pos:int = 0) -> Iterator[tuple[str, Iterator[re.Match]]]:
+        """
+        Search the content for every match of every candidate regular expression
+
+        Parameters
+        ----------
+        content : str
+            Content to search
+
+        pos : int
+            Position in the content to start searching from, the content
+            before it is only used as context (i.e. for lookbehinds)
+
+        Returns
+        ----------
+        Iterator[tuple[str, Iterator[re.Match]]]
+            The regex name and its matches, in order, for each candidate
+            regular expression.  The matches are found as they are consumed,
+            so a caller can stop early
+        """
+
+        for name, compiled in self.candidates(content):
+            yield name, compiled.finditer(content, pos)
+
+
+    @staticmethod
+    def _get_anchors(pattern:str) -> list[frozenset[str]]:
+        """
+        Find the lower case literals a match of the pattern must contain
+
+        Parameters
+        ----------
+        pattern : str
+            Regular expression
+
+        Returns
+        ----------
+        list[frozenset[str]]
+            Every match contains at least one literal of each set
+        """
+
+        try:
+            parsed = sre_parse.parse(pattern)
+
+        except re.error:
+            return []
+
+        clauses = MatcherEngine._sequence_anchors(list(parsed))
+
+        return list(dict.fromkeys(clauses))
+
+
+    @staticmethod
+    def _sequence_anchors(items:list) -> list[frozenset[str]]:
+        """
+        Find the anchors for a sequence of parsed regex items
+        """
+
+        clauses = []
+        run = {""}
+
+        def close_run():
+            nonlocal run
+            if min(len(s) for s in run) >= MatcherEngine.MIN_ANCHOR_LENGTH:
+                clauses.append(frozenset(run))
+            run = {""}
+
+        for op, av in items:
+
+            expanded = MatcherEngine._expand(op, av)
+
+            if expanded is not None:
+                product = {a + b for a in run for b in expanded}
+
+                if len(product) <= MatcherEngine.MAX_EXPANSION:
+                    run = product
+                    continue
+
+                close_run()
+
+                if len(expanded) <= MatcherEngine.MAX_EXPANSION:
+                    run = expanded
+                continue
+
+            # Repeated literals such as \-{5,} still start with fixed text
+            if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+                lo, _, sub = av
+                sub_expanded = MatcherEngine._expand_sequence(list(sub)) if lo else None
+
+                if sub_expanded is not None:
+                    prefix = {""}
+                    for _ in range(lo):
+                        prefix = {a + b for a in prefix for b in sub_expanded}
+                        if len(prefix) > MatcherEngine.MAX_EXPANSION:
+                            break
+
+                    else:
+                        product = {a + b for a in run for b in prefix}
+                        if len(product) <= MatcherEngine.MAX_EXPANSION:
+                            run = product
+
+                    close_run()
+                    continue
+
+            close_run()
+            clauses.extend(MatcherEngine._item_anchors(op, av))
+
+        close_run()
+
+        return clauses
+
+
+    @staticmethod
+    def _item_anchors(op, av) -> list[frozenset[str]]:
+        """
+        Find the anchors for a single parsed regex item that is not a fixed literal
+        """
+
+        if op is sre_constants.SUBPATTERN:
+            return MatcherEngine._sequence_anchors(list(av[-1]))
+
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            lo, _, sub = av
+            return MatcherEngine._sequence_anchors(list(sub)) if lo else []
+
+        if op is sre_constants.BRANCH:
+            union = set()
+
+            for branch in av[1]:
+                clauses = MatcherEngine._sequence_anchors(list(branch))
+
+                if not clauses:
+                    return []
+
+                # Any branch can match, so only its most selective clause is kept
+                union.update(max(clauses, key=lambda c: min(len(s) for s in c)))
+
+            return [frozenset(union)]
+
+        return []
+
+
+    @staticmethod
+    def _expand(op, av) -> set[str] | None:
+        """
+        Return the lower case strings a parsed regex item matches,
+        or None if it is not a small fixed set of strings
+        """
+
+        if op is sre_constants.LITERAL:
+            return {chr(av).lower()}
+
+        if op is sre_constants.AT:
+            return {""}
+
+        if op is sre_constants.IN:
+            if all(item_op is sre_constants.LITERAL for item_op, _ in av):
+                chars = {chr(c).lower() for _, c in av}
+                if len(chars) <= MatcherEngine.MAX_EXPANSION:
+                    return chars
+
+            return None
+
+        if op is sre_constants.SUBPATTERN:
+            return MatcherEngine._expand_sequence(list(av[-1]))
+
+        if op is sre_constants.BRANCH:
+            expanded = set()
+
+            for branch in av[1]:
+                branch_expanded = MatcherEngine._expand_sequence(list(branch))
+
+                if branch_expanded is None:
+                    return None
+
+                expanded.update(branch_expanded)
+
+            return expanded if len(expanded) <= MatcherEngine.MAX_EXPANSION else None
+
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            lo, hi, sub = av
+
+            if lo == hi and lo <= MatcherEngine.MAX_EXPANSION:
+                sub_expanded = MatcherEngine._expand_sequence(list(sub))
+
+                if sub_expanded is not None:
+                    expanded = {""}
+                    for _ in range(lo):
+                        expanded = {a + b for a in expanded for b in sub_expanded}
+                        if len(expanded) > MatcherEngine.MAX_EXPANSION:
+                            return None
+
+                    return expanded
+
+        return None
+
+
+    @staticmethod
+    def _expand_sequence(items:list) -> set[str] | None:
+        """
+        Return the lower case strings a sequence of parsed regex items matches,
+        or None if it is not a small fixed set of strings
+        """
+
+        expanded = {""}
+
+        for op, av in items:
+            item_expanded = MatcherEngine._expand(op, av)
+
+            if item_expanded is None:
+                return None
+
+            expanded = {a + b for a in expanded for b in item_expanded}
+
+            if len(expanded) > MatcherEngine.MAX_EXPANSION:
+                return None
+
+        return expanded
@@ -0,0 +1,346 @@
+"""Module used to find, and rewrite, regular expressions that can backtrack for a long time"""
+import json
+import re
+import sys
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+
+class PatternLinter():
+    """
+    Find constructs in regular expressions known to make the search time
+    grow faster than the size of the content, and rewrite the ones that
+    can be rewritten without changing which secrets the regular expression finds
+
+    - (\\n|.)* matches anything one alternation at a time, it is rewritten
+      to [\\s\\S]*? which also stops at the first end marker, so two private
+      keys in a file are two matches instead of one spanning both
+    - A repeat without upper bound at the start of a regular expression,
+      i.e. .*firebaseio or [A-Za-z_-]*password, is retried from every
+      position of a long line or identifier.  It is bounded to
+      MAX_LEADING_REPEAT characters, which only shortens what is reported
+      before the match of a very long line
+    - A global flag after the start, i.e. (LTAI)(?i)[a-z0-9]{20}, is an
+      error since Python 3.11.  It is scoped to the rest of the regular expression
+    - Nested repeats, i.e. (a+)+, can backtrack exponentially, they are only reported
+    - A | in a character class, i.e. [a|A], matches a literal |, it is only reported
+    """
+
+    # Longest text matched by a repeat at the start of a rewritten regular expression
+    MAX_LEADING_REPEAT = 128
+
+    # (\n|.)* and (.|\n)*, the newline either escaped or literal
+    DOT_NEWLINE_REGEX = re.compile(r"\((?:\?:)?(?:\.\|(?:\\n|\n)|(?:\\n|\n)\|\.)\)([*+])\??")
+
+    QUANTIFIER_REGEX = re.compile(r"(?:[*+?]|\{\d*(?:,\d*)?\})[?+]?")
+
+    BOUNDS_REGEX = re.compile(r"(?:(?P<repeat>[*+?])|\{(?P<lower>\d*)(?P<comma>,)?(?P<upper>\d*)\})(?P<suffix>[?+]?)")
+
+    # A class of single characters separated by |, i.e. [a|A] or [\'|"]
+    PIPE_CLASS_REGEX = re.compile(r"(?<!\\)\[(?:\\.|[^\]\\|])(?:\|(?:\\.|[^\]\\|]))+\]")
+
+    FLAGS_REGEX = re.compile(r"\(\?([aiLmsux]+)\)")
+
+    SCOPED_FLAGS = set("imsx")
+
+
+    @staticmethod
+    def lint(pattern:str, rewrite:bool = True) -> tuple[str, list[str]]:
+        """
+        Find the slow constructs of a regular expression
+
+        Parameters
+        ----------
+        pattern : str
+            Regular expression
+
+        rewrite : bool
+            Rewrite the constructs that can be rewritten, otherwise only report them
+
+        Returns
+        ----------
+        tuple[str, list[str]]
+            The regular expression, rewritten if asked, and a description of each construct found
+        """
+
+        issues = []
+        linted = pattern
+
+        if PatternLinter.DOT_NEWLINE_REGEX.search(linted):
+            issues.append("(\\n|.)* alternates for every character")
+            linted = PatternLinter.DOT_NEWLINE_REGEX.sub(lambda mo: f"[\\s\\S]{mo.group(1)}?", linted)
+
+        items = PatternLinter._split(linted)
+
+        # Rewriting items is only safe without a top level alternation
+        if items is not None:
+            items = PatternLinter._lint_flags(items, issues)
+            items = PatternLinter._lint_leading_repeat(items, issues)
+            linted = "".join(atom + quantifier for atom, quantifier in items)
+
+        if PatternLinter._has_pipe_in_class(pattern):
+            issues.append("| in a character class matches a literal |, not an alternation")
+
+        try:
+            parsed = sre_parse.parse(linted)
+
+        except re.error:
+            pass
+
+        else:
+            if PatternLinter._has_nested_repeat(list(parsed), False):
+                issues.append("nested repeats can backtrack exponentially")
+
+        if linted != pattern:
+            try:
+                re.compile(linted)
+
+            except re.error as err:
+                issues.append(f"rewrite does not compile, kept as is: {err}")
+                linted = pattern
+
+        return (linted if rewrite else pattern), issues
+
+
+    @staticmethod
+    def _lint_flags(items:list[tuple[str, str]], issues:list[str]) -> list[tuple[str, str]]:
+        """
+        Scope a global flag found after the start to the rest of the regular expression
+        """
+
+        for i, (atom, quantifier) in enumerate(items):
+
+            mo = PatternLinter.FLAGS_REGEX.fullmatch(atom)
+
+            if i == 0 or not mo or quantifier:
+                continue
+
+            if set(mo.group(1)) - PatternLinter.SCOPED_FLAGS:
+                issues.append(f"global flag {atom} after the start of the regex can not be scoped")
+                break
+
+            issues.append(f"global flag {atom} after the start of the regex")
+            rest = "".join(a + q for a, q in items[i + 1:])
+
+            return items[:i] + [(f"(?{mo.group(1)}:{rest})", "")]
+
+        return items
+
+
+    @staticmethod
+    def _lint_leading_repeat(items:list[tuple[str, str]], issues:list[str]) -> list[tuple[str, str]]:
+        """
+        Bound a repeat without upper bound at the start of the regular expression
+        """
+
+        for i, (atom, quantifier) in enumerate(items):
+
+            # Global flags and optional items don't fix where a match starts
+            if PatternLinter.FLAGS_REGEX.fullmatch(atom) and not quantifier:
+                continue
+
+            lower, upper, suffix = PatternLinter._bounds(quantifier)
+
+            if lower == 0 and upper is not None:
+                continue
+
+            # Only bound single characters, so the bound is a number of characters
+            single = atom.startswith("[") or len(atom) == 1 or atom.startswith("\\") and len(atom) == 2
+
+            if upper is None and single and lower < PatternLinter.MAX_LEADING_REPEAT and i + 1 < len(items):
+                issues.append(f"unbounded {atom}{quantifier} at the start of the regex is retried "
+                              "from every position of a long line")
+
+                return items[:i] + [(atom, f"{{{lower},{PatternLinter.MAX_LEADING_REPEAT}}}{suffix}")] + items[i + 1:]
+
+            break
+
+        return items
+
+
+    @staticmethod
+    def _bounds(quantifier:str) -> tuple[int, int | None, str]:
+        """
+        Return the lower bound, the upper bound (None if unbounded)
+        and the lazy or possessive suffix of a quantifier
+        """
+
+        mo = PatternLinter.BOUNDS_REGEX.fullmatch(quantifier)
+
+        if not mo:
+            return 1, 1, ""
+
+        if mo.group("repeat"):
+            return {"*": (0, None), "+": (1, None), "?": (0, 1)}[mo.group("repeat")] + (mo.group("suffix"),)
+
+        lower = int(mo.group("lower") or 0)
+
+        if not mo.group("comma"):
+            return lower, lower, mo.group("suffix")
+
+        return lower, int(mo.group("upper")) if mo.group("upper") else None, mo.group("suffix")
+
+
+    @staticmethod
+    def _split(pattern:str) -> list[tuple[str, str]] | None:
+        """
+        Split a regular expression into its top level items and their quantifiers
+
+        Returns None if the regular expression has a top level alternation,
+        or can not be split
+        """
+
+        items = []
+        i = 0
+
+        try:
+            while i < len(pattern):
+                start = i
+                char = pattern[i]
+
+                if char == "\\":
+                    i += 2
+
+                elif char == "[":
+                    i = PatternLinter._class_end(pattern, i)
+
+                elif char == "(":
+                    depth = 0
+                    while depth or i == start:
+                        if pattern[i] == "\\":
+                            i += 2
+                        elif pattern[i] == "[":
+                            i = PatternLinter._class_end(pattern, i)
+                        else:
+                            depth += {"(": 1, ")": -1}.get(pattern[i], 0)
+                            i += 1
+
+                elif char == "|":
+                    return None
+
+                else:
+                    i += 1
+
+                atom = pattern[start:i]
+                mo = PatternLinter.QUANTIFIER_REGEX.match(pattern, i)
+
+                if mo:
+                    i = mo.end()
+
+                items.append((atom, mo.group() if mo else ""))
+
+        except IndexError:
+            return None
+
+        return items
+
+
+    @staticmethod
+    def _class_end(pattern:str, i:int) -> int:
+        """
+        Return the position after the character class starting at position i
+        """
+
+        i += 1
+
+        if pattern[i] == "^":
+            i += 1
+
+        # A ] first in the class is a literal
+        if pattern[i] == "]":
+            i += 1
+
+        while pattern[i] != "]":
+            i += 2 if pattern[i] == "\\" else 1
+
+        return i + 1
+
+
+    @staticmethod
+    def _has_pipe_in_class(pattern:str) -> bool:
+        """
+        Return whether a character class of the regular expression is written
+        as an alternation of single characters, i.e. [a|A]
+        """
+
+        return PatternLinter.PIPE_CLASS_REGEX.search(pattern) is not None
+
+
+    @staticmethod
+    def _has_nested_repeat(items:list, in_repeat:bool) -> bool:
+        """
+        Return whether a repeat without upper bound ends another one, i.e. (a+)+
+        or (\w+\s?)*, so the same text can be split between them in many ways
+        """
+
+        for i, (op, av) in enumerate(items):
+
+            if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+                _, hi, sub = av
+                sub = list(sub)
+
+                if hi == sre_constants.MAXREPEAT and in_repeat and PatternLinter._can_be_empty(items[i + 1:]):
+                    return True
+
+                if PatternLinter._has_nested_repeat(sub, hi > 1):
+                    return True
+
+            elif op is sre_constants.SUBPATTERN:
+                if PatternLinter._has_nested_repeat(list(av[-1]), in_repeat and PatternLinter._can_be_empty(items[i + 1:])):
+                    return True
+
+            elif op is sre_constants.BRANCH:
+                if any(PatternLinter._has_nested_repeat(list(branch), in_repeat and PatternLinter._can_be_empty(items[i + 1:]))
+                       for branch in av[1]):
+                    return True
+
+        return False
+
+
+    @staticmethod
+    def _can_be_empty(items:list) -> bool:
+        """
+        Return whether a sequence of parsed regex items can match nothing
+        """
+
+        return all(op is sre_constants.AT or
+                   op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] == 0
+                   for op, av in items)
+
+
+def main() -> None:
+    """
+    Report the slow constructs of each regular expression of a json file
+    """
+
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} <regexes.json>")
+        sys.exit(2)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as fd:
+        regexes = json.load(fd)
+
+    found = 0
+
+    for name, pattern in regexes.items():
+        linted, issues = PatternLinter.lint(pattern)
+
+        for issue in issues:
+            print(f"{name}: {issue}")
+
+        if linted != pattern:
+            print(f"{name}: rewritten to {linted}")
+
+        found += bool(issues)
+
+    print(f"{found} of {len(regexes)} regular expressions have slow constructs")
+
+
+if __name__ == "__main__":
+    main()
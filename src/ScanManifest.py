@@ -0,0 +1,166 @@
+"""Module used to remember what was found in each file of a directory between scans"""
+import json
+import logging
+import os
+from pathlib import Path
+from AppalyzerObjects import RegExMatch
+
+
+class ScanManifest():
+    """
+    Manifest of the files of a scanned directory
+
+    Records the size, modification time, content hash and findings of each
+    file, along with the fingerprint of the regexes and scan settings used,
+    so unchanged files don't need to be scanned again
+    """
+
+    logger = logging.getLogger(__name__)
+
+    MANIFEST_FILENAME = ".appalyzer_manifest.json"
+    VERSION = 1
+
+    def __init__(self, manifest_file:str, fingerprint:str) -> None:
+        """
+        Parameters
+        ----------
+        manifest_file : str
+            Path of the manifest file
+
+        fingerprint : str
+            Fingerprint of the regexes and scan settings used
+        """
+
+        self.manifest_file = Path(manifest_file)
+        self.fingerprint = fingerprint
+        self._files = {}
+        self._previous = {}
+
+        self.__load()
+
+
+    def __load(self) -> None:
+        """
+        Load the previous manifest, if it was created with the same regexes
+        """
+
+        if not self.manifest_file.is_file():
+            ScanManifest.logger.info("No manifest found at %s, scanning every file", self.manifest_file)
+            return
+
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as fd:
+                manifest = json.load(fd)
+
+        except (OSError, ValueError) as err:
+            ScanManifest.logger.error("[!] Could not read manifest %s: %s", self.manifest_file, err)
+            return
+
+        if manifest.get("version") != ScanManifest.VERSION or \
+                manifest.get("regex_fingerprint") != self.fingerprint:
+            ScanManifest.logger.info("Regexes or scan settings changed since the last scan, scanning every file")
+            return
+
+        self._previous = manifest.get("files", {})
+
+        ScanManifest.logger.info("Loaded %s files from manifest %s", len(self._previous), self.manifest_file)
+
+
+    def lookup(self, rel_path:str, stat:os.stat_result) -> dict[str, any] | None:
+        """
+        Return the previous entry of a file if its size and modification time did not change
+
+        Parameters
+        ----------
+        rel_path : str
+            Path of the file relative to the scanned directory
+
+        stat : os.stat_result
+            Current stat of the file
+
+        Returns
+        ----------
+        dict[str, any] | None
+            Previous entry of the file, None if it changed or is new
+        """
+
+        entry = self._previous.get(str(rel_path))
+
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry
+
+        return None
+
+
+    def lookup_hash(self, rel_path:str, stat:os.stat_result, sha256:str) -> dict[str, any] | None:
+        """
+        Return the previous entry of a file if its contents did not change,
+        i.e. the file was touched but not modified
+
+        Parameters
+        ----------
+        rel_path : str
+            Path of the file relative to the scanned directory
+
+        stat : os.stat_result
+            Current stat of the file
+
+        sha256 : str
+            Current hash of the file contents
+
+        Returns
+        ----------
+        dict[str, any] | None
+            Previous entry of the file, None if it changed or is new
+        """
+
+        entry = self._previous.get(str(rel_path))
+
+        if entry and entry["size"] == stat.st_size and entry["sha256"] == sha256:
+            return entry
+
+        return None
+
+
+    def update(self, rel_path:str, stat:os.stat_result, sha256:str, findings:list[RegExMatch]) -> None:
+        """
+        Record the current state and findings of a file
+
+        Parameters
+        ----------
+        rel_path : str
+            Path of the file relative to the scanned directory
+
+        stat : os.stat_result
+            Current stat of the file
+
+        sha256 : str
+            Current hash of the file contents
+
+        findings : list[RegExMatch]
+            Matches found in the file
+        """
+
+        self._files[str(rel_path)] = {"size": stat.st_size,
+                                      "mtime_ns": stat.st_mtime_ns,
+                                      "sha256": sha256,
+                                      "findings": [match.to_dict() for match in findings]}
+
+
+    def save(self) -> None:
+        """
+        Write the manifest, only the files recorded during this scan are kept
+        """
+
+        manifest = {"version": ScanManifest.VERSION,
+                    "regex_fingerprint": self.fingerprint,
+                    "files": self._files}
+
+        tmpfile = self.manifest_file.with_name(f"{self.manifest_file.name}.tmp")
+
+        with open(tmpfile, "w", encoding="utf-8") as fd:
+            json.dump(manifest, fd)
+
+        os.replace(tmpfile, self.manifest_file)
+
+        ScanManifest.logger.info("Saved %s files to manifest %s", len(self._files), self.manifest_file)
@@ -0,0 +1,236 @@
+"""Module used to profile where the time of a scan goes"""
+import contextlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Iterator
+
+
+class ScanProfiler():
+    """
+    Record the time spent in each stage of a scan, on each file type and
+    by each regular expression
+
+    Times are summed across the scanner workers, so they can add up to
+    more than the time the scan took
+    """
+
+    logger = logging.getLogger(__name__)
+
+    STAGES = ["decompile", "walk", "dedup", "cache", "type_detect", "extract", "match", "write"]
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+
+    def __getstate__(self) -> dict[str, any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+
+    def __setstate__(self, state:dict[str, any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+    def reset(self) -> None:
+        """
+        Forget everything recorded so far
+        """
+
+        # stage -> [seconds, calls]
+        self.stages = {}
+        # regex name -> [seconds, calls, bytes, hits]
+        self.patterns = {}
+        # mimetype -> [seconds, files, bytes]
+        self.file_types = {}
+
+
+    @contextlib.contextmanager
+    def stage(self, name:str) -> Iterator[None]:
+        """
+        Record the time spent in a stage of the scan
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage, i.e. "match"
+        """
+
+        start_time = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            self.add_stage(name, time.perf_counter() - start_time)
+
+
+    def add_stage(self, name:str, seconds:float) -> None:
+        """
+        Record the time spent in a stage of the scan
+        """
+
+        with self._lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+
+    def add_pattern(self, name:str, seconds:float, num_bytes:int, hits:int) -> None:
+        """
+        Record a run of a regular expression
+
+        Parameters
+        ----------
+        name : str
+            Name of the regular expression
+
+        seconds : float
+            Time taken by the run
+
+        num_bytes : int
+            Size of the content searched
+
+        hits : int
+            Number of matches found
+        """
+
+        with self._lock:
+            entry = self.patterns.setdefault(name, [0.0, 0, 0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+            entry[2] += num_bytes
+            entry[3] += hits
+
+
+    def add_file(self, mimetype:str, seconds:float, num_bytes:int) -> None:
+        """
+        Record the time taken to search a file
+
+        Parameters
+        ----------
+        mimetype : str
+            Type of the file
+
+        seconds : float
+            Time taken to search the file
+
+        num_bytes : int
+            Size of the file
+        """
+
+        with self._lock:
+            entry = self.file_types.setdefault(mimetype, [0.0, 0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+            entry[2] += num_bytes
+
+
+    def collect(self) -> dict[str, dict]:
+        """
+        Return everything recorded so far and reset, i.e. to send the
+        records of a scanner worker process back to the parent process
+        """
+
+        with self._lock:
+            records = {"stages": self.stages, "patterns": self.patterns, "file_types": self.file_types}
+            self.reset()
+
+        return records
+
+
+    def merge(self, records:dict[str, dict]) -> None:
+        """
+        Add the records returned by collect, i.e. from a scanner worker process
+        """
+
+        with self._lock:
+            for key in ("stages", "patterns", "file_types"):
+                mine = getattr(self, key)
+
+                for name, values in records[key].items():
+                    if name in mine:
+                        mine[name] = [a + b for a, b in zip(mine[name], values)]
+                    else:
+                        mine[name] = list(values)
+
+
+    def to_dict(self) -> dict[str, any]:
+        """
+        Return everything recorded as a json serializable dict
+        """
+
+        with self._lock:
+            return {"stages": {name: {"seconds": s, "calls": c}
+                               for name, (s, c) in self.stages.items()},
+                    "patterns": {name: {"seconds": s, "calls": c, "bytes": b, "hits": h}
+                                 for name, (s, c, b, h) in self.patterns.items()},
+                    "file_types": {name: {"seconds": s, "files": f, "bytes": b}
+                                   for name, (s, f, b) in self.file_types.items()}}
+
+
+    def report(self, top:int = 20) -> str:
+        """
+        Return tables of the stages, and of the slowest regular expressions and file types
+
+        Parameters
+        ----------
+        top : int
+            Number of regular expressions and file types to include
+
+        Returns
+        ----------
+        str
+            The tables
+        """
+
+        profile = self.to_dict()
+        lines = [f"{'stage':<40}{'seconds':>10}{'calls':>10}"]
+
+        for name in ScanProfiler.STAGES + sorted(set(profile["stages"]) - set(ScanProfiler.STAGES)):
+            if name in profile["stages"]:
+                entry = profile["stages"][name]
+                lines.append(f"{name:<40}{entry['seconds']:>10.3f}{entry['calls']:>10}")
+
+        lines.append("")
+        lines.append(f"{'regex':<40}{'seconds':>10}{'calls':>10}{'mb':>10}{'mb/s':>10}{'hits':>8}")
+
+        patterns = sorted(profile["patterns"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+
+        for name, entry in patterns[:top]:
+            mb = entry["bytes"] / 1024 ** 2
+            rate = mb / entry["seconds"] if entry["seconds"] else 0.0
+            lines.append(f"{name[:39]:<40}{entry['seconds']:>10.3f}{entry['calls']:>10}"
+                         f"{mb:>10.2f}{rate:>10.2f}{entry['hits']:>8}")
+
+        lines.append("")
+        lines.append(f"{'file type':<40}{'seconds':>10}{'files':>10}{'mb':>10}")
+
+        file_types = sorted(profile["file_types"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+
+        for name, entry in file_types[:top]:
+            lines.append(f"{name[:39]:<40}{entry['seconds']:>10.3f}{entry['files']:>10}"
+                         f"{entry['bytes'] / 1024 ** 2:>10.2f}")
+
+        return "\n".join(lines)
+
+
+    def dump(self, profile_file:str) -> None:
+        """
+        Write everything recorded to a json file
+
+        Parameters
+        ----------
+        profile_file : str
+            Path of the json file
+        """
+
+        with open(Path(profile_file), "w", encoding="utf-8") as fd:
+            json.dump(self.to_dict(), fd, indent=4)
+
+        ScanProfiler.logger.info("Profile can be found here %s", profile_file)
@@ -0,0 +1,264 @@
+"""Module used to extract printable strings from binary files, like the strings command"""
+import bisect
+import heapq
+import logging
+import mmap
+import re
+from pathlib import Path
+from typing import Iterator
+
+
+class OffsetMap():
+    """
+    Map positions in extracted text back to offsets in the original data
+    """
+
+    def __init__(self) -> None:
+        self._positions = []
+        self._origins = []
+        self._widths = []
+
+
+    def add(self, position:int, origin:int, width:int = 1) -> None:
+        """
+        Add a run of text
+
+        Parameters
+        ----------
+        position : int
+            Position of the run in the extracted text
+
+        origin : int
+            Offset of the run in the original data
+
+        width : int
+            Number of bytes per character of the run
+        """
+        self._positions.append(position)
+        self._origins.append(origin)
+        self._widths.append(width)
+
+
+    def to_origin(self, position:int) -> int:
+        """
+        Return the offset in the original data of a position in the extracted text
+        """
+
+        if not self._positions:
+            return position
+
+        i = max(bisect.bisect_right(self._positions, position) - 1, 0)
+
+        return self._origins[i] + (position - self._positions[i]) * self._widths[i]
+
+
+    def to_position(self, origin:int) -> int:
+        """
+        Return the first position in the extracted text at or after an offset in the original data
+        """
+
+        i = bisect.bisect_right(self._origins, origin) - 1
+
+        if i < 0:
+            return 0
+
+        position = self._positions[i] + -(-(origin - self._origins[i]) // self._widths[i])
+
+        if i + 1 < len(self._positions):
+            position = min(position, self._positions[i + 1])
+
+        return position
+
+
+class StringsMap():
+    """
+    Map positions in text extracted one string per line back to each
+    string, its location and its offsets in the original data
+    """
+
+    def __init__(self) -> None:
+        self._positions = []
+        self._spans = []
+        self._lengths = []
+        self._labels = []
+
+
+    def add(self, position:int, span:tuple[int, int], text:str, label:str) -> None:
+        """
+        Add the next string
+
+        Parameters
+        ----------
+        position : int
+            Position of the string in the extracted text
+
+        span : tuple[int, int]
+            Start and end offsets of the string in the original data
+
+        text : str
+            The string
+
+        label : str
+            Location of the string in the original data, i.e. string_ids[12]
+        """
+        self._positions.append(position)
+        self._spans.append(span)
+        self._lengths.append(len(text))
+        self._labels.append(label)
+
+
+    def index_at(self, position:int) -> int:
+        """
+        Return the index of the string at a position in the extracted text
+        """
+        return max(bisect.bisect_right(self._positions, position) - 1, 0)
+
+
+    def position(self, index:int) -> int:
+        """
+        Return the position of a string in the extracted text
+        """
+        return self._positions[index]
+
+
+    def length(self, index:int) -> int:
+        """
+        Return the number of characters of a string
+        """
+        return self._lengths[index]
+
+
+    def span(self, index:int) -> tuple[int, int]:
+        """
+        Return the start and end offsets of a string in the original data
+        """
+        return self._spans[index]
+
+
+    def label(self, index:int) -> str:
+        """
+        Return the location of a string in the original data
+        """
+        return self._labels[index]
+
+
+class StringsExtractor():
+    """
+    Extract printable ASCII and UTF-16LE runs from binary data without
+    running the strings command
+    """
+
+    logger = logging.getLogger(__name__)
+
+    # Printable characters as used by the strings command
+    PRINTABLE = rb"[\x20-\x7e\t]"
+
+    def __init__(self, min_length:int = 4) -> None:
+        """
+        Parameters
+        ----------
+        min_length : int
+            Minimum number of characters for a run to be reported
+        """
+
+        self.min_length = min_length
+        self._ascii = re.compile(StringsExtractor.PRINTABLE + b"{%d,}" % min_length)
+        self._utf16 = re.compile(b"(?:" + StringsExtractor.PRINTABLE + b"\x00){%d,}" % min_length)
+
+
+    def runs(self, data:bytes) -> Iterator[tuple[int, str, int]]:
+        """
+        Find all the printable runs in the data
+
+        Parameters
+        ----------
+        data : bytes
+            Data to search, anything supporting the buffer protocol (bytes, mmap, ...)
+
+        Returns
+        ----------
+        Iterator[tuple[int, str, int]]
+            Offset in the data, text and bytes per character of each run, ordered by offset
+        """
+
+        ascii_runs = ((mo.start(), mo.group().decode("ascii"), 1)
+                      for mo in self._ascii.finditer(data))
+
+        utf16_runs = ((mo.start(), mo.group().decode("utf-16-le"), 2)
+                      for mo in self._utf16.finditer(data))
+
+        return heapq.merge(ascii_runs, utf16_runs, key=lambda run: run[0])
+
+
+    def extract(self, data:bytes) -> str:
+        """
+        Return the printable runs in the data, one run per line
+
+        Parameters
+        ----------
+        data : bytes
+            Data to search, anything supporting the buffer protocol (bytes, mmap, ...)
+
+        Returns
+        ----------
+        str
+            Printable runs separated by new lines
+        """
+
+        return "\n".join(text for _, text, _ in self.runs(data))
+
+
+    def extract_mapped(self, data:bytes, base:int = 0) -> tuple[str, OffsetMap]:
+        """
+        Return the printable runs in the data, one run per line, and a map
+        from positions in the returned text back to offsets in the data
+
+        Parameters
+        ----------
+        data : bytes
+            Data to search, anything supporting the buffer protocol (bytes, mmap, ...)
+
+        base : int
+            Offset of the data in its file, added to the mapped offsets
+
+        Returns
+        ----------
+        tuple[str, OffsetMap]
+            Printable runs separated by new lines and their offset map
+        """
+
+        offset_map = OffsetMap()
+        texts = []
+        position = 0
+
+        for offset, text, width in self.runs(data):
+            offset_map.add(position, base + offset, width)
+            texts.append(text)
+            position += len(text) + 1
+
+        return "\n".join(texts), offset_map
+
+
+    def extract_file(self, afile:str) -> str:
+        """
+        Return the printable runs in a file, one run per line
+
+        The file is memory mapped instead of being read into memory
+
+        Parameters
+        ----------
+        afile : str
+            Path of the file
+
+        Returns
+        ----------
+        str
+            Printable runs separated by new lines
+        """
+
+        if Path(afile).stat().st_size == 0:
+            return ""
+
+        with open(afile, "rb") as fd:
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self.extract(mm)
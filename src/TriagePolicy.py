@@ -0,0 +1,241 @@
+"""Module used to decide which files are worth searching before opening them"""
+import fnmatch
+import logging
+import mimetypes
+import re
+import threading
+from pathlib import PurePath
+
+
+class TriagePolicy():
+    """
+    Skip files by path, type and size, and search some files last
+
+    Paths are matched against globs, i.e. "*.png" or "assets/*", case
+    insensitively.  A glob without a / matches the name of the file
+    anywhere in the tree.  Files are checked before they are opened, their
+    type is guessed from their extension, and checked again once their
+    first bytes were read.  The files and bytes skipped are counted per rule
+    """
+
+    logger = logging.getLogger(__name__)
+
+    RULES = ["include", "exclude", "mimetype", "max_size", "archive_bytes", "archive_members"]
+
+    def __init__(self, include:list[str] = None, exclude:list[str] = None,
+                 deprioritize:list[str] = None, mimetype_denylist:list[str] = None,
+                 max_size:int = None) -> None:
+        """
+        Parameters
+        ----------
+        include : list[str]
+            Globs of the files to search, all files if empty
+
+        exclude : list[str]
+            Globs of the files not to search
+
+        deprioritize : list[str]
+            Globs of the files searched after the others
+
+        mimetype_denylist : list[str]
+            Globs of the mimetypes not to search, i.e. "audio/*"
+
+        max_size : int
+            Size in bytes above which files are not searched, None for no limit
+        """
+
+        self._include = TriagePolicy._compile(include)
+        self._exclude = TriagePolicy._compile(exclude)
+        self._deprioritize = TriagePolicy._compile(deprioritize)
+        self._mimetypes = TriagePolicy._compile(mimetype_denylist)
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self.reset()
+
+        # The settings changing which files are searched, deprioritized files are still searched
+        self.fingerprint = [include or [], exclude or [], mimetype_denylist or [], max_size]
+
+
+    @classmethod
+    def from_config(cls, config:any) -> "TriagePolicy":
+        """
+        Return the triage policy of the configuration
+
+        Parameters
+        ----------
+        config : AppAnalyzerConfig
+            Configuration
+        """
+
+        return cls(config.get_triage_include(), config.get_triage_exclude(),
+                   config.get_triage_deprioritize(), config.get_triage_mimetype_denylist(),
+                   config.get_triage_max_file_size())
+
+
+    def __getstate__(self) -> dict[str, any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+
+    def __setstate__(self, state:dict[str, any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def _compile(globs:list[str] | None) -> tuple[re.Pattern, re.Pattern] | None:
+        """
+        Compile globs into a regex matching names and a regex matching paths
+        """
+
+        if not globs:
+            return None
+
+        names = [fnmatch.translate(glob.lower()) for glob in globs if "/" not in glob]
+        paths = [fnmatch.translate(glob.lower().lstrip("/")) for glob in globs if "/" in glob]
+
+        return (re.compile("|".join(names)) if names else None,
+                re.compile("|".join(paths)) if paths else None)
+
+
+    @staticmethod
+    def _matches(compiled:tuple[re.Pattern, re.Pattern] | None, rel_path:str) -> bool:
+        """
+        Return whether a path matches compiled globs
+        """
+
+        if compiled is None:
+            return False
+
+        names, paths = compiled
+        rel_path = PurePath(rel_path).as_posix().lower()
+
+        return bool(names and names.match(rel_path.rsplit("/", 1)[-1]) or
+                    paths and paths.match(rel_path))
+
+
+    def reset(self) -> None:
+        """
+        Forget the files skipped so far
+        """
+
+        # rule -> [files, bytes]
+        self.skipped = {}
+
+
+    def check(self, rel_path:str, size:int) -> str | None:
+        """
+        Return the rule skipping a file, without opening it
+
+        Parameters
+        ----------
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        size : int
+            Size of the file
+
+        Returns
+        ----------
+        str | None
+            Name of the rule skipping the file, None if the file should be searched
+        """
+
+        if self._include and not TriagePolicy._matches(self._include, rel_path):
+            return "include"
+
+        if TriagePolicy._matches(self._exclude, rel_path):
+            return "exclude"
+
+        if self.denies_mimetype(mimetypes.guess_type(PurePath(rel_path).name)[0]):
+            return "mimetype"
+
+        if self._max_size and size > self._max_size:
+            return "max_size"
+
+        return None
+
+
+    def denies_mimetype(self, mimetype:str | None) -> bool:
+        """
+        Return whether files of a mimetype are not searched
+        """
+
+        if not mimetype or self._mimetypes is None:
+            return False
+
+        return bool(self._mimetypes[0] and self._mimetypes[0].match(mimetype.lower()) or
+                    self._mimetypes[1] and self._mimetypes[1].match(mimetype.lower()))
+
+
+    def is_deprioritized(self, rel_path:str) -> bool:
+        """
+        Return whether a file is searched after the others
+        """
+        return TriagePolicy._matches(self._deprioritize, rel_path)
+
+
+    def skip(self, rule:str, rel_path:str, size:int) -> None:
+        """
+        Count a file skipped by a rule
+
+        Parameters
+        ----------
+        rule : str
+            Name of the rule, see RULES
+
+        rel_path : str
+            Path of the file relative to the directory or archive being searched
+
+        size : int
+            Size of the file
+        """
+
+        TriagePolicy.logger.debug("[*]Skipping %s, %s rule", rel_path, rule)
+
+        with self._lock:
+            entry = self.skipped.setdefault(rule, [0, 0])
+            entry[0] += 1
+            entry[1] += size
+
+
+    def collect(self) -> dict[str, list[int]]:
+        """
+        Return the files skipped so far and reset, i.e. to send the
+        files skipped by a scanner worker process back to the parent process
+        """
+
+        with self._lock:
+            skipped = self.skipped
+            self.reset()
+
+        return skipped
+
+
+    def merge(self, skipped:dict[str, list[int]]) -> None:
+        """
+        Add the files skipped returned by collect, i.e. from a scanner worker process
+        """
+
+        with self._lock:
+            for rule, (files, num_bytes) in skipped.items():
+                entry = self.skipped.setdefault(rule, [0, 0])
+                entry[0] += files
+                entry[1] += num_bytes
+
+
+    def report(self) -> str:
+        """
+        Return a table of the files and bytes skipped by each rule
+        """
+
+        lines = [f"{'rule':<20}{'files':>10}{'mb':>12}"]
+
+        with self._lock:
+            for rule in TriagePolicy.RULES:
+                if rule in self.skipped:
+                    files, num_bytes = self.skipped[rule]
+                    lines.append(f"{rule:<20}{files:>10}{num_bytes / 1024 ** 2:>12.2f}")
+
+        return "\n".join(lines)